@@ -0,0 +1,90 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from tower_defense.game_types import TileType
+from tower_defense.tiles.autosave import Autosave, restore_tiles, snapshot_tiles, write_map
+from tower_defense.tiles.tile_map import TileMap
+
+
+class AutosaveTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "test.map")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_map(self):
+        tile_map = TileMap()
+        tile_map.tiles[(1, 1)].tile_type = TileType.START
+        write_map(self.path, tile_map.tiles, tile_map.max_tiles)
+        self.assertEqual(["test.map"], os.listdir(self.directory))
+
+        with open(self.path, "rb") as f:
+            tiles, max_tiles = pickle.load(f)
+        self.assertEqual(tile_map.tiles, tiles)
+        self.assertEqual(tile_map.max_tiles, max_tiles)
+
+    def test_snapshot_tiles(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(1, 0)].tile_type = TileType.FINISH
+        tile_map.path_finding()
+
+        snapshot = snapshot_tiles(tile_map.tiles)
+        tile_map.tiles[(0, 0)].directions.append((0, 1))
+        self.assertEqual([(1, 0)], restore_tiles(snapshot, tile_map.tile_size)[(0, 0)].directions)
+
+        tile_map.tiles[(0, 0)].directions.pop()
+        self.assertEqual(tile_map.tiles, restore_tiles(snapshot, tile_map.tile_size))
+
+    def test_update(self):
+        time = [0.0]
+        autosave = Autosave(interval=10, clock=lambda: time[0])
+        tile_map = TileMap()
+        tile_map.path = self.path
+        tile_map.save()
+
+        tile_map.tiles[(2, 2)].tile_type = TileType.PATH
+        tile_map.tile_changed((2, 2))
+        time[0] = 5
+        autosave.update(tile_map)
+        self.assertFalse(autosave.saving)
+
+        time[0] = 10
+        autosave.update(tile_map)
+        self.assertTrue(autosave.saving)
+        autosave.finish(tile_map)
+        self.assertEqual(tile_map.revision, tile_map.saved_revision)
+        loaded = TileMap()
+        with open(self.path, "rb") as f:
+            loaded.decode(f.read())
+        self.assertEqual(TileType.PATH, loaded.tiles[(2, 2)].tile_type)
+
+        # nothing has changed since the last save
+        time[0] = 20
+        autosave.update(tile_map)
+        self.assertFalse(autosave.saving)
+
+    def test_save_keeps_order(self):
+        autosave = Autosave()
+        tile_map = TileMap()
+        tile_map.path = self.path
+
+        tile_map.tiles[(2, 2)].tile_type = TileType.PATH
+        tile_map.tile_changed((2, 2))
+        autosave.save(tile_map)
+        tile_map.tiles[(3, 3)].tile_type = TileType.FINISH
+        tile_map.tile_changed((3, 3))
+        autosave.save(tile_map)
+        autosave.finish(tile_map)
+
+        self.assertFalse(autosave.saving)
+        self.assertEqual(tile_map.revision, tile_map.saved_revision)
+        loaded = TileMap()
+        with open(self.path, "rb") as f:
+            loaded.decode(f.read())
+        self.assertEqual(TileType.FINISH, loaded.tiles[(3, 3)].tile_type)
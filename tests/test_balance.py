@@ -0,0 +1,56 @@
+import argparse
+import io
+import unittest
+
+from tower_defense.balance import parse_variation, generate_variants, place_buildings, simulate_game, write_csv
+from tower_defense import stats
+from tower_defense.game_types import BuildingType
+from tower_defense.helper import get_stats_path
+from tower_defense.simulation import SimulationState
+from tower_defense.tiles.map_loader import MapLoader
+from tower_defense.tiles.tile_map import GameTileMap
+
+
+class BalanceTest(unittest.TestCase):
+    def tearDown(self):
+        stats.tables.load(get_stats_path())
+
+    def test_parse_variation(self):
+        actual = parse_variation("drill.range=100,150")
+        self.assertEqual(('buildings', 'DRILL', 'range', [100, 150]), actual)
+
+        actual = parse_variation("LARGE_BOULDER.health=50")
+        self.assertEqual(('entities', 'LARGE_BOULDER', 'health', [50]), actual)
+
+        self.assertRaises(argparse.ArgumentTypeError, parse_variation, "DRILL.speed=1")
+        self.assertRaises(argparse.ArgumentTypeError, parse_variation, "TOWER.range=1")
+        self.assertRaises(argparse.ArgumentTypeError, parse_variation, "DRILL.range")
+
+    def test_generate_variants(self):
+        self.assertEqual([{}], generate_variants([]))
+
+        variants = generate_variants([('buildings', 'DRILL', 'range', [100, 150]),
+                                      ('buildings', 'DRILL', 'cost', [10]),
+                                      ('bullets', 'STANDARD', 'damage', [1, 2])])
+        self.assertEqual(4, len(variants))
+        self.assertEqual({'buildings': {'DRILL': {'range': 100, 'cost': 10}}, 'bullets': {'STANDARD': {'damage': 1}}},
+                         variants[0])
+
+    def test_place_buildings(self):
+        state = SimulationState()
+        state.tile_map = MapLoader().load('./tower_defense/res/maps/test.map', GameTileMap)
+        place_buildings(state, [BuildingType.DRILL, BuildingType.DRILL])
+        self.assertEqual(2, len(state.building_manager.buildings))
+        self.assertEqual(500 - 2 * 30, state.building_manager.gold)
+
+    def test_simulate_game(self):
+        result = simulate_game('./tower_defense/res/maps/test.map', {'buildings': {'DRILL': {'cost': 100}}},
+                               [BuildingType.DRILL], max_waves=1)
+        self.assertEqual(1, result['waves_survived'])
+        self.assertEqual(400, result['gold_left'])
+        self.assertLess(0, result['damage_drill'])
+
+    def test_write_csv(self):
+        output = io.StringIO()
+        write_csv([{'a': 1, 'b': 2}, {'a': 3, 'c': 4}], output)
+        self.assertEqual("a,b,c\r\n1,2,\r\n3,,4\r\n", output.getvalue())
@@ -5,9 +5,10 @@ import pyglet
 from tower_defense.buildings.building import Building, Laser, Hammer, Drill
 from tower_defense.entities.entity import Entity
 from tower_defense.game_state import GameState
-from tower_defense.game_types import BuildingType, EntityType, TileType
+from tower_defense.game_types import BuildingType, EntityType, TargetingMode, TileType
 from tower_defense.graphics import MovementGroup
 from tower_defense.helper import Vector
+from tower_defense.simulation import SimulationState
 
 
 class BuildingTest(unittest.TestCase):
@@ -48,6 +49,14 @@ class BuildingTest(unittest.TestCase):
         building = Building(Vector(), Vector(10, 10), -1)
         self.assertEqual(-1, building.range)
 
+    def test_covered_tiles(self):
+        building = Building(Vector(), Vector(100, 100), BuildingType.DRILL)
+        expected = [(x, y) for x in range(-1, 2) for y in range(-1, 2)]
+        self.assertEqual(expected, building.covered_tiles())
+
+        building = Building(Vector(), Vector(100, 100), -1)
+        self.assertEqual([], building.covered_tiles())
+
     def test_cost(self):
         building = Building(Vector(), Vector(10, 10), BuildingType.LASER)
         self.assertEqual(20, building.cost)
@@ -61,9 +70,64 @@ class BuildingTest(unittest.TestCase):
         building = Building(Vector(), Vector(10, 10), -1)
         self.assertEqual(-1, building.cost)
 
+    def test_select_target(self):
+        state = SimulationState()
+        state.tile_map.tiles[(0, 0)].tile_type = TileType.START
+        for x in range(1, 9):
+            state.tile_map.tiles[(x, 0)].tile_type = TileType.PATH
+        state.tile_map.tiles[(9, 0)].tile_type = TileType.FINISH
+        state.tile_map.path_finding()
+
+        first = Entity(Vector(300, 50), Vector(10, 10), EntityType.LARGE_BOULDER)
+        first.health = 50
+        strongest = Entity(Vector(200, 50), Vector(10, 10), EntityType.LARGE_BOULDER)
+        strongest.health = 120
+        closest = Entity(Vector(60, 50), Vector(10, 10), EntityType.LARGE_BOULDER)
+        out_of_range = Entity(Vector(900, 50), Vector(10, 10), EntityType.LARGE_BOULDER)
+        out_of_range.health = 200
+        state.entity_manager.entities = [strongest, out_of_range, closest, first]
+        for entity in state.entity_manager.entities:
+            state.entity_manager.update_path_distance(state, entity)
+
+        building = Building(Vector(), Vector(100, 100), BuildingType.LASER)
+        self.assertEqual(first, building.select_target(state))
+        building.targeting = TargetingMode.LAST
+        self.assertEqual(closest, building.select_target(state))
+        building.targeting = TargetingMode.STRONGEST
+        self.assertEqual(strongest, building.select_target(state))
+        building.targeting = TargetingMode.CLOSEST
+        self.assertEqual(closest, building.select_target(state))
+
+        state.entity_manager.entities = [out_of_range]
+        self.assertIsNone(building.select_target(state))
+
+    def test_select_target_same_tile(self):
+        state = SimulationState()
+        ahead = Entity(Vector(260, 50), Vector(10, 10), EntityType.LARGE_BOULDER)
+        ahead.path_distance = 10
+        behind = Entity(Vector(240, 50), Vector(10, 10), EntityType.LARGE_BOULDER)
+        behind.path_distance = 20
+        state.entity_manager.entities = [behind, ahead]
+
+        building = Building(Vector(), Vector(100, 100), BuildingType.LASER)
+        self.assertEqual(ahead, building.select_target(state))
+        building.targeting = TargetingMode.LAST
+        self.assertEqual(behind, building.select_target(state))
+
+    def test_next_targeting(self):
+        building = Building(Vector(), Vector(100, 100), BuildingType.LASER)
+        modes = []
+        for _ in TargetingMode:
+            modes.append(building.targeting)
+            building.next_targeting()
+        self.assertEqual(list(TargetingMode), modes)
+        self.assertEqual(TargetingMode.FIRST, building.targeting)
+
     def test_shooting_frequency(self):
         building = Building(Vector(), Vector(10, 10), BuildingType.LASER)
         self.assertEqual(1 / 30, building.shooting_frequency)
+        building = Building(Vector(), Vector(10, 10), BuildingType.HAMMER)
+        self.assertIsNone(building.shooting_frequency)
 
 
 class LaserTest(unittest.TestCase):
@@ -83,6 +147,16 @@ class LaserTest(unittest.TestCase):
         building.render(game_state, batch)
         self.assertEqual(0, len(batch.top_groups))
 
+    def test_update(self):
+        state = SimulationState()
+        building = Laser(Vector(), Vector(100, 100))
+        building.update(state)
+        self.assertIsNone(building.target)
+
+        state.entity_manager.entities = [Entity(Vector(150, 50), Vector(10, 10), EntityType.LARGE_BOULDER)]
+        building.update(state)
+        self.assertEqual(Vector(100, 0), building.target)
+
 
 @unittest.skip("Implement this")
 class CatapultTest(unittest.TestCase):
@@ -2,9 +2,11 @@ import unittest
 
 from tower_defense.buildings.building import Laser, Drill, Hammer, Building
 from tower_defense.buildings.building_manager import BuildingManager
+from tower_defense.entities.entity import Entity
 from tower_defense.game_state import GameState
-from tower_defense.game_types import BuildingType
+from tower_defense.game_types import BuildingType, BulletType, EntityType, TileType
 from tower_defense.helper import Vector
+from tower_defense.simulation import SimulationState
 
 
 class Object(object):
@@ -46,6 +48,7 @@ class BuildingManagerTest(unittest.TestCase):
 
         bullet = Object()
         bullet.render = dummy
+        bullet.bullet_type = BulletType.STANDARD
 
         building_manager = BuildingManager()
         building_manager.buildings = {'building': building}
@@ -89,3 +92,41 @@ class BuildingManagerTest(unittest.TestCase):
         building_manager.gold = 0
         building_manager.spawn_building(game_state, tile_index, BuildingType.HAMMER)
         self.assertEqual(0, len(building_manager.buildings.keys()))
+
+    def test_spawn_building_free_build(self):
+        state = SimulationState()
+        state.tile_map.tiles[(0, 0)].tile_type = TileType.START
+        state.tile_map.tiles[(2, 0)].tile_type = TileType.FINISH
+        state.tile_map.free_build = True
+        state.tile_map.set_blocked([])
+
+        building_manager = state.building_manager
+        building_manager.spawn_building(state, (1, 0), BuildingType.LASER)
+        self.assertEqual([(1, 0)], list(building_manager.buildings))
+        self.assertEqual({(1, 0)}, state.tile_map.blocked)
+        self.assertEqual([(0, 1)], state.tile_map.tiles[(0, 0)].directions)
+
+        # would cut off the START tile
+        building_manager.spawn_building(state, (0, 1), BuildingType.LASER)
+        building_manager.spawn_building(state, (2, 0), BuildingType.LASER)
+        self.assertEqual([(1, 0)], list(building_manager.buildings))
+
+    def test_targets_on_covered_tiles(self):
+        state = SimulationState()
+        building_manager = state.building_manager
+        building_manager.spawn_building(state, (0, 0), BuildingType.DRILL)
+        building_manager.spawn_building(state, (8, 8), BuildingType.LASER)
+        drill = building_manager.buildings[(0, 0)]
+        laser = building_manager.buildings[(8, 8)]
+        self.assertIn((1, 1), [tile_index for _, tile_index in drill.covered_by_distance()])
+        self.assertNotIn((2, 0), [tile_index for _, tile_index in drill.covered_by_distance()])
+
+        near_drill = Entity(Vector(150, 50), Vector(10, 10), EntityType.LARGE_BOULDER)
+        near_laser = Entity(Vector(950, 950), Vector(10, 10), EntityType.LARGE_BOULDER)
+        first = Entity(Vector(50, 150), Vector(10, 10), EntityType.LARGE_BOULDER)
+        state.entity_manager.entities = [first, near_drill, near_laser]
+        self.assertEqual({first, near_drill}, set(drill.get_target(state)))
+        self.assertEqual([near_laser], list(laser.get_target(state)))
+
+        state.entity_manager.entities = []
+        self.assertEqual([], list(drill.get_target(state)))
@@ -1,11 +1,10 @@
 import unittest
 
-import pyglet
-
 from tower_defense.entities.bullet import Bullet
 from tower_defense.entities.entity import Entity
 from tower_defense.game_state import GameState
 from tower_defense.game_types import EntityType
+from tower_defense.graphics import SpriteLayer
 from tower_defense.helper import Vector
 
 
@@ -16,15 +15,14 @@ class BulletTest(unittest.TestCase):
         game_state.window_size = Vector(100, 100)
 
         bullet = Bullet(Vector(), Vector(10, 10), Vector())
-        batch = pyglet.graphics.Batch()
-        bullet.render(game_state, batch)
-        self.assertEqual(1, len(batch.top_groups))
-        self.assertEqual(pyglet.graphics.TextureGroup, type(batch.top_groups[0]))
+        sprites = SpriteLayer()
+        bullet.render(game_state, sprites)
+        self.assertEqual(1, sprites.count)
 
         bullet = Bullet(Vector(10, 10), Vector(10, 10), Vector())
-        batch = pyglet.graphics.Batch()
-        bullet.render(game_state, batch)
-        self.assertEqual(0, len(batch.top_groups))
+        sprites = SpriteLayer()
+        bullet.render(game_state, sprites)
+        self.assertEqual(0, sprites.count)
 
     def test_update(self):
         game_state = GameState()
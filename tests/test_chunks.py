@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+
+from tower_defense.game_types import TileType
+from tower_defense.helper import Vector
+from tower_defense.tiles.chunks import ChunkedTiles, create_chunked_map, write_chunked_map, is_chunked_map
+from tower_defense.tiles.map_loader import MapLoader
+from tower_defense.tiles.tile_map import TileMap
+
+test_map_path = "./tower_defense/res/maps/test.map"
+
+
+class ChunkedTilesTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.map')
+        os.close(handle)
+        self.tile_size = Vector(100, 100)
+        self.tiles = TileMap.generate_tiles(Vector(40, 20), self.tile_size)
+        for x in range(40):
+            self.tiles[(x, 5)].tile_type = TileType.PATH
+            self.tiles[(x, 5)].directions = [(1, 0)]
+        self.tiles[(0, 5)].tile_type = TileType.START
+        self.tiles[(39, 5)].tile_type = TileType.FINISH
+        self.tiles[(39, 5)].directions = []
+        write_chunked_map(self.path, self.tiles, Vector(40, 20), chunk_size=16)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_read(self):
+        self.assertTrue(is_chunked_map(self.path))
+        self.assertFalse(is_chunked_map(test_map_path))
+
+        tiles = ChunkedTiles(self.path, self.tile_size)
+        self.assertEqual(Vector(40, 20), tiles.max_tiles)
+        self.assertEqual(800, len(tiles))
+        self.assertEqual(40, len(tiles.walkable))
+        self.assertEqual([], list(tiles.loaded))
+
+        self.assertEqual(self.tiles[(20, 5)], tiles[(20, 5)])
+        self.assertEqual(self.tiles[(39, 5)], tiles[(39, 5)])
+        self.assertEqual(self.tiles[(33, 19)], tiles[(33, 19)])
+        self.assertEqual([(2, 1)], list(tiles.loaded))
+        self.assertIsNone(tiles.get((40, 0)))
+        self.assertNotIn((0, 20), tiles)
+        self.assertEqual(self.tiles, dict(tiles.items()))
+
+    def test_load_chunk_evicts(self):
+        tiles = ChunkedTiles(self.path, self.tile_size, max_loaded_chunks=2)
+        tiles.load_chunk((0, 0))
+        tiles.load_chunk((1, 0))
+        tiles.load_chunk((2, 0))
+        self.assertEqual([(1, 0), (2, 0)], list(tiles.loaded))
+
+        tiles.dirty.add((1, 0))
+        tiles.load_chunk((0, 1))
+        tiles.load_chunk((1, 1))
+        self.assertEqual([(1, 0), (1, 1)], list(tiles.loaded))
+
+    def test_load_area(self):
+        tiles = ChunkedTiles(self.path, self.tile_size)
+        self.assertEqual([(0, 0), (0, 1), (1, 0), (1, 1)], tiles.load_area((-5, -5), (20, 18)))
+        self.assertEqual([(2, 1)], tiles.load_area((39, 19), (100, 100)))
+
+    def test_mark_changed_and_save(self):
+        tiles = ChunkedTiles(self.path, self.tile_size)
+        tiles[(3, 3)].tile_type = TileType.PATH
+        tiles.mark_changed((3, 3))
+        tiles[(20, 5)].tile_type = TileType.BUILDING_GROUND
+        tiles.mark_changed((20, 5))
+        self.assertIn((3, 3), tiles.walkable)
+        self.assertNotIn((20, 5), tiles.walkable)
+        self.assertEqual([], tiles[(20, 5)].directions)
+
+        tiles.save(self.path)
+        self.assertEqual(set(), tiles.dirty)
+
+        loaded = ChunkedTiles(self.path, self.tile_size)
+        self.assertEqual(TileType.PATH, loaded[(3, 3)].tile_type)
+        self.assertEqual(TileType.BUILDING_GROUND, loaded[(20, 5)].tile_type)
+        self.assertEqual(set(tiles.walkable), set(loaded.walkable))
+
+    def test_create_chunked_map(self):
+        create_chunked_map(self.path, Vector(2048, 2048))
+        self.assertLess(os.path.getsize(self.path), 100 * 1024)
+
+        tiles = ChunkedTiles(self.path, self.tile_size)
+        self.assertEqual(TileType.BUILDING_GROUND, tiles[(2000, 1000)].tile_type)
+        self.assertEqual({}, tiles.walkable)
+
+
+class ChunkedTileMapTest(unittest.TestCase):
+    def test_load_chunked_map(self):
+        tile_map = MapLoader().load(test_map_path, TileMap)
+        handle, path = tempfile.mkstemp(suffix='.map')
+        os.close(handle)
+        try:
+            write_chunked_map(path, tile_map.tiles, tile_map.max_tiles)
+            chunked_tile_map = MapLoader().load(path, TileMap)
+            self.assertTrue(chunked_tile_map.is_chunked)
+            self.assertEqual(tile_map.max_tiles, chunked_tile_map.max_tiles)
+            self.assertEqual(tile_map.walkable_tiles(), chunked_tile_map.walkable_tiles())
+
+            chunked_tile_map.path_finding()
+            self.assertEqual(tile_map.walkable_tiles(), chunked_tile_map.walkable_tiles())
+        finally:
+            os.remove(path)
+
+    def test_edit_more_chunks_than_loaded(self):
+        handle, path = tempfile.mkstemp(suffix='.map')
+        os.close(handle)
+        try:
+            create_chunked_map(path, Vector(40, 20), chunk_size=4)
+            tile_map = TileMap()
+            tile_map.path = path
+            tile_map.open_chunked(path)
+            tile_map.tiles.max_loaded_chunks = 4
+
+            # one tile in each of the 50 chunks
+            tile_types = {(x, y): TileType.PATH for x in range(1, 40, 4) for y in range(1, 20, 4)}
+            self.assertEqual(tile_types.keys(), tile_map.set_tile_types(tile_types).keys())
+            tile_map.save()
+
+            loaded = ChunkedTiles(path, tile_map.tile_size)
+            self.assertEqual(set(tile_types), set(loaded.walkable))
+            for tile_index in tile_types:
+                self.assertEqual(TileType.PATH, loaded[tile_index].tile_type)
+        finally:
+            os.remove(path)
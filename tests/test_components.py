@@ -1,7 +1,7 @@
 import unittest
 
 from tower_defense.helper import Vector, MouseClick, KeyPresses
-from tower_defense.user_interface.components import Button, Label, Input, HighlightableLabel
+from tower_defense.user_interface.components import Button, Label, Input, HighlightableLabel, Thumbnail
 
 
 class ButtonTest(unittest.TestCase):
@@ -20,6 +20,10 @@ class ButtonTest(unittest.TestCase):
         self.assertFalse(text_component.is_clicked(click))
 
 
+class Object(object):
+    pass
+
+
 class LabelTest(unittest.TestCase):
     def test_render(self):
         was_called = []
@@ -119,3 +123,44 @@ class HighlightComponentTest(unittest.TestCase):
         highlight_component = HighlightableLabel("", Vector(), Vector(10, 10))
         highlight_component.is_highlighted = True
         highlight_component.render_highlight(Vector())
+
+
+class ThumbnailTest(unittest.TestCase):
+    def test_render(self):
+        was_called = []
+
+        def blit(x, y, width, height):
+            was_called.append((x, y, width, height))
+
+        thumbnail = Thumbnail(Vector(0, 50), Vector(50, 50))
+        thumbnail.render(Vector())
+        self.assertEqual(0, len(was_called))
+
+        thumbnail.image = Object()
+        thumbnail.image.width = 20
+        thumbnail.image.height = 10
+        thumbnail.image.blit = blit
+        thumbnail.render(Vector(10, 0))
+        self.assertEqual([(10, 12.5, 50, 25)], was_called)
+
+    def test_refresh(self):
+        images = {"test.map": None}
+        thumbnails = Object()
+        thumbnails.get = images.get
+
+        thumbnail = Thumbnail(Vector(0, 50), Vector(50, 50))
+        thumbnail.refresh(thumbnails, "test.map")
+        self.assertIsNone(thumbnail.image)
+
+        images["test.map"] = "first"
+        thumbnail.refresh(thumbnails, "test.map")
+        self.assertEqual("first", thumbnail.image)
+
+        # the map has changed and its new thumbnail is not ready yet
+        images["test.map"] = None
+        thumbnail.refresh(thumbnails, "test.map")
+        self.assertEqual("first", thumbnail.image)
+
+        images["test.map"] = "second"
+        thumbnail.refresh(thumbnails, "test.map")
+        self.assertEqual("second", thumbnail.image)
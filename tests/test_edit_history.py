@@ -0,0 +1,66 @@
+import unittest
+
+from tower_defense.game_types import TileType
+from tower_defense.helper import MouseClick, Vector
+from tower_defense.tiles.edit_history import DELTA, EditHistory, decode_deltas, encode_deltas
+from tower_defense.tiles.tile_map import EditorTileMap
+
+
+class EditHistoryTest(unittest.TestCase):
+    def test_encode_deltas(self):
+        previous = {(1, 2): TileType.BUILDING_GROUND, (3, 4): TileType.PATH}
+        tile_types = {(1, 2): TileType.PATH, (3, 4): TileType.FINISH, (5, 6): TileType.PATH}
+        data = encode_deltas(previous, tile_types)
+        self.assertEqual(2 * DELTA.size, len(data))
+        self.assertEqual([((1, 2), TileType.BUILDING_GROUND, TileType.PATH),
+                          ((3, 4), TileType.PATH, TileType.FINISH)], decode_deltas(data))
+
+    def test_undo_redo(self):
+        tile_map = EditorTileMap()
+        history = EditHistory()
+        self.assertFalse(history.undo(tile_map))
+
+        tile_types = {(0, 0): TileType.START, (1, 0): TileType.PATH}
+        history.record(tile_map.set_tile_types(tile_types), tile_types)
+        tile_types = {(1, 0): TileType.FINISH}
+        history.record(tile_map.set_tile_types(tile_types), tile_types)
+        self.assertTrue(history.can_undo)
+        self.assertFalse(history.can_redo)
+
+        self.assertTrue(history.undo(tile_map))
+        self.assertEqual(TileType.PATH, tile_map.tiles[(1, 0)].tile_type)
+        self.assertTrue(history.undo(tile_map))
+        self.assertEqual(TileType.BUILDING_GROUND, tile_map.tiles[(0, 0)].tile_type)
+        self.assertEqual(TileType.BUILDING_GROUND, tile_map.tiles[(1, 0)].tile_type)
+        self.assertFalse(history.can_undo)
+
+        self.assertTrue(history.redo(tile_map))
+        self.assertEqual(TileType.START, tile_map.tiles[(0, 0)].tile_type)
+        self.assertEqual(TileType.PATH, tile_map.tiles[(1, 0)].tile_type)
+
+        # a new edit discards the edits that could be redone
+        tile_types = {(2, 0): TileType.PATH}
+        history.record(tile_map.set_tile_types(tile_types), tile_types)
+        self.assertFalse(history.can_redo)
+        self.assertEqual(2 * DELTA.size + DELTA.size, history.size)
+
+    def test_record_is_bounded(self):
+        history = EditHistory(max_transactions=3, max_bytes=4 * DELTA.size)
+        for x in range(5):
+            history.record({(x, 0): TileType.BUILDING_GROUND}, {(x, 0): TileType.PATH})
+        self.assertEqual(3, len(history.undo_stack))
+
+        history.record({(x, 1): TileType.BUILDING_GROUND for x in range(3)}, {(x, 1): TileType.PATH for x in range(3)})
+        self.assertEqual(2, len(history.undo_stack))
+        self.assertEqual(4 * DELTA.size, history.size)
+
+    def test_mouse_click_is_recorded(self):
+        tile_map = EditorTileMap()
+        click = MouseClick()
+        click.position = Vector(50, 50)
+        click.button = 1
+        tile_map.mouse_click_handler(None, click)
+        self.assertEqual(TileType.PATH, tile_map.tiles[(0, 0)].tile_type)
+
+        self.assertTrue(tile_map.history.undo(tile_map))
+        self.assertEqual(TileType.BUILDING_GROUND, tile_map.tiles[(0, 0)].tile_type)
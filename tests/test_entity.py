@@ -1,10 +1,9 @@
 import unittest
 
-import pyglet
-
 from tower_defense.entities.entity import Entity
 from tower_defense.game_state import GameState
 from tower_defense.game_types import TileType, EntityType
+from tower_defense.graphics import SpriteLayer
 from tower_defense.helper import Vector
 
 
@@ -43,15 +42,14 @@ class EntityTest(unittest.TestCase):
         game_state.window_size = Vector(100, 100)
 
         entity = Entity(Vector(1, 1), Vector(10, 10), EntityType.LARGE_BOULDER)
-        batch = pyglet.graphics.Batch()
-        entity.render(game_state, batch)
-        self.assertEqual(1, len(batch.top_groups))
-        self.assertEqual(pyglet.graphics.TextureGroup, type(batch.top_groups[0]))
+        sprites = SpriteLayer()
+        entity.render(game_state, sprites)
+        self.assertEqual(1, sprites.count)
 
         entity = Entity(Vector(10, 10), Vector(10, 10), EntityType.LARGE_BOULDER)
-        batch = pyglet.graphics.Batch()
-        entity.render(game_state, batch)
-        self.assertEqual(0, len(batch.top_groups))
+        sprites = SpriteLayer()
+        entity.render(game_state, sprites)
+        self.assertEqual(0, sprites.count)
 
     def test_take_damage(self):
         entity = Entity(Vector(), Vector(), EntityType.LARGE_BOULDER)
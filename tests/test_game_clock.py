@@ -0,0 +1,58 @@
+import unittest
+
+from tower_defense.game_clock import GameClock
+
+
+class GameClockTest(unittest.TestCase):
+    def test_advance(self):
+        clock = GameClock(tick_rate=100)
+        self.assertEqual(0, clock.advance(0.005))
+        self.assertAlmostEqual(0.5, clock.alpha)
+
+        self.assertEqual(1, clock.advance(0.005))
+        self.assertAlmostEqual(0, clock.alpha)
+
+        self.assertEqual(3, clock.advance(0.035))
+        self.assertAlmostEqual(0.5, clock.alpha)
+        self.assertEqual(4, clock.ticks)
+
+    def test_advance_time_scale(self):
+        clock = GameClock(tick_rate=100)
+        clock.time_scale = 4
+        self.assertEqual(4, clock.advance(0.01))
+
+    def test_advance_max_steps(self):
+        clock = GameClock(tick_rate=100, max_frame_time=0.1)
+        self.assertEqual(10, clock.advance(5))
+        self.assertEqual(0, clock.alpha)
+
+        clock.time_scale = 2
+        self.assertEqual(20, clock.advance(5))
+
+    def test_run(self):
+        was_called = []
+        clock = GameClock(tick_rate=100)
+        clock.advance(0.03)
+        self.assertEqual(3, clock.run(lambda: was_called.append(True)))
+        self.assertEqual(3, len(was_called))
+
+    def test_run_turbo(self):
+        was_called = []
+        clock = GameClock(tick_rate=100, turbo_frame_time=0.01)
+        clock.turbo = True
+        self.assertEqual(0, clock.advance(1))
+
+        steps = clock.run(lambda: was_called.append(True))
+        self.assertLess(0, steps)
+        self.assertEqual(steps, len(was_called))
+        self.assertEqual(steps, clock.ticks)
+
+    def test_run_turbo_fixed_steps(self):
+        was_called = []
+        clock = GameClock()
+        clock.turbo = True
+        clock.turbo_steps = 7
+        clock.advance(1)
+        self.assertEqual(7, clock.run(lambda: was_called.append(True)))
+        self.assertEqual(7, len(was_called))
+        self.assertEqual(7, clock.ticks)
@@ -1,7 +1,9 @@
 import unittest
 
 from tower_defense.game_state import GameState
+from tower_defense.game_types import GameMode, GameSpeed
 from tower_defense.helper import Vector
+from tower_defense.tiles.tile_map import GameTileMap
 from tower_defense.user_interface.menu import MapMenu
 
 
@@ -32,6 +34,28 @@ class TestGameState(unittest.TestCase):
         size = Vector(10, 10)
         self.assertEqual(None, game_state.world_to_window_space(position, size))
 
+    def test_window_to_world_space_zoomed(self):
+        game_state = GameState()
+        game_state.zoom = 0.5
+        self.assertEqual(Vector(100, 200), game_state.window_to_world_space(Vector(100, 150)))
+        self.assertEqual(Vector(200, 300), game_state.window_to_view_space(Vector(100, 150)))
+
+    def test_zoom_by(self):
+        game_state = GameState()
+        game_state.window_size = Vector(1000, 1000)
+        game_state.world_offset = Vector(0, 0)
+        game_state.zoom_by(2)
+        self.assertEqual(2, game_state.zoom)
+        self.assertEqual(Vector(-250, -250), game_state.world_offset)
+        self.assertEqual(Vector(500, 500), game_state.window_to_world_space(Vector(500, 500)))
+
+        game_state.zoom_by(2)
+        self.assertEqual(2, game_state.zoom)
+
+        # the default map is 1100 pixels wide including its border
+        game_state.zoom_by(0.1)
+        self.assertEqual(1000 / 1100, game_state.zoom)
+
     def test_world_to_index_space(self):
         game_state = GameState()
 
@@ -114,6 +138,22 @@ class TestGameState(unittest.TestCase):
         game_state.init('./tower_defense/res')
         game_state.tick_game()
 
+    def test_rewind_wave_after_tick_game(self):
+        game_state = GameState()
+        game_state.init('./tower_defense/res')
+        gold = game_state.building_manager.gold
+        wave_count = game_state.entity_manager.wave_count
+
+        game_state.start_wave()
+        game_state.tick_game()
+        self.assertEqual(1, len(game_state.wave_history))
+
+        game_state.building_manager.gold = gold - 100
+        game_state.rewind_wave()
+        self.assertEqual(wave_count, game_state.entity_manager.wave_count)
+        self.assertEqual(gold, game_state.building_manager.gold)
+        self.assertFalse(game_state.entity_manager.wave_running)
+
     def test_tick_editor(self):
         game_state = GameState()
         game_state.init('./tower_defense/res')
@@ -129,3 +169,35 @@ class TestGameState(unittest.TestCase):
         game_state.init('./tower_defense/res')
         game_state.map_menu = MapMenu('./tower_defense/res/maps')
         game_state.tick_map_menu()
+
+    def test_set_game_speed(self):
+        game_state = GameState()
+        game_state.set_game_speed(GameSpeed.QUADRUPLE)
+        self.assertEqual(4, game_state.clock.time_scale)
+        self.assertFalse(game_state.clock.turbo)
+
+        game_state.set_game_speed(GameSpeed.MAX)
+        self.assertTrue(game_state.clock.turbo)
+
+    def test_load_map(self):
+        game_state = GameState()
+        game_state.load_map('./tower_defense/res/maps/test.map', GameMode.GAME)
+        self.assertEqual(GameMode.LOADING, game_state.mode)
+        # left over from the previous map
+        game_state.building_manager.buildings[(1, 1)] = Object()
+        game_state.building_manager.gold = 20
+
+        game_state.map_loader.future.result()
+        game_state.tick_loading()
+        self.assertEqual(GameMode.GAME, game_state.mode)
+        self.assertEqual(GameTileMap, type(game_state.tile_map))
+        self.assertEqual({}, game_state.building_manager.buildings)
+        self.assertEqual(500, game_state.building_manager.gold)
+        self.assertEqual(set(), game_state.tile_map.blocked)
+
+    def test_load_map_failed(self):
+        game_state = GameState()
+        game_state.load_map('does_not_exist.map', GameMode.EDITOR)
+        game_state.map_loader.future.exception()
+        game_state.tick_loading()
+        self.assertEqual(GameMode.MAIN_MENU, game_state.mode)
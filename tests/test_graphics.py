@@ -3,7 +3,7 @@ import unittest
 import pyglet
 
 from tower_defense.helper import Vector
-from tower_defense.graphics import Textures, Renderer, MovementGroup
+from tower_defense.graphics import Textures, Renderer, MovementGroup, PointLayer, SpriteLayer
 
 
 class Object(object):
@@ -50,6 +50,45 @@ class MethodTest(unittest.TestCase):
         Renderer.textured_rectangle(batch, texture, position, size, tex_max=1, tex_min=0)
 
 
+class SpriteLayerTest(unittest.TestCase):
+    def test_add(self):
+        sprites = SpriteLayer(tex_max=0.5, capacity=1)
+        sprites.add(Vector(10, 20), Vector(5, 5))
+        self.assertEqual(1, sprites.count)
+        self.assertEqual([15, 20, 15, 25, 10, 25, 10, 20], sprites.vertices[:8])
+        self.assertEqual([0.5, 0, 0.5, 0.5, 0, 0.5, 0, 0], sprites.tex_coords[:8])
+
+    def test_add_grows_buffer(self):
+        sprites = SpriteLayer(capacity=2)
+        for x in range(5):
+            sprites.add(Vector(x, 0), Vector(1, 1))
+        self.assertEqual(5, sprites.count)
+        self.assertEqual(8, sprites.capacity)
+        self.assertEqual([1, 0, 1, 1, 0, 1, 0, 0], sprites.vertices[:8])
+        self.assertEqual([5, 0, 5, 1, 4, 1, 4, 0], sprites.vertices[32:40])
+        self.assertEqual(8 * 8, len(sprites.tex_coords))
+        self.assertEqual([1, 0, 1, 1, 0, 1, 0, 0] * 8, sprites.tex_coords[:])
+
+        vertices = sprites.vertices
+        sprites.clear()
+        sprites.add(Vector(), Vector(1, 1))
+        self.assertEqual(1, sprites.count)
+        self.assertIs(vertices, sprites.vertices)
+
+
+class PointLayerTest(unittest.TestCase):
+    def test_add(self):
+        points = PointLayer((255, 0, 0), capacity=1)
+        points.add(Vector(10, 20), Vector(5, 5))
+        points.add(Vector(0, 0), Vector(2, 4))
+        self.assertEqual(2, points.count)
+        self.assertEqual(2, points.capacity)
+        self.assertEqual([12.5, 22.5, 1, 2], points.vertices[:4])
+
+        points.clear()
+        self.assertEqual(0, points.count)
+
+
 class MovementGroupTest(unittest.TestCase):
     @staticmethod
     def test_set_state():
@@ -1,7 +1,8 @@
 import unittest
 
 from tower_defense.game_state import GameState
-from tower_defense.helper import Vector, rect_contains_point, constrain_rect_to_bounds, MouseClick, process_clicks
+from tower_defense.helper import Vector, rect_contains_point, constrain_rect_to_bounds, MouseClick, process_clicks, \
+    interpolate, StageTimer
 
 
 class MouseClickTest(unittest.TestCase):
@@ -81,6 +82,11 @@ class VectorTest(unittest.TestCase):
 
 
 class MethodTest(unittest.TestCase):
+    def test_interpolate(self):
+        self.assertEqual(Vector(1, 2), interpolate(Vector(1, 2), Vector(3, 6), 0))
+        self.assertEqual(Vector(2, 4), interpolate(Vector(1, 2), Vector(3, 6), 0.5))
+        self.assertEqual(Vector(3, 6), interpolate(Vector(1, 2), Vector(3, 6), 1))
+
     def test_rect_contains_point(self):
         point = Vector(10, 10)
         rect_position = Vector(0, 20)
@@ -133,3 +139,13 @@ class MethodTest(unittest.TestCase):
 
         process_clicks(game_state, true_processor)
         self.assertEqual(0, len(game_state.mouse_clicks))
+
+
+class StageTimerTest(unittest.TestCase):
+    def test_report(self):
+        times = [1.0, 1.5, 1.75]
+        timer = StageTimer(lambda: times.pop(0))
+        timer.mark('imports')
+        timer.mark('window')
+        self.assertEqual([('imports', 0.5), ('window', 0.25)], timer.stages)
+        self.assertEqual("imports: 500.0ms, window: 250.0ms, total: 750.0ms", timer.report())
@@ -1,6 +1,9 @@
 import unittest
 import os
-from tower_defense.hot_reload import reload_all
+import sys
+import tempfile
+
+from tower_defense.hot_reload import reload_all, update_class, ModuleWatcher
 
 script_path = os.path.dirname(os.path.realpath(__file__))
 
@@ -71,3 +74,57 @@ class HotReloadTest(unittest.TestCase):
 
         reload_all(['tests.sub_directory.my_module_multiple_relative'])
         self.assertEqual(time, my_function())
+
+    def test_update_class(self):
+        namespace = {}
+        exec("""
+class Base:
+    def value(self):
+        return 1
+
+class Old(Base):
+    def value(self):
+        return 1
+
+    def helper(self):
+        return 'old'
+""", namespace)
+        instance = namespace['Old']()
+        bound_method = instance.helper
+
+        exec("""
+class New(Base):
+    factor = 3
+
+    def value(self):
+        return super().value() + 1
+
+    def helper(self):
+        return 'new'
+""", namespace)
+        update_class(namespace['Old'], namespace['New'], False)
+
+        self.assertEqual('new', instance.helper())
+        self.assertEqual('new', bound_method())
+        self.assertEqual(2, instance.value())
+        self.assertEqual(3, instance.factor)
+
+    def test_module_watcher(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'my_module_watched.py')
+            write_module(file_name, 10)
+            sys.path.insert(0, directory)
+            try:
+                import my_module_watched
+                watcher = ModuleWatcher(['my_module_watched', 'not_imported'])
+                watcher.poll()
+                self.assertEqual([], watcher.reload_changed())
+
+                write_module(file_name, 42)
+                watcher.poll()
+                self.assertEqual(['my_module_watched'], watcher.reload_changed())
+                self.assertEqual(42, my_module_watched.my_function())
+                self.assertEqual([], watcher.reload_changed())
+            finally:
+                sys.path.remove(directory)
+                del sys.modules['my_module_watched']
@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+
+from tower_defense.game_clock import GameClock
+from tower_defense.game_types import GameMode
+from tower_defense.helper import KeyPresses, MouseClick, Vector
+from tower_defense.input_recording import InputFrame, InputRecorder, load_recording, replay, replay_frame, \
+    timing_report
+
+
+class Object:
+    pass
+
+
+def create_game_state():
+    game_state = Object()
+    game_state.mode = GameMode.GAME
+    game_state.key_presses = KeyPresses()
+    game_state.mouse_clicks = []
+    game_state.mouse_position = Vector()
+    game_state.clock = GameClock()
+    return game_state
+
+
+def create_window(was_called):
+    window = Object()
+    window.get_size = lambda: (100, 50)
+    window.set_size = lambda width, height: was_called.append(('set_size', width, height))
+    window.clear = lambda: was_called.append('clear')
+    window.flip = lambda: was_called.append('flip')
+    window.dispatch_events = lambda: None
+    return window
+
+
+class InputFrameTest(unittest.TestCase):
+    def test_encode_decode(self):
+        key_presses = KeyPresses()
+        key_presses.up = True
+        key_presses.back_space = True
+        key_presses.text = "map1"
+        click = MouseClick()
+        click.position = Vector(10, 20)
+        click.button = 4
+        frame = InputFrame(0.5, GameMode.EDITOR, Vector(1280, 720), Vector(3, 4), key_presses, [click])
+
+        data = frame.encode() + InputFrame().encode()
+        actual, offset = InputFrame.decode(data, 0)
+        self.assertEqual(0.5, actual.dt)
+        self.assertEqual(GameMode.EDITOR, actual.mode)
+        self.assertEqual(Vector(1280, 720), actual.window_size)
+        self.assertEqual(Vector(3, 4), actual.mouse_position)
+        self.assertEqual([click], actual.mouse_clicks)
+        self.assertEqual(key_presses.__dict__, actual.key_presses.__dict__)
+
+        actual, offset = InputFrame.decode(data, offset)
+        self.assertEqual(GameMode.MAIN_MENU, actual.mode)
+        self.assertEqual(len(data), offset)
+
+    def test_apply(self):
+        click = MouseClick()
+        frame = InputFrame(mouse_position=Vector(1, 2), mouse_clicks=[click])
+        game_state = create_game_state()
+        frame.apply(game_state)
+        self.assertEqual([click], game_state.mouse_clicks)
+        self.assertEqual(Vector(1, 2), game_state.mouse_position)
+
+
+class InputRecorderTest(unittest.TestCase):
+    def test_record_and_load(self):
+        game_state = create_game_state()
+        recorder = InputRecorder()
+        recorder.record(game_state, Vector(100, 100), 0.1)
+        game_state.key_presses.text = "a"
+        game_state.mouse_clicks.append(MouseClick())
+        recorder.record(game_state, Vector(100, 100), 0.2)
+        game_state.key_presses.text = ""
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session.rec')
+            recorder.save(path)
+            frames = load_recording(path)
+
+        self.assertEqual(2, len(frames))
+        self.assertEqual("", frames[0].key_presses.text)
+        self.assertEqual("a", frames[1].key_presses.text)
+        self.assertEqual(1, len(frames[1].mouse_clicks))
+        self.assertEqual(0.2, frames[1].dt)
+
+    def test_load_invalid_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'session.rec')
+            with open(path, 'wb') as f:
+                f.write(b'nothing to see here')
+            self.assertRaises(ValueError, load_recording, path)
+
+
+class ReplayTest(unittest.TestCase):
+    def test_replay_frame(self):
+        was_called = []
+        game_state = create_game_state()
+        game_state.tick = lambda _, dt: was_called.append(('tick', dt))
+        game_state.clean_up = lambda: was_called.append('clean_up')
+
+        window = create_window(was_called)
+
+        frame = InputFrame(0.25, GameMode.GAME, Vector(100, 100))
+        self.assertTrue(replay_frame(game_state, window, frame))
+        self.assertEqual([('set_size', 100, 100), 'clear', ('tick', 0.25), 'clean_up', 'flip'], was_called)
+
+        was_called.clear()
+        frame = InputFrame(0.25, GameMode.LOADING, Vector(100, 50))
+        self.assertFalse(replay_frame(game_state, window, frame))
+        self.assertEqual([], was_called)
+        self.assertEqual(30, game_state.clock.ticks)
+
+    def test_replay_with_loading_phase(self):
+        def run(game_state, frames_until_loaded, frames):
+            """
+            Ticks like GameState.tick, the map is loaded after the given number of frames in LOADING mode
+            """
+            game_state.mode = GameMode.LOADING
+            game_state.map_loader = Object()
+            game_state.map_loader.future = None
+            game_state.simulated = 0
+            loading_frames = []
+
+            def tick(_, dt):
+                game_state.clock.advance(dt)
+                if game_state.mode == GameMode.LOADING:
+                    loading_frames.append(dt)
+                    if len(loading_frames) == frames_until_loaded:
+                        game_state.mode = GameMode.GAME
+                    return
+                game_state.simulated += game_state.clock.run(lambda: None)
+
+            game_state.tick = tick
+            game_state.clean_up = lambda: None
+            return replay(game_state, create_window([]), frames)
+
+        dts = [0.013, 0.021, 0.017, 0.029, 0.011, 0.016, 0.023]
+        frames = [InputFrame(dt, GameMode.LOADING if index < 3 else GameMode.GAME, Vector(100, 50))
+                  for index, dt in enumerate(dts)]
+
+        # while recording the map took three frames to load, the replay waits for it in the first frame
+        recorded = create_game_state()
+        run(recorded, 3, frames)
+        replayed = create_game_state()
+        timings = run(replayed, 1, frames)
+
+        self.assertEqual(5, len(timings))
+        self.assertEqual(recorded.simulated, replayed.simulated)
+        self.assertEqual(recorded.clock.ticks, replayed.clock.ticks)
+        self.assertAlmostEqual(recorded.clock.accumulator, replayed.clock.accumulator)
+
+    def test_timing_report(self):
+        self.assertEqual("No frames were replayed", timing_report([]))
+        report = timing_report([0.001, 0.002, 0.003])
+        self.assertIn("frames: 3", report)
+        self.assertIn("max: 3.000ms", report)
@@ -0,0 +1,79 @@
+import unittest
+
+from tower_defense.game_types import TileType
+from tower_defense.helper import Vector
+from tower_defense.simulation import SimulationState
+from tower_defense.tiles.map_cache import MapTextureCache
+from tower_defense.tiles.tile_map import TileMap
+
+
+class MapTextureCacheTest(unittest.TestCase):
+    def test_level_of_detail(self):
+        self.assertEqual(0, MapTextureCache.level_of_detail(2))
+        self.assertEqual(0, MapTextureCache.level_of_detail(1))
+        self.assertEqual(0, MapTextureCache.level_of_detail(0.6))
+        self.assertEqual(1, MapTextureCache.level_of_detail(0.5))
+        self.assertEqual(3, MapTextureCache.level_of_detail(0.1))
+
+    def test_texture_range(self):
+        cache = MapTextureCache()
+        tile_map = TileMap()
+        self.assertEqual(((0, 0), (0, 0)), cache.texture_range(tile_map, 0, Vector(-50, -50), Vector(1024, 1024)))
+        self.assertEqual(((0, 0), (1, 0)), cache.texture_range(tile_map, 0, Vector(900, 0), Vector(100, 100)))
+        self.assertEqual(((-1, -1), (0, 0)), cache.texture_range(tile_map, 0, Vector(-100, -100), Vector(100, 100)))
+        self.assertEqual(((0, 0), (0, 0)), cache.texture_range(tile_map, 1, Vector(900, 0), Vector(100, 100)))
+
+    def test_visible_textures(self):
+        cache = MapTextureCache()
+        state = SimulationState()
+        state.tile_map.max_tiles = Vector(30, 12)
+        state.window_size = Vector(1280, 720)
+        self.assertEqual([(0, 0, 0), (0, 1, 0)], cache.visible_textures(state, state.tile_map))
+
+        state.world_offset = Vector(-2500, -700)
+        self.assertEqual([(0, 2, 0), (0, 2, 1), (0, 3, 0), (0, 3, 1)], cache.visible_textures(state, state.tile_map))
+
+        state.world_offset = Vector(-5000, 0)
+        self.assertEqual([], cache.visible_textures(state, state.tile_map))
+
+    def test_visible_textures_zoomed_out(self):
+        cache = MapTextureCache()
+        state = SimulationState()
+        state.tile_map.max_tiles = Vector(30, 12)
+        state.window_size = Vector(1280, 720)
+        state.zoom = 0.25
+        self.assertEqual([(2, 0, 0)], cache.visible_textures(state, state.tile_map))
+
+    def test_invalidate(self):
+        cache = MapTextureCache()
+        tile_map = TileMap()
+        cache.textures[(0, 0, 0)] = 'texture'
+        cache.textures[(0, 1, 0)] = 'texture'
+        cache.textures[(0, 1, 1)] = 'texture'
+        cache.textures[(1, 0, 0)] = 'texture'
+        cache.textures[(1, 1, 1)] = 'texture'
+        cache.invalidate(tile_map, Vector(900, 0), Vector(100, 100))
+        self.assertEqual([(0, 1, 1), (1, 1, 1)], list(cache.textures))
+
+    def test_tile_blocks(self):
+        cache = MapTextureCache()
+        tile_map = TileMap()
+        tile_map.max_tiles = Vector(100, 20)
+        tile_map.tiles = TileMap.generate_tiles(tile_map.max_tiles, tile_map.tile_size)
+        for x in range(100):
+            tile_map.tiles[(x, 3)].tile_type = TileType.PATH
+        tile_map.tiles[(0, 3)].tile_type = TileType.START
+        tile_map.tiles[(99, 3)].tile_type = TileType.FINISH
+
+        first, last, step, blocks = cache.tile_blocks(tile_map, (0, 0, 0))
+        self.assertEqual(((0, 0), (9, 9), 1), (first, last, step))
+        self.assertEqual(10, len(blocks))
+        self.assertEqual(TileType.START, blocks[(0, 3)])
+        self.assertEqual(TileType.PATH, blocks[(5, 3)])
+
+        first, last, step, blocks = cache.tile_blocks(tile_map, (5, 0, 0))
+        self.assertEqual(((0, 0), (99, 19), 4), (first, last, step))
+        self.assertEqual(25, len(blocks))
+        self.assertEqual(TileType.START, blocks[(0, 0)])
+        self.assertEqual(TileType.PATH, blocks[(12, 0)])
+        self.assertEqual(TileType.FINISH, blocks[(24, 0)])
@@ -0,0 +1,45 @@
+import unittest
+
+from tower_defense.game_types import TileType
+from tower_defense.tiles.map_loader import MapLoader
+from tower_defense.tiles.tile_map import TileMap, GameTileMap
+
+test_map_path = "./tower_defense/res/maps/test.map"
+
+
+class MapLoaderTest(unittest.TestCase):
+    def test_start(self):
+        map_loader = MapLoader()
+        self.assertFalse(map_loader.loading)
+
+        map_loader.start(test_map_path + " ", GameTileMap)
+        self.assertTrue(map_loader.loading)
+        self.assertEqual(test_map_path, map_loader.path)
+
+        map_loader.future.result()
+        self.assertTrue(map_loader.done)
+        self.assertEqual(1.0, map_loader.progress)
+
+        tile_map = map_loader.result()
+        self.assertEqual(GameTileMap, type(tile_map))
+        self.assertEqual(test_map_path, tile_map.path)
+        self.assertEqual(tile_map.max_tiles.x * tile_map.max_tiles.y, len(tile_map.tiles))
+        self.assertFalse(map_loader.loading)
+
+    def test_load(self):
+        map_loader = MapLoader()
+        tile_map = map_loader.load(test_map_path, TileMap)
+        self.assertEqual("Done", map_loader.stage)
+        for tile in tile_map.tiles.values():
+            self.assertEqual(tile_map.tile_size, tile.size)
+            if tile.tile_type == TileType.BUILDING_GROUND:
+                self.assertEqual([], tile.directions)
+
+    def test_result_failed(self):
+        map_loader = MapLoader()
+        self.assertIsNone(map_loader.result())
+
+        map_loader.start("does_not_exist.map")
+        map_loader.future.exception()
+        self.assertIsNone(map_loader.result())
+        self.assertFalse(map_loader.loading)
@@ -0,0 +1,42 @@
+import unittest
+
+from tower_defense.game_types import TileType
+from tower_defense.helper import MouseClick, Vector
+from tower_defense.simulation import SimulationState
+from tower_defense.user_interface.minimap import Minimap, density_grid
+
+
+class DensityGridTest(unittest.TestCase):
+    def test_density_grid(self):
+        positions = [Vector(10, 10), Vector(90, 20), Vector(110, 10), Vector(50, 250)]
+        self.assertEqual({(0, 0): 2, (1, 0): 1, (0, 2): 1}, density_grid(positions, 100))
+        self.assertEqual({}, density_grid([], 100))
+
+
+class MinimapTest(unittest.TestCase):
+    def test_render_tiles(self):
+        state = SimulationState()
+        state.tile_map.tiles[(0, 0)].tile_type = TileType.START
+        minimap = Minimap(max_size=100)
+        minimap.render_tiles(state.tile_map)
+        self.assertEqual(Vector(100, 100), minimap.size)
+        self.assertEqual(state.tile_map.revision, minimap.revision)
+        self.assertIs(state.tile_map.tiles, minimap.tiles)
+
+        revision = state.tile_map.revision
+        state.tile_map.tile_changed((0, 0))
+        self.assertEqual(revision + 1, state.tile_map.revision)
+
+    def test_jump(self):
+        state = SimulationState()
+        state.window_size = Vector(1000, 500)
+        minimap = Minimap(max_size=100)
+        minimap.render_tiles(state.tile_map)
+        minimap.position = Vector(900, -400)
+
+        click = MouseClick()
+        # 20 pixels from the left and 30 pixels from the bottom of the minimap
+        click.position = Vector(920, -470)
+        self.assertTrue(minimap.is_clicked(click))
+        minimap.jump(state, click)
+        self.assertEqual(Vector(200, 300), state.window_to_world_space(Vector(500, 250)))
@@ -0,0 +1,23 @@
+import unittest
+
+from tower_defense.entities.route import Route
+from tower_defense.helper import Vector
+
+
+class RouteTest(unittest.TestCase):
+    def test_lengths(self):
+        route = Route([(0, 0), (1, 0), (1, 1)], [(50, 50), (150, 50), (150, 150)])
+        self.assertEqual([0, 100, 200], route.lengths)
+        self.assertEqual(200, route.length)
+
+    def test_positions_at(self):
+        route = Route([(0, 0), (1, 0), (1, 1)], [(50, 50), (150, 50), (150, 150)])
+        positions = route.positions_at([150, 20, 500, -10], [0, 0, 0, 0])
+        self.assertEqual([Vector(150, 100), Vector(70, 50), Vector(150, 150), Vector(50, 50)], positions)
+
+        self.assertEqual(Vector(70, 75), route.position_at(20, 25))
+        self.assertEqual(Vector(125, 100), route.position_at(150, 25))
+
+    def test_positions_at_single_point(self):
+        route = Route([(0, 0)], [(50, 50)])
+        self.assertEqual([Vector(50, 50)], route.positions_at([10], [5]))
@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+
+from tower_defense.entities.entity_manager import GameEntityManager, EditorEntityManager
+from tower_defense.game_types import BuildingType, EntityType, TargetingMode, TileType
+from tower_defense.helper import Vector
+from tower_defense.simulation import SimulationState
+from tower_defense.snapshot import SnapshotHistory, take_snapshot, restore_snapshot
+from tower_defense.tiles.chunks import create_chunked_map
+from tower_defense.tiles.map_loader import MapLoader
+from tower_defense.tiles.tile_map import GameTileMap
+
+
+def create_state():
+    state = SimulationState()
+    state.tile_map = MapLoader().load('./tower_defense/res/maps/test.map', GameTileMap)
+    state.entity_manager = GameEntityManager()
+    state.building_manager.spawn_building(state, (5, 5), BuildingType.DRILL)
+    state.building_manager.spawn_building(state, (2, 3), BuildingType.LASER)
+    state.entity_manager.next_wave()
+    for _ in range(400):
+        state.simulate()
+    return state
+
+
+def positions(state):
+    return [(entity.position.x, entity.position.y, entity.health) for entity in state.entity_manager.entities]
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_restore(self):
+        state = create_state()
+        state.building_manager.shoot(Vector(100, 100), Vector(1, 0))
+        state.building_manager.buildings[(2, 3)].targeting = TargetingMode.STRONGEST
+        snapshot = take_snapshot(state)
+
+        restored = SimulationState()
+        restore_snapshot(restored, snapshot)
+        self.assertEqual(snapshot, take_snapshot(restored))
+
+        self.assertEqual(state.tile_map.tiles, restored.tile_map.tiles)
+        self.assertEqual(state.tile_map.max_tiles, restored.tile_map.max_tiles)
+        self.assertEqual(state.tile_map.path, restored.tile_map.path)
+        self.assertEqual(GameEntityManager, type(restored.entity_manager))
+        self.assertEqual(state.entity_manager.wave, restored.entity_manager.wave)
+        self.assertEqual(state.entity_manager.directions_graph, restored.entity_manager.directions_graph)
+        self.assertEqual(positions(state), positions(restored))
+        self.assertEqual(state.building_manager.buildings.keys(), restored.building_manager.buildings.keys())
+        self.assertEqual(TargetingMode.STRONGEST, restored.building_manager.buildings[(2, 3)].targeting)
+        self.assertEqual(1, len(restored.building_manager.bullets))
+        self.assertEqual(450, restored.building_manager.gold)
+        self.assertEqual(int, type(restored.building_manager.gold))
+
+    def test_restore_chunked_map(self):
+        handle, path = tempfile.mkstemp(suffix='.map')
+        os.close(handle)
+        try:
+            create_chunked_map(path, Vector(64, 64), chunk_size=8)
+            state = SimulationState()
+            state.tile_map = MapLoader().load(path, GameTileMap)
+            state.tile_map.set_tile_types({(0, 0): TileType.START, (1, 0): TileType.PATH, (2, 0): TileType.FINISH,
+                                           (20, 20): TileType.PATH})
+            tiles = state.tile_map.tiles
+            self.assertEqual({(0, 0), (2, 2)}, tiles.dirty)
+            self.assertEqual([(1, 0)], tiles[(0, 0)].directions)
+
+            loaded = list(tiles.loaded)
+            snapshot = take_snapshot(state)
+            self.assertEqual(loaded, list(tiles.loaded))
+
+            restored = SimulationState()
+            restore_snapshot(restored, snapshot)
+            restored_tiles = restored.tile_map.tiles
+            self.assertTrue(restored.tile_map.is_chunked)
+            self.assertEqual({(0, 0), (2, 2)}, restored_tiles.dirty)
+            self.assertEqual(tiles.walkable, restored_tiles.walkable)
+            self.assertEqual(TileType.PATH, restored_tiles[(20, 20)].tile_type)
+            self.assertEqual(TileType.BUILDING_GROUND, restored_tiles[(40, 40)].tile_type)
+            self.assertEqual(snapshot, take_snapshot(restored))
+        finally:
+            os.remove(path)
+
+    def test_restore_is_deterministic(self):
+        state = create_state()
+        snapshot = take_snapshot(state, include_tile_map=False)
+        for _ in range(300):
+            state.simulate()
+
+        restored = create_state()
+        for _ in range(100):
+            restored.simulate()
+        restore_snapshot(restored, snapshot)
+        for _ in range(300):
+            restored.simulate()
+
+        self.assertEqual(positions(state), positions(restored))
+        self.assertEqual(state.player_health, restored.player_health)
+        self.assertEqual(state.building_manager.damage_dealt, restored.building_manager.damage_dealt)
+
+    def test_restore_editor_entity_manager(self):
+        state = SimulationState()
+        state.entity_manager = EditorEntityManager()
+        state.entity_manager.should_spawn = False
+        state.entity_manager.spawn_entity(state, EntityType.SMALL_BOULDER, Vector(10, 10), path_side=-1)
+
+        restored = SimulationState()
+        restore_snapshot(restored, take_snapshot(state))
+        self.assertFalse(restored.entity_manager.should_spawn)
+        self.assertEqual(-1, restored.entity_manager.entities[0].path_side)
+
+    def test_restore_invalid(self):
+        self.assertRaises(ValueError, restore_snapshot, SimulationState(), b'TDSX\x01\x00\x00')
+
+
+class SnapshotHistoryTest(unittest.TestCase):
+    def test_push_pop(self):
+        history = SnapshotHistory(capacity=2)
+        self.assertIsNone(history.pop())
+
+        history.push(1, b'1')
+        history.push(2, b'2')
+        history.push(3, b'3')
+        self.assertEqual(2, len(history))
+        self.assertEqual((3, b'3'), history.pop())
+        self.assertEqual((2, b'2'), history.pop())
+        self.assertEqual(0, len(history))
@@ -0,0 +1,32 @@
+import unittest
+
+from tower_defense.game_types import BuildingType, EntityType
+from tower_defense.helper import get_stats_path
+from tower_defense.stats import StatTables, lookup
+
+
+class StatTablesTest(unittest.TestCase):
+    def test_load(self):
+        tables = StatTables()
+        tables.load(get_stats_path())
+        self.assertEqual(150, tables.building_range[BuildingType.DRILL.value])
+        self.assertIsNone(tables.building_range[BuildingType.PLATFORM.value])
+        self.assertEqual(100, tables.entity_health[EntityType.LARGE_BOULDER.value])
+
+    def test_update(self):
+        tables = StatTables()
+        tables.update({'buildings': {'DRILL': {'range': 200, 'speed': 1}, 'TOWER': {'range': 1}},
+                       'unknown': {}})
+        self.assertEqual(200, tables.building_range[BuildingType.DRILL.value])
+        self.assertEqual({'DRILL': {'range': 200}}, tables.data['buildings'])
+
+        tables.update({'buildings': {'DRILL': {'cost': 10}}})
+        self.assertEqual(200, tables.building_range[BuildingType.DRILL.value])
+        self.assertEqual(10, tables.building_cost[BuildingType.DRILL.value])
+
+    def test_lookup(self):
+        values = [1, None]
+        self.assertEqual(1, lookup(values, BuildingType.LASER))
+        self.assertEqual(5, lookup(values, BuildingType.HAMMER, 5))
+        self.assertEqual(5, lookup(values, BuildingType.PLATFORM, 5))
+        self.assertIsNone(lookup(values, -1))
@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pyglet
+
+from tower_defense.helper import get_res_path
+from tower_defense.texture_cache import build_cache, load_cache
+
+
+class TextureCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        shutil.copy(os.path.join(get_res_path(), 'ring.png'), self.directory)
+        shutil.copy(os.path.join(get_res_path(), 'arrow.png'), self.directory)
+        self.files = {'ring': 'ring.png', 'arrow': 'arrow.png'}
+        self.cache_path = os.path.join(self.directory, 'textures.cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load_cache(self):
+        build_cache(self.directory, self.files, self.cache_path)
+        images = load_cache(self.directory, self.files, self.cache_path)
+        self.assertEqual({'ring', 'arrow'}, set(images))
+
+        expected = pyglet.image.load(os.path.join(self.directory, 'ring.png'))
+        self.assertEqual((expected.width, expected.height), (images['ring'].width, images['ring'].height))
+        self.assertEqual(expected.get_image_data().get_data('RGBA', expected.width * 4),
+                         bytes(images['ring'].get_data('RGBA', images['ring'].width * 4)))
+
+    def test_load_cache_changed_source(self):
+        build_cache(self.directory, self.files, self.cache_path)
+        shutil.copy(os.path.join(get_res_path(), 'tower.png'), os.path.join(self.directory, 'arrow.png'))
+        images = load_cache(self.directory, self.files, self.cache_path)
+        self.assertEqual({'ring'}, set(images))
+
+    def test_load_cache_missing(self):
+        self.assertEqual({}, load_cache(self.directory, self.files, self.cache_path))
+        with open(self.cache_path, 'wb') as f:
+            f.write(b'TDTC\x02\x00\x00\x00')
+        self.assertEqual({}, load_cache(self.directory, self.files, self.cache_path))
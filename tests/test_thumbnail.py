@@ -0,0 +1,113 @@
+import os
+import pickle
+import tempfile
+import unittest
+
+from tower_defense.game_types import TileType
+from tower_defense.helper import Vector
+from tower_defense.tiles.thumbnail import render_thumbnail, load_thumbnail, thumbnail_path, prune_thumbnails, \
+    ThumbnailCache, TILE_COLORS
+from tower_defense.tiles.tile import Tile
+
+
+def write_map(path, tiles, max_tiles):
+    with open(path, "wb") as f:
+        pickle.dump((tiles, max_tiles), f)
+
+
+class RenderThumbnailTest(unittest.TestCase):
+    def test_render_thumbnail(self):
+        tiles = {
+            (0, 0): Tile(Vector(0, 0), Vector(100, 100), TileType.START),
+            (1, 0): Tile(Vector(1, 0), Vector(100, 100), TileType.FINISH),
+        }
+        width, height, data = render_thumbnail(tiles, Vector(2, 1), max_size=4)
+        self.assertEqual(4, width)
+        self.assertEqual(2, height)
+        self.assertEqual(4 * 2 * 3, len(data))
+
+        start = bytes(TILE_COLORS[TileType.START])
+        finish = bytes(TILE_COLORS[TileType.FINISH])
+        self.assertEqual(start * 2 + finish * 2, data[:12])
+        self.assertEqual(start * 2 + finish * 2, data[12:])
+
+
+class LoadThumbnailTest(unittest.TestCase):
+    def test_load_thumbnail_is_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            map_path = os.path.join(directory, "test.map")
+            tiles = {(0, 0): Tile(Vector(0, 0), Vector(100, 100), TileType.PATH)}
+            write_map(map_path, tiles, Vector(1, 1))
+
+            expected = load_thumbnail(map_path)
+            cache_files = os.listdir(os.path.dirname(thumbnail_path(map_path, "")))
+            self.assertEqual(1, len(cache_files))
+
+            # the cached thumbnail is used, even though the map can't be decoded anymore
+            cache_path = os.path.join(os.path.dirname(thumbnail_path(map_path, "")), cache_files[0])
+            with open(cache_path, "rb") as f:
+                cached = f.read()
+            self.assertTrue(cached.endswith(expected[2]))
+            self.assertEqual(expected, load_thumbnail(map_path))
+
+
+class PruneThumbnailsTest(unittest.TestCase):
+    def test_prune_thumbnails(self):
+        with tempfile.TemporaryDirectory() as directory:
+            kept_path = os.path.join(directory, "kept.map")
+            deleted_path = os.path.join(directory, "deleted.map")
+            for index, map_path in enumerate((kept_path, deleted_path)):
+                tiles = {(index, 0): Tile(Vector(index, 0), Vector(100, 100), TileType.PATH)}
+                write_map(map_path, tiles, Vector(2, 1))
+                load_thumbnail(map_path)
+            thumbnail_directory = os.path.dirname(thumbnail_path(kept_path, ""))
+            self.assertEqual(2, len(os.listdir(thumbnail_directory)))
+
+            os.remove(deleted_path)
+            prune_thumbnails(directory)
+            self.assertEqual(1, len(os.listdir(thumbnail_directory)))
+
+            # the cached thumbnail of the kept map is still used
+            self.assertEqual(load_thumbnail(kept_path), load_thumbnail(kept_path))
+            self.assertEqual(1, len(os.listdir(thumbnail_directory)))
+
+
+class ThumbnailCacheTest(unittest.TestCase):
+    def test_get(self):
+        with tempfile.TemporaryDirectory() as directory:
+            map_path = os.path.join(directory, "test.map")
+            tiles = {(0, 0): Tile(Vector(0, 0), Vector(100, 100), TileType.PATH)}
+            write_map(map_path, tiles, Vector(1, 1))
+
+            cache = ThumbnailCache()
+            self.assertIsNone(cache.get(map_path))
+            cache.pending[map_path].result()
+            image = cache.get(map_path)
+            self.assertIsNotNone(image)
+            self.assertIs(image, cache.get(map_path))
+
+    def test_get_changed_map(self):
+        with tempfile.TemporaryDirectory() as directory:
+            map_path = os.path.join(directory, "test.map")
+            tiles = {(0, 0): Tile(Vector(0, 0), Vector(100, 100), TileType.PATH)}
+            write_map(map_path, tiles, Vector(1, 1))
+
+            cache = ThumbnailCache()
+            cache.get(map_path)
+            cache.pending[map_path].result()
+            image = cache.get(map_path)
+
+            tiles[(0, 0)].tile_type = TileType.FINISH
+            write_map(map_path, tiles, Vector(1, 1))
+            stat = os.stat(map_path)
+            os.utime(map_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            self.assertIsNone(cache.get(map_path))
+            cache.pending[map_path].result()
+            changed_image = cache.get(map_path)
+            self.assertIsNotNone(changed_image)
+            self.assertIsNot(image, changed_image)
+
+    def test_get_missing_map(self):
+        cache = ThumbnailCache()
+        self.assertIsNone(cache.get("does_not_exist.map"))
+        self.assertEqual(0, len(cache.pending))
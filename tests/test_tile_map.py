@@ -4,7 +4,7 @@ from unittest import TestCase
 import os
 
 from tower_defense.game_state import GameState
-from tower_defense.game_types import TileType, GameMode
+from tower_defense.game_types import EditorTool, TileType, GameMode
 from tower_defense.helper import Vector, MouseClick
 from tower_defense.tiles.tile_map import Tile, TileMap, EditorTileMap, GameTileMap
 
@@ -140,6 +140,156 @@ class TileMapTest(TestCase):
         for tile in tiles:
             self.assertEqual(tiles[tile], tile_map.tiles[tile])
 
+    def test_path_finding_multiple_starts_and_finishes(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(1, 0)].tile_type = TileType.PATH
+        tile_map.tiles[(2, 0)].tile_type = TileType.FINISH
+        tile_map.tiles[(1, 1)].tile_type = TileType.PATH
+        tile_map.tiles[(1, 2)].tile_type = TileType.START
+        tile_map.tiles[(0, 2)].tile_type = TileType.PATH
+        tile_map.tiles[(0, 3)].tile_type = TileType.PATH
+        tile_map.tiles[(0, 4)].tile_type = TileType.FINISH
+        # dead end that isn't on the way from a START tile to a FINISH tile
+        tile_map.tiles[(3, 0)].tile_type = TileType.PATH
+        tile_map.path_finding()
+
+        self.assertEqual([(1, 0)], tile_map.tiles[(0, 0)].directions)
+        self.assertEqual([(1, 0)], tile_map.tiles[(1, 0)].directions)
+        # both exits are three steps away
+        self.assertEqual([(0, -1), (-1, 0)], tile_map.tiles[(1, 2)].directions)
+        self.assertEqual([(0, -1)], tile_map.tiles[(1, 1)].directions)
+        self.assertEqual([(0, 1)], tile_map.tiles[(0, 2)].directions)
+        self.assertEqual([(0, 1)], tile_map.tiles[(0, 3)].directions)
+        self.assertEqual([], tile_map.tiles[(2, 0)].directions)
+        self.assertEqual([], tile_map.tiles[(3, 0)].directions)
+
+    def test_path_distance(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(1, 0)].tile_type = TileType.PATH
+        tile_map.tiles[(2, 0)].tile_type = TileType.FINISH
+        tile_map.path_finding()
+
+        self.assertEqual({(0, 0): 2, (1, 0): 1, (2, 0): 0}, tile_map.distances)
+        self.assertEqual(200, tile_map.path_distance(Vector(50, 50), (0, 0)))
+        self.assertEqual(120, tile_map.path_distance(Vector(130, 50), (1, 0)))
+        self.assertEqual(float('inf'), tile_map.path_distance(Vector(50, 550), (0, 5)))
+
+    def test_path_layer(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(1, 0)].tile_type = TileType.PATH
+        tile_map.tiles[(5, 5)].tile_type = TileType.FINISH
+        self.assertEqual([tile_map.tiles[(1, 0)]], tile_map.path_layer((1, 0), (4, 4)))
+        self.assertEqual(3, len(tile_map.path_layer((-1, -1), (20, 20))))
+
+    def test_can_build_free_build(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(9, 9)].tile_type = TileType.FINISH
+        self.assertTrue(tile_map.can_build((0, 0)))
+
+        tile_map.free_build = True
+        tile_map.set_blocked([])
+        self.assertTrue(tile_map.can_build((1, 0)))
+        self.assertTrue(tile_map.can_build((0, 1)))
+        self.assertFalse(tile_map.can_build((0, 0)))
+        self.assertFalse(tile_map.can_build((9, 9)))
+        self.assertFalse(tile_map.can_build((10, 10)))
+
+        tile_map.block((1, 0))
+        self.assertFalse(tile_map.can_build((1, 0)))
+        self.assertFalse(tile_map.can_build((0, 1)))
+
+    def test_block_free_build(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(2, 0)].tile_type = TileType.FINISH
+        tile_map.free_build = True
+        tile_map.set_blocked([])
+        self.assertEqual([(1, 0)], tile_map.tiles[(0, 0)].directions)
+
+        was_called = []
+        path_finding = tile_map.path_finding
+
+        def dummy():
+            was_called.append(0)
+            path_finding()
+
+        tile_map.path_finding = dummy
+        revision = tile_map.revision
+        tile_map.block((5, 5))
+        self.assertEqual(0, len(was_called))
+        self.assertEqual(revision + 1, tile_map.revision)
+
+        tile_map.block((1, 0))
+        self.assertEqual(0, len(was_called))
+        self.assertEqual([(0, 1)], tile_map.tiles[(0, 0)].directions)
+        self.assertEqual([], tile_map.tiles[(1, 0)].directions)
+        self.assertEqual(4, tile_map.distances[(0, 0)])
+        self.assertNotIn((1, 0), tile_map.distances)
+
+    def test_block_free_build_distances(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(9, 0)].tile_type = TileType.START
+        tile_map.tiles[(5, 9)].tile_type = TileType.FINISH
+        tile_map.free_build = True
+        tile_map.set_blocked([])
+
+        # walls that are not in the way of the flow field at first, they still change the distances behind them
+        for tile_index in [(2, 1), (3, 1), (4, 1), (5, 1), (6, 1), (7, 1), (7, 2), (7, 3), (4, 8), (5, 8), (6, 8),
+                           (4, 6), (5, 6), (6, 6), (3, 6), (3, 7), (3, 8), (1, 3), (0, 3), (8, 5), (9, 5)]:
+            if not tile_map.can_build(tile_index):
+                continue
+            tile_map.block(tile_index)
+            distances = dict(tile_map.distances)
+            directions = {index: tile.directions for index, tile in tile_map.tiles.items()}
+
+            tile_map.path_finding()
+            self.assertEqual(tile_map.distances, distances)
+            self.assertEqual({index: tile.directions for index, tile in tile_map.tiles.items()}, directions)
+
+    def test_find_blocking_tiles(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(4, 0)].tile_type = TileType.FINISH
+        tile_map.tiles[(9, 0)].tile_type = TileType.FINISH
+        tile_map.free_build = True
+        # only the first row is free
+        tile_map.set_blocked(index for index in tile_map.tiles if index[1] > 0)
+        # the second FINISH tile can only be reached through the first one
+        self.assertEqual({(1, 0), (2, 0), (3, 0), (4, 0)}, tile_map.find_blocking_tiles())
+
+        # there is always a way around a single tile with two free rows
+        tile_map.set_blocked(index for index in tile_map.tiles if index[1] > 1)
+        self.assertEqual(set(), tile_map.find_blocking_tiles())
+
+    def test_convert(self):
+        tile_map = TileMap()
+        tile_map.path = "test.map"
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.tiles[(1, 0)].tile_type = TileType.FINISH
+        tile_map.path_finding()
+
+        game_tile_map = tile_map.convert(GameTileMap)
+        self.assertEqual(GameTileMap, type(game_tile_map))
+        self.assertIs(tile_map.tiles, game_tile_map.tiles)
+        self.assertEqual("test.map", game_tile_map.path)
+        self.assertEqual([(1, 0)], game_tile_map.tiles[(0, 0)].directions)
+        self.assertIsNone(game_tile_map.highlighted_tile)
+
+        game_tile_map.tiles[(2, 2)].highlighted = True
+        game_tile_map.highlighted_tile = (2, 2)
+        editor_tile_map = game_tile_map.convert(EditorTileMap)
+        self.assertEqual(EditorTileMap, type(editor_tile_map))
+        self.assertIs(tile_map.tiles, editor_tile_map.tiles)
+
+        game_tile_map = editor_tile_map.convert(GameTileMap)
+        self.assertIsNone(game_tile_map.highlighted_tile)
+        self.assertFalse(game_tile_map.tiles[(2, 2)].highlighted)
+
     def test_has_start_node(self):
         tile_map = TileMap()
         self.assertFalse(tile_map.has_start_node)
@@ -147,6 +297,14 @@ class TileMapTest(TestCase):
         tile_map.tiles[(0, 0)].tile_type = TileType.START
         self.assertTrue(tile_map.has_start_node)
 
+    def test_path_tiles_free_build(self):
+        tile_map = TileMap()
+        tile_map.tiles[(0, 0)].tile_type = TileType.START
+        tile_map.free_build = True
+        tile_map.set_blocked([(1, 1)])
+        self.assertEqual(99, len(tile_map.walkable_tiles()))
+        self.assertEqual([(0, 0)], list(tile_map.path_tiles()))
+
     def test_has_finish_node(self):
         tile_map = TileMap()
         self.assertFalse(tile_map.has_finish_node)
@@ -174,6 +332,61 @@ class EditorTileMapTest(TestCase):
         self.assertTrue(actual)
         self.assertEqual(TileType.PATH, tile_map.tiles[(0, 0)].tile_type)
 
+    def test_set_tile_types(self):
+        tile_map = EditorTileMap()
+        was_called = []
+        tile_map.path_finding = lambda: was_called.append(0)
+        revision = tile_map.revision
+
+        previous = tile_map.set_tile_types({(0, 0): TileType.START, (1, 0): TileType.PATH,
+                                            (2, 0): TileType.BUILDING_GROUND, (20, 20): TileType.PATH})
+        self.assertEqual({(0, 0): TileType.BUILDING_GROUND, (1, 0): TileType.BUILDING_GROUND}, previous)
+        self.assertEqual(TileType.START, tile_map.tiles[(0, 0)].tile_type)
+        self.assertEqual(1, len(was_called))
+        self.assertEqual(revision + 1, tile_map.revision)
+
+        self.assertEqual({}, tile_map.set_tile_types({(0, 0): TileType.START}))
+        self.assertEqual(1, len(was_called))
+
+    def test_brush(self):
+        tile_map = EditorTileMap()
+        tile_map.tool = EditorTool.BRUSH
+        click = MouseClick()
+        click.position = Vector(50, 50)
+        click.button = 1
+        self.assertTrue(tile_map.mouse_click_handler(None, click))
+        path = {index for index, tile in tile_map.tiles.items() if tile.tile_type == TileType.PATH}
+        self.assertEqual({(0, 0), (0, 1), (1, 0), (1, 1)}, path)
+
+    def test_rectangle(self):
+        tile_map = EditorTileMap()
+        tile_map.tool = EditorTool.RECTANGLE
+        tile_map.paint_type = TileType.FINISH
+        click = MouseClick()
+        click.position = Vector(350, 150)
+        click.button = 1
+        self.assertTrue(tile_map.mouse_click_handler(None, click))
+        self.assertEqual((3, 1), tile_map.rectangle_start)
+        self.assertEqual(TileType.BUILDING_GROUND, tile_map.tiles[(3, 1)].tile_type)
+
+        click.position = Vector(150, 250)
+        self.assertTrue(tile_map.mouse_click_handler(None, click))
+        self.assertIsNone(tile_map.rectangle_start)
+        finish = {index for index, tile in tile_map.tiles.items() if tile.tile_type == TileType.FINISH}
+        self.assertEqual({(x, y) for x in range(1, 4) for y in range(1, 3)}, finish)
+
+    def test_flood_fill(self):
+        tile_map = EditorTileMap()
+        for y in range(10):
+            tile_map.tiles[(4, y)].tile_type = TileType.PATH
+        tile_map.paint_type = TileType.START
+        fill = tile_map.flood_fill((0, 0))
+        self.assertEqual({(x, y) for x in range(4) for y in range(10)}, set(fill))
+        self.assertEqual(TileType.START, fill[(0, 0)])
+
+        tile_map.paint_type = TileType.PATH
+        self.assertEqual({}, tile_map.flood_fill((4, 0)))
+
     def test_render(self):
         game_state = GameState()
         was_called = []
@@ -1,27 +1,65 @@
+import argparse
 from datetime import datetime
 
-import pyglet
+from tower_defense.helper import StageTimer
+
+startup_timer = StageTimer()
+
+import pyglet  # noqa: E402
 
 # using explicit import to make pyinstaller work
-from tower_defense import game_state
-from tower_defense import helper
-from tower_defense import hot_reload
+from tower_defense import game_state  # noqa: E402
+from tower_defense import helper  # noqa: E402
+from tower_defense.game_types import GameMode  # noqa: E402
 
-module_whitelist = ['helper', 'graphics', 'game_types', 'game_state',
+module_whitelist = ['helper', 'graphics', 'game_types', 'game_clock', 'simulation', 'game_state',
                     'user_interface.menu', 'user_interface.components',
                     'user_interface.dialogs', 'user_interface.user_interface',
                     'tiles.tile_map', 'tiles.tile',
                     'entities.bullet', 'entities.entity_manager', 'entities.entity',
                     'buildings.building_manager', 'buildings.building']
 
+# F5 saves a snapshot of the running game to this file, start from it with --snapshot
+QUICKSAVE_PATH = 'quicksave.snapshot'
+
+parser = argparse.ArgumentParser(description="Tower Defense")
+parser.add_argument('--record', metavar='FILE', help="record the input of every frame into FILE")
+parser.add_argument('--snapshot', metavar='FILE', help="start the game from this snapshot")
+parser.add_argument('--hot-reload', action='store_true', help="reload modified modules while the game is running")
+args = parser.parse_args()
+startup_timer.mark("imports")
+
+# the optional features are only imported when they are used, so that they don't slow down the startup
+recorder = None
+if args.record:
+    from tower_defense import input_recording
+    recorder = input_recording.InputRecorder()
+
+watcher = None
+if args.hot_reload:
+    from tower_defense import hot_reload
+    watcher = hot_reload.ModuleWatcher(list(map(lambda m: f'tower_defense.{m}', module_whitelist)))
+    watcher.start()
+
 num_frames = 0
 start_time = datetime.now()
+# real time that passed since the last frame was drawn
+frame_time = 0.0
 
 window = pyglet.window.Window(width=1280, height=720, resizable=True)
 window.set_caption("Tower Defense")
+startup_timer.mark("window")
 
 gs = game_state.GameState()
-gs.init()
+# textures are decoded in the background while the main menu is shown
+gs.init(lazy=True)
+if recorder:
+    gs.clock.turbo_steps = input_recording.TURBO_STEPS
+if args.snapshot:
+    from tower_defense import snapshot
+    snapshot.load_snapshot(gs, args.snapshot)
+    gs.mode = GameMode.GAME
+startup_timer.mark("game state")
 
 pyglet.gl.glEnable(pyglet.gl.GL_BLEND)
 pyglet.gl.glBlendFunc(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
@@ -32,6 +70,12 @@ def handle_key(symbol, modifiers, key_down):
 
     kp = gs.key_presses
 
+    if symbol == pyglet.window.key.F5:
+        if key_down and gs.mode == GameMode.GAME:
+            from tower_defense import snapshot
+            snapshot.save_snapshot(gs, QUICKSAVE_PATH)
+        return
+
     if symbol == pyglet.window.key.W:
         kp.up = key_down
     elif symbol == pyglet.window.key.S:
@@ -40,6 +84,10 @@ def handle_key(symbol, modifiers, key_down):
         kp.left = key_down
     elif symbol == pyglet.window.key.D:
         kp.right = key_down
+    elif symbol == pyglet.window.key.Q:
+        kp.zoom_out = key_down
+    elif symbol == pyglet.window.key.E:
+        kp.zoom_in = key_down
 
     if symbol == pyglet.window.key.BACKSPACE:
         kp.back_space = key_down
@@ -94,20 +142,37 @@ def on_mouse_press(x, y, button, modifiers):
     gs.mouse_clicks.append(mouse_click)
 
 
+def update(dt):
+    global frame_time
+    frame_time += dt
+
+
 @window.event
-def on_draw(_=None):
-    whitelist = list(map(lambda m: f'tower_defense.{m}', module_whitelist))
-    # hot_reload.reload_all(whitelist, debug=False)
+def on_draw():
+    global frame_time, startup_timer
+    if watcher:
+        watcher.reload_changed()
 
     window.clear()
 
-    gs.tick(window)
+    if recorder:
+        recorder.record(gs, helper.Vector(*window.get_size()), frame_time)
+    gs.tick(window, frame_time)
+    frame_time = 0.0
 
     gs.clean_up()
 
     show_average_time()
 
+    if startup_timer is not None:
+        startup_timer.mark("first frame")
+        print("Startup", startup_timer.report())
+        startup_timer = None
 
-pyglet.clock.schedule_interval(on_draw, 1 / 120.0)
+
+pyglet.clock.schedule_interval(update, 1 / 120.0)
 pyglet.clock.set_fps_limit(120)
 pyglet.app.run()
+
+if recorder:
+    recorder.save(args.record)
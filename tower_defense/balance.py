@@ -0,0 +1,188 @@
+"""
+Headless batch simulator for balancing the stats in res/stats.json.
+Runs one full game per combination of stat table variations in a process pool and writes the results as CSV.
+
+Example:
+    python -m tower_defense.balance tower_defense/res/maps/test.map --vary DRILL.range=100,150,200 \
+        --vary DRILL.cost=20,30 --layout DRILL,DRILL,HAMMER --output balance.csv
+"""
+import argparse
+import csv
+import itertools
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+import pyglet
+
+# the simulation never opens a window (this is also executed in every worker process)
+pyglet.options['shadow_window'] = False
+
+from . import stats  # noqa: E402
+from .buildings.building import Building  # noqa: E402
+from .entities.entity_manager import GameEntityManager  # noqa: E402
+from .game_types import BuildingType, TileType  # noqa: E402
+from .helper import Vector, get_stats_path  # noqa: E402
+from .simulation import SimulationState  # noqa: E402
+from .tiles.map_loader import MapLoader  # noqa: E402
+from .tiles.tile_map import GameTileMap  # noqa: E402
+
+# section, type name, stat name and the values to try
+Variation = Tuple[str, str, str, List[float]]
+
+
+def parse_variation(text: str) -> Variation:
+    """
+    Parses a variation like 'DRILL.range=100,150,200' or 'LARGE_BOULDER.health=50,100'
+    """
+    try:
+        key, values = text.split('=')
+        type_name, stat = key.split('.')
+        type_name = type_name.upper()
+        for section, (stat_type, stat_names) in stats.SECTIONS.items():
+            if type_name not in stat_type.__members__:
+                continue
+            if stat not in stat_names:
+                raise ValueError(f"Unknown stat {stat}, expected one of {', '.join(stat_names)}")
+            return section, type_name, stat, [float(value) for value in values.split(',')]
+        raise ValueError(f"Unknown type {type_name}")
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f"Invalid variation '{text}': {err}")
+
+
+def generate_variants(variations: List[Variation]) -> List[stats.StatData]:
+    """
+    :return: one stat table update for every combination of the given variations
+    """
+    variants = []
+    for values in itertools.product(*(variation[3] for variation in variations)):
+        variant: stats.StatData = {}
+        for (section, type_name, stat, _), value in zip(variations, values):
+            variant.setdefault(section, {}).setdefault(type_name, {})[stat] = value
+        variants.append(variant)
+    return variants
+
+
+def place_buildings(state: SimulationState, layout: List[BuildingType]):
+    """
+    Places the buildings one after the other on the free tile that covers the most path tiles.
+    """
+    tile_size = state.tile_map.tile_size
+    path_positions = [tile.world_position + tile_size / 2 for tile in state.tile_map.tiles.values()
+                      if tile.tile_type != TileType.BUILDING_GROUND]
+
+    for building_type in layout:
+        building_range = Building(Vector(), tile_size, building_type).range
+        candidates = [index for index, tile in state.tile_map.tiles.items()
+                      if tile.tile_type == TileType.BUILDING_GROUND and index not in state.building_manager.buildings]
+        if not candidates:
+            return
+
+        def covered_path_tiles(tile_index):
+            center = state.index_to_world_space(tile_index) + tile_size / 2
+            return sum(1 for position in path_positions if (position - center).length() < building_range)
+
+        state.building_manager.spawn_building(state, max(candidates, key=covered_path_tiles), building_type)
+
+
+def simulate_game(map_path: str, variant: stats.StatData, layout: List[BuildingType], max_waves: int = 10,
+                  max_wave_ticks: int = 120 * 120) -> Dict[str, float]:
+    """
+    Plays waves on the given map until the player dies or max_waves have been survived.
+    :param variant: changes to the default stat table
+    :param max_wave_ticks: waves that take longer than this are stopped (e.g. when entities get stuck)
+    """
+    stats.tables.load(get_stats_path())
+    stats.tables.update(variant)
+
+    state = SimulationState()
+    state.tile_map = MapLoader().load(map_path, GameTileMap)
+    state.entity_manager = GameEntityManager()
+    place_buildings(state, layout)
+
+    waves_survived = 0
+    ticks = 0
+    for _ in range(max_waves):
+        state.entity_manager.next_wave()
+        wave_ticks = 0
+        while state.entity_manager.wave_running or state.entity_manager.entities:
+            state.simulate()
+            wave_ticks += 1
+            if state.player_health <= 0 or wave_ticks >= max_wave_ticks:
+                break
+
+        ticks += wave_ticks
+        if state.player_health <= 0:
+            break
+        waves_survived += 1
+
+    result = {
+        'waves_survived': waves_survived,
+        'health_left': state.player_health,
+        'gold_left': state.building_manager.gold,
+        'buildings': len(state.building_manager.buildings),
+        'ticks': ticks,
+    }
+    for building_type in BuildingType:
+        result[f'damage_{building_type.name.lower()}'] = state.building_manager.damage_dealt.get(building_type, 0)
+    return result
+
+
+def run_variant(task: Tuple[str, stats.StatData, List[BuildingType], int, int]) -> Dict[str, float]:
+    map_path, variant, layout, max_waves, max_wave_ticks = task
+    row = {}
+    for section in variant:
+        for type_name in variant[section]:
+            for stat in variant[section][type_name]:
+                row[f'{type_name}.{stat}'] = variant[section][type_name][stat]
+    row.update(simulate_game(map_path, variant, layout, max_waves, max_wave_ticks))
+    return row
+
+
+def run_sweep(map_path: str, variants: List[stats.StatData], layout: List[BuildingType], max_waves: int = 10,
+              max_wave_ticks: int = 120 * 120, workers: int = None) -> List[Dict[str, float]]:
+    tasks = [(map_path, variant, layout, max_waves, max_wave_ticks) for variant in variants]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_variant, tasks))
+
+
+def write_csv(rows: List[Dict[str, float]], file):
+    field_names: List[str] = []
+    for row in rows:
+        field_names += [name for name in row if name not in field_names]
+
+    writer = csv.DictWriter(file, field_names)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Runs headless games for a grid of stat variations.")
+    parser.add_argument('map', help="path to the map that is played")
+    parser.add_argument('--vary', type=parse_variation, action='append', default=[],
+                        help="stat variation like DRILL.range=100,150,200 (can be repeated)")
+    parser.add_argument('--layout', default='DRILL,DRILL,DRILL',
+                        help="comma separated building types that are placed in this order")
+    parser.add_argument('--waves', type=int, default=10, help="maximum number of waves per game")
+    parser.add_argument('--max-wave-ticks', type=int, default=120 * 120, help="maximum simulation ticks per wave")
+    parser.add_argument('--workers', type=int, default=None, help="number of processes (default: all cores)")
+    parser.add_argument('--output', default='-', help="CSV file to write the results to (default: stdout)")
+    args = parser.parse_args(argv)
+
+    layout = [BuildingType[name.strip().upper()] for name in args.layout.split(',') if name.strip()]
+    variants = generate_variants(args.vary)
+
+    start = time.perf_counter()
+    rows = run_sweep(args.map, variants, layout, args.waves, args.max_wave_ticks, args.workers)
+    print(f"Simulated {len(rows)} games in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    if args.output == '-':
+        write_csv(rows, sys.stdout)
+    else:
+        with open(args.output, 'w', newline='') as f:
+            write_csv(rows, f)
+
+
+if __name__ == '__main__':
+    main()
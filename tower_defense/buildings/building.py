@@ -1,11 +1,15 @@
 import math
-from typing import Generator
+from operator import attrgetter
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import pyglet
 
-from ..game_types import BuildingType, TileType
-from ..graphics import Renderer, MovementGroup
+from ..entities.entity import Entity
+from ..game_types import BuildingType, TargetingMode, TileType
+from ..graphics import DETAIL_ZOOM, Renderer, MovementGroup
 from ..helper import Vector, rect_contains_point
+from .. import stats
+from ..stats import lookup
 
 
 class Building:
@@ -14,42 +18,35 @@ class Building:
         self.size = size
         self.building_type = building_type
         self.mouse_over = False
+        self.targeting = TargetingMode.FIRST
+        # buildings never move, so the tiles in range are only computed once, closest first,
+        # together with the distance of their closest point to the center of the building
+        self.covered: Optional[List[Tuple[float, Tuple[int, int]]]] = None
+        # tiles in range grouped by their number of steps to the FINISH tiles, for the distances of the tile map
+        # they have been grouped for
+        self.path_groups: List[List[Tuple[int, int]]] = []
+        self.path_groups_distances: Optional[Dict[Tuple[int, int], int]] = None
+        # blocking a tile updates the distances in place
+        self.path_groups_revision = -1
+
+        # stats are resolved once, so that the hot paths only read attributes
+        self.range = lookup(stats.tables.building_range, building_type)
+        if self.range is None:
+            print("Missing range for", building_type)
+            self.range = -1
+
+        self.cost = lookup(stats.tables.building_cost, building_type)
+        if self.cost is None:
+            print("Missing cost for", building_type)
+            self.cost = -1
+
+        # None for buildings that don't shoot
+        self.shooting_frequency: Optional[float] = lookup(stats.tables.building_shooting_frequency, building_type)
 
     @property
     def world_position(self):
         return Vector(self.position.x * self.size.x, self.position.y * self.size.y)
 
-    @property
-    def shooting_frequency(self):
-        if self.building_type == BuildingType.LASER:
-            return 1 / 30
-
-        raise Exception("Missing shooting frequency for", self.building_type)
-
-    @property
-    def range(self):
-        if self.building_type == BuildingType.LASER:
-            return 350
-        elif self.building_type == BuildingType.HAMMER:
-            return 200
-        elif self.building_type == BuildingType.DRILL:
-            return 150
-
-        print("Missing range for", self.building_type)
-        return -1
-
-    @property
-    def cost(self):
-        if self.building_type == BuildingType.LASER:
-            return 20
-        elif self.building_type == BuildingType.HAMMER:
-            return 50
-        elif self.building_type == BuildingType.DRILL:
-            return 30
-
-        print("Missing cost for", self.building_type)
-        return -1
-
     def render(self, game_state, batch: pyglet.graphics.Batch, tex_max: float = 0.8,
                foreground: pyglet.graphics.Group = None, background: pyglet.graphics.Group = None):
         position = game_state.world_to_window_space(
@@ -57,7 +54,7 @@ class Building:
         if position is None:
             return None
 
-        if self.mouse_over:
+        if self.mouse_over and game_state.zoom >= DETAIL_ZOOM:
             size = self.size / self.size.length()
             # exact value is 2 (radius to diameter), but 2.5 'feels' better
             size *= self.range * 2.5
@@ -74,31 +71,122 @@ class Building:
         if position:  # building is actually on screen
             position += Vector(0, self.size.y)
             self.mouse_over = rect_contains_point(
-                game_state.mouse_position, position, self.size)
+                game_state.window_to_view_space(game_state.mouse_position), position, self.size)
 
     def get_center_world_position(self, game_state):
         world_position = game_state.index_to_world_space(self.position)
         return world_position + self.size / 2
 
-    def get_target(self, game_state) -> Generator:
+    def next_targeting(self):
+        modes = list(TargetingMode)
+        self.targeting = modes[(modes.index(self.targeting) + 1) % len(modes)]
+
+    def tile_distance(self, tile_index: Tuple[int, int]) -> float:
+        """
+        :return: distance from the center of this building to the closest point of the tile
+        """
+        center = self.world_position + self.size / 2
+        x, y = tile_index
+        closest_x = min(max(center.x, x * self.size.x), (x + 1) * self.size.x)
+        closest_y = min(max(center.y, y * self.size.y), (y + 1) * self.size.y)
+        return math.hypot(closest_x - center.x, closest_y - center.y)
+
+    def covered_tiles(self) -> List[Tuple[int, int]]:
         """
-        Returns the position and direction vector of the closest entity.
+        :return: indices of all tiles that are at least partially in range of this building
+        """
+        if self.range <= 0:
+            return []
+
+        radius = int(math.ceil(self.range / min(self.size.x, self.size.y)))
+        tiles = []
+        for x in range(int(self.position.x) - radius, int(self.position.x) + radius + 1):
+            for y in range(int(self.position.y) - radius, int(self.position.y) + radius + 1):
+                if self.tile_distance((x, y)) < self.range:
+                    tiles.append((x, y))
+        return tiles
+
+    def covered_by_distance(self) -> List[Tuple[float, Tuple[int, int]]]:
+        if self.covered is None:
+            self.covered = sorted((self.tile_distance(tile_index), tile_index) for tile_index in self.covered_tiles())
+        return self.covered
+
+    def path_order(self, tile_map) -> List[List[Tuple[int, int]]]:
+        """
+        :return: the tiles in range grouped by their number of steps to the closest FINISH tile, first in line first.
+                 Tiles without a path to a FINISH tile come last.
+        """
+        if self.path_groups_distances is not tile_map.distances or self.path_groups_revision != tile_map.revision:
+            groups: Dict[float, List[Tuple[int, int]]] = {}
+            for _, tile_index in self.covered_by_distance():
+                groups.setdefault(tile_map.distances.get(tile_index, math.inf), []).append(tile_index)
+            self.path_groups = [groups[steps] for steps in sorted(groups)]
+            self.path_groups_distances = tile_map.distances
+            self.path_groups_revision = tile_map.revision
+        return self.path_groups
+
+    def deal_damage(self, game_state, target, damage: int):
+        target.take_damage(damage)
+        game_state.building_manager.record_damage(self.building_type, damage)
+
+    def get_target(self, game_state, tile_indices: Iterator[Tuple[int, int]] = None) -> Iterator[Entity]:
+        """
+        Yields the entities in range. Only the entities on the tiles in range are looked at.
+        :param tile_indices: only look at the entities on these tiles
+        """
+        if tile_indices is None:
+            tile_indices = (tile_index for _, tile_index in self.covered_by_distance())
+        tile_entities = game_state.entity_manager.entities_by_tile(game_state)
+        center = self.get_center_world_position(game_state)
+        for tile_index in tile_indices:
+            for entity in tile_entities.get(tile_index, ()):
+                if (entity.position - center).length() < self.range:
+                    yield entity
+
+    def select_target(self, game_state) -> Optional[Entity]:
+        """
+        Picks the entity to attack according to the targeting mode of this building.
+        FIRST and LAST go through the tiles in range in the order of their distance to the FINISH tiles
+        and stop at the first group of tiles with an entity in range.
+        CLOSEST goes through the tiles in range closest first and stops once the tiles are further away than the
+        closest entity found so far.
         If no entity is in range, None is returned.
         """
-        for entity in game_state.entity_manager.entities:
-            direction = entity.position - \
-                self.get_center_world_position(game_state)
+        if self.targeting == TargetingMode.FIRST or self.targeting == TargetingMode.LAST:
+            groups = self.path_order(game_state.tile_map)
+            if self.targeting == TargetingMode.LAST:
+                groups = groups[::-1]
+            choose = min if self.targeting == TargetingMode.FIRST else max
+            for group in groups:
+                target = choose(self.get_target(game_state, iter(group)), key=attrgetter('path_distance'),
+                                default=None)
+                if target is not None:
+                    return target
+            return None
 
-            distance = direction.length()
-            if distance < self.range:
-                yield entity
-        return None
+        if self.targeting == TargetingMode.STRONGEST:
+            return max(self.get_target(game_state), key=attrgetter('health'), default=None)
+
+        tile_entities = game_state.entity_manager.entities_by_tile(game_state)
+        center = self.get_center_world_position(game_state)
+        closest = None
+        closest_distance = self.range
+        for tile_distance, tile_index in self.covered_by_distance():
+            if tile_distance >= closest_distance:
+                break
+            for entity in tile_entities.get(tile_index, ()):
+                distance = (entity.position - center).length()
+                if distance < closest_distance:
+                    closest = entity
+                    closest_distance = distance
+        return closest
 
 
 class Laser(Building):
     def __init__(self, position: Vector, size: Vector) -> None:
         super().__init__(position, size, BuildingType.LASER)
-        self.target = None
+        # direction from the center of the laser to its target
+        self.target: Optional[Vector] = None
 
     def render(self, game_state, batch: pyglet.graphics.Batch, tex_max=0.5, foreground: pyglet.graphics.Group = None,
                background: pyglet.graphics.Group = None):
@@ -114,8 +202,8 @@ class Laser(Building):
         if self.target is None:
             return
 
-        size = Vector(self.target[0].length(), 10)
-        angle = self.target[1].angle() / math.pi * 180
+        size = Vector(self.target.length(), 10)
+        angle = self.target.angle() / math.pi * 180
         position += self.size / 2 + Vector(0, 35)
         Renderer.colored_rectangle(
             batch, (0, 255, 255), position, size, angle, background)
@@ -123,7 +211,12 @@ class Laser(Building):
     def update(self, game_state):
         super().update(game_state)
 
-        self.target = self.get_target(game_state)
+        target = self.select_target(game_state)
+        if target is None:
+            self.target = None
+            return
+
+        self.target = target.position - self.get_center_world_position(game_state)
 
 
 class Hammer(Building):
@@ -175,7 +268,8 @@ class Drill(Building):
 
         self.drill_size = Vector(65, 144)
 
-        self.damage_range = 150
+        self.damage = lookup(stats.tables.building_damage, BuildingType.DRILL, 0)
+        self.damage_range = lookup(stats.tables.building_damage_range, BuildingType.DRILL, 0)
 
     def update(self, game_state):
         super().update(game_state)
@@ -211,24 +305,24 @@ class Drill(Building):
         return 0
 
     def check_for_entities(self, game_state):
-        something_in_sight = False
-        for target in self.get_target(game_state):
-            direction = target.position - \
-                self.get_center_world_position(game_state)
+        target = self.select_target(game_state)
+        if target is None:
+            return False
 
-            distance = direction.length()
-            angle = direction.angle() * 180 / math.pi + 90
-            self.rotate_towards(angle)
+        direction = target.position - \
+            self.get_center_world_position(game_state)
 
-            if self.animation_speed < self.max_animation_speed:
-                self.animation_speed += 5
-            something_in_sight = True
+        distance = direction.length()
+        angle = direction.angle() * 180 / math.pi + 90
+        self.rotate_towards(angle)
 
-            if distance < self.damage_range:
-                target.take_damage(1)
-                break
+        if self.animation_speed < self.max_animation_speed:
+            self.animation_speed += 5
+
+        if distance < self.damage_range:
+            self.deal_damage(game_state, target, self.damage)
 
-        return something_in_sight
+        return True
 
     def rotate_towards(self, angle):
         angle -= self.rotation_angle
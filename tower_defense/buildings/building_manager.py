@@ -4,7 +4,8 @@ import pyglet
 
 from .building import Building, Laser, Drill, Hammer
 from ..entities.bullet import Bullet
-from ..game_types import BuildingType
+from ..game_types import BuildingType, BulletType
+from ..graphics import IMPOSTOR_ZOOM, PointLayer, SpriteLayer
 from ..helper import Vector
 
 
@@ -15,6 +16,21 @@ class BuildingManager:
         self.bullet_speed = 5
         self.buildings: Dict[(int, int), Building] = {}
         self.bullets: List[Bullet] = []
+        self.damage_dealt: Dict[BuildingType, int] = {}
+        self.bullet_sprites: Dict[BulletType, SpriteLayer] = {bullet_type: SpriteLayer() for bullet_type in BulletType}
+        self.bullet_points: Dict[BulletType, PointLayer] = {
+            BulletType.STANDARD: PointLayer((255, 255, 0)),
+            BulletType.DYNAMITE: PointLayer((255, 120, 0)),
+        }
+
+    def reset(self):
+        """
+        Removes the buildings and bullets of the previous map, the sprite layers are kept
+        """
+        self.gold = 500
+        self.buildings = {}
+        self.bullets = []
+        self.damage_dealt = {}
 
     def render(self, game_state):
         batch = pyglet.graphics.Batch()
@@ -25,10 +41,19 @@ class BuildingManager:
             self.buildings[key].render(game_state, batch, foreground=foreground, background=background)
         batch.draw()
 
-        bullet_batch = pyglet.graphics.Batch()
+        impostors = game_state.zoom < IMPOSTOR_ZOOM
+        layers = self.bullet_points if impostors else self.bullet_sprites
+        for layer in layers.values():
+            layer.clear()
         for bullet in self.bullets:
-            bullet.render(game_state, bullet_batch)
-        bullet_batch.draw()
+            bullet.render(game_state, layers[bullet.bullet_type])
+        for bullet_type, layer in layers.items():
+            if not layer.count:
+                continue
+            if impostors:
+                layer.draw(point_size=2)
+            else:
+                layer.draw(game_state.textures.bullets[bullet_type])
 
     def update(self, game_state):
         # TODO remove this at some point
@@ -43,14 +68,18 @@ class BuildingManager:
             if bullet.update(game_state):
                 self.bullets.remove(bullet)
 
+    def record_damage(self, building_type: BuildingType, damage: int):
+        self.damage_dealt[building_type] = self.damage_dealt.get(building_type, 0) + damage
+
     def shoot(self, world_position: Vector, direction: Vector):
         bullet = Bullet(world_position, self.bullet_size, direction / direction.length() * self.bullet_speed)
         self.bullets.append(bullet)
 
-    def spawn_building(self, game_state, tile_index: Tuple[int, int], building_type: BuildingType):
+    @staticmethod
+    def create_building(tile_index: Tuple[int, int], size: Vector, building_type: BuildingType) -> Building:
         position = Vector(point=tile_index)
 
-        args = (position, game_state.tile_map.tile_size, BuildingType.HAMMER)
+        args = (position, size, BuildingType.HAMMER)
         building: Building = Building(*args)
 
         if building_type == BuildingType.LASER:
@@ -59,9 +88,17 @@ class BuildingManager:
             building = Drill(*args[:-1])
         elif building_type == BuildingType.HAMMER:
             building = Hammer(*args[:-1])
+        return building
+
+    def spawn_building(self, game_state, tile_index: Tuple[int, int], building_type: BuildingType):
+        if not game_state.tile_map.can_build(tile_index):
+            return
+
+        building = self.create_building(tile_index, game_state.tile_map.tile_size, building_type)
 
         if building.cost > self.gold:
             return
 
         self.gold -= building.cost
         self.buildings[tile_index] = building
+        game_state.tile_map.block(tile_index)
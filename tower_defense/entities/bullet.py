@@ -1,31 +1,29 @@
-import pyglet
-
 from ..game_types import BulletType
-from ..graphics import Renderer
-from ..helper import Vector, rect_contains_point
+from ..graphics import SpriteLayer
+from ..helper import Vector, interpolate, rect_contains_point
+from .. import stats
+from ..stats import lookup
 
 
 class Bullet:
     def __init__(self, position: Vector, size: Vector, velocity: Vector) -> None:
         self.position = position
+        self.previous_position = position.copy()
         self.size = size
         self.velocity = velocity
         self.bullet_type = BulletType.STANDARD
+        self.damage = lookup(stats.tables.bullet_damage, self.bullet_type, 10)
 
-    @property
-    def damage(self):
-        # TODO make this dependent on the bullet type
-        return 10
-
-    def render(self, game_state, batch: pyglet.graphics.Batch):
-        position = game_state.world_to_window_space(self.position, self.size, True)
+    def render(self, game_state, sprites: SpriteLayer):
+        position = interpolate(self.previous_position, self.position, game_state.clock.alpha)
+        position = game_state.world_to_window_space(position, self.size, True)
         if position is None:
             return
 
-        Renderer.textured_rectangle(batch, game_state.textures.bullets[self.bullet_type], position, self.size,
-                                    tex_max=1.0)
+        sprites.add(position, self.size)
 
     def update(self, game_state):
+        self.previous_position = self.position.copy()
         self.position += self.velocity
 
         for entity in game_state.entity_manager.entities:
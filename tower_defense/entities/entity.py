@@ -1,23 +1,42 @@
-import pyglet
+import math
+from typing import Optional, Tuple
 
 from ..game_types import EntityType
-from ..graphics import Renderer
-from ..helper import Vector
+from ..graphics import SpriteLayer
+from ..helper import Vector, interpolate
+from .. import stats
+from ..stats import lookup
 
 
 class Entity:
     def __init__(self, position: Vector, size: Vector, entity_type: EntityType) -> None:
         self.entity_type = entity_type
         self.position = position  # center of sprite
+        # position at the beginning of the last simulation tick, used to interpolate rendering
+        self.previous_position = position.copy()
         self.size = size
         self.velocity = Vector()
         self.acceleration = Vector()
-        self.max_speed = 2
-        self.next_tile_index = None
-        self.health = 100
-        self.player_damage = 1
+        self.max_speed = lookup(stats.tables.entity_max_speed, entity_type, 2)
+        self.next_tile_index: Optional[Tuple[int, int]] = None
+        self.health = lookup(stats.tables.entity_health, entity_type, 100)
+        self.player_damage = lookup(stats.tables.entity_player_damage, entity_type, 1)
+        # distance along the path to the closest FINISH tile, kept up to date by the entity manager
+        self.path_distance = math.inf
+        # index of the route of the entity manager that this entity follows, None if it steers from tile to tile
+        self.route: Optional[int] = None
+        # distance travelled along the route
+        self.route_distance = 0.0
+        # index of the next point of the route
+        self.route_point = 0
+        # sideways distance to the route
+        self.lateral_offset = 0.0
+        # tile under which the entity manager has filed this entity
+        self.indexed_tile = None
 
     def update(self, game_state):
+        self.previous_position = self.position.copy()
+
         if not game_state.tile_map.is_on_map(self.position):
             return
 
@@ -69,14 +88,13 @@ class Entity:
                 self.next_tile_index = self.next_tile_index[0] + \
                     direction[0], self.next_tile_index[1] + direction[1]
 
-    def render(self, game_state, batch: pyglet.graphics.Batch):
-        position = game_state.world_to_window_space(
-            self.position, self.size, True)
+    def render(self, game_state, sprites: SpriteLayer):
+        position = interpolate(self.previous_position, self.position, game_state.clock.alpha)
+        position = game_state.world_to_window_space(position, self.size, True)
         if position is None:
             return
 
-        Renderer.textured_rectangle(batch, game_state.textures.entities[self.entity_type], position, self.size,
-                                    tex_max=0.775)
+        sprites.add(position, self.size)
 
     def take_damage(self, damage):
         self.health -= damage
@@ -86,6 +104,8 @@ class SmallBoulder(Entity):
     def __init__(self, position: Vector, size: Vector, path_side: int) -> None:
         super().__init__(position, size, EntityType.SMALL_BOULDER)
         self.path_side = path_side
+        # a quarter of a tile to the side, like the steering target below
+        self.lateral_offset = path_side * size.x / 2
 
     def get_movement_target(self, game_state):
         tile = game_state.tile_map.tiles[self.next_tile_index]
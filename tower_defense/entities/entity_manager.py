@@ -1,51 +1,155 @@
-from typing import List, Dict, Tuple
-
-import pyglet
+from typing import List, Dict, Optional, Tuple
 
 from .entity import Entity, SmallBoulder
+from .route import Route
 from ..game_types import TileType, EntityType
+from ..graphics import IMPOSTOR_ZOOM, PointLayer, SpriteLayer
 from ..helper import Vector
+from ..tiles.tile import Tile
+
+# routes that no entity is on anymore are kept for reuse, until there are more of them than this
+MAX_UNUSED_ROUTES = 16
 
 
 class EntityManager:
     def __init__(self):
+        # entities by the tile they are on, an entity only moves to another list when it enters another tile.
+        # None until the tiles of the entities have been looked up.
+        self.tile_entities: Optional[Dict[Tuple[int, int], List[Entity]]] = None
         self.entities: List[Entity] = []
         # holds a dictionary similar to the one in TileMap, the only difference being that this one doesn't have tiles
-        # as values, but rather a list with the directions associated with that tile and a counter with each direction
-        # The counter indicates how many time a certain direction has been taken already
-        self.directions_graph: Dict[Tuple[int, int],
-                                    List[Tuple[Tuple[int, int], int]]] = {}
+        # as values, but rather a dictionary with the directions associated with that tile and a counter for each
+        # direction. The counter indicates how many time a certain direction has been taken already
+        self.directions_graph: Dict[Tuple[int, int], Dict[Tuple[int, int], int]] = {}
         self.spawn_delay = 150
         self.spawn_timer = self.spawn_delay
+        # number of entities that have been spawned at a START tile, used to take turns between the START tiles
+        self.spawn_count = 0
+        # entities follow precomputed routes instead of steering towards the next tile on every tick
+        self.follow_routes = True
+        self.routes: List[Route] = []
+        # route key -> index in routes, entities that take the same way share one route
+        self.route_ids: Dict[tuple, int] = {}
+        # one layer per entity type, the layers keep their vertex buffers from frame to frame
+        self.sprite_layers: Dict[EntityType, SpriteLayer] = {
+            entity_type: SpriteLayer(tex_max=0.775) for entity_type in EntityType
+        }
+        # used instead of the sprite layers when the camera is zoomed out far
+        self.point_layers: Dict[EntityType, PointLayer] = {
+            EntityType.LARGE_BOULDER: PointLayer((150, 150, 150)),
+            EntityType.SMALL_BOULDER: PointLayer((200, 200, 200)),
+            EntityType.MINERAL: PointLayer((80, 160, 255)),
+        }
 
     def render(self, game_state):
-        batch = pyglet.graphics.Batch()
+        impostors = game_state.zoom < IMPOSTOR_ZOOM
+        layers = self.point_layers if impostors else self.sprite_layers
+        for layer in layers.values():
+            layer.clear()
         for entity in self.entities:
-            entity.render(game_state, batch)
-        batch.draw()
+            entity.render(game_state, layers[entity.entity_type])
+        for entity_type, layer in layers.items():
+            if not layer.count:
+                continue
+            if impostors:
+                layer.draw()
+            else:
+                layer.draw(game_state.textures.entities[entity_type])
+
+    @property
+    def entities(self) -> List[Entity]:
+        return self._entities
+
+    @entities.setter
+    def entities(self, entities: List[Entity]):
+        self._entities = entities
+        self.tile_entities = None
+
+    def entities_by_tile(self, game_state) -> Dict[Tuple[int, int], List[Entity]]:
+        """
+        :return: the entities on every tile that has at least one entity on it
+        """
+        if self.tile_entities is None:
+            self.tile_entities = {}
+            for entity in self.entities:
+                entity.indexed_tile = None
+                self.place_entity(game_state, entity)
+        return self.tile_entities
+
+    def place_entity(self, game_state, entity: Entity):
+        """
+        Files the entity under the tile it is on, has to be called after the entity has moved
+        """
+        tile_entities = self.entities_by_tile(game_state)
+        tile_index = game_state.world_to_index_space(entity.position)
+        if tile_index == entity.indexed_tile:
+            return
+        self.unplace_entity(entity)
+        tile_entities.setdefault(tile_index, []).append(entity)
+        entity.indexed_tile = tile_index
+
+    def unplace_entity(self, entity: Entity):
+        if self.tile_entities is None or entity.indexed_tile is None:
+            return
+        entities = self.tile_entities[entity.indexed_tile]
+        entities.remove(entity)
+        if not entities:
+            del self.tile_entities[entity.indexed_tile]
+        entity.indexed_tile = None
+
+    def remove_entity(self, entity: Entity):
+        self.entities.remove(entity)
+        self.unplace_entity(entity)
 
     def reset(self):
         self.directions_graph = {}
         self.entities = []
+        self.routes = []
+        self.route_ids = {}
+
+    def convert(self, entity_manager_class: type) -> 'EntityManager':
+        """
+        Creates an entity manager of the given class that keeps the directions graph of this one.
+        Entities are not carried over, because they belong to the previous game mode.
+        """
+        entity_manager = entity_manager_class()
+        entity_manager.directions_graph = self.directions_graph
+        return entity_manager
+
+    @staticmethod
+    def spawn_tiles(game_state) -> List[Tile]:
+        """
+        :return: the START tiles that have a path to a FINISH tile, or all START tiles if none of them has one
+        """
+        start_tiles = [tile for tile in game_state.tile_map.walkable_tiles().values()
+                       if tile.tile_type == TileType.START]
+        return [tile for tile in start_tiles if tile.directions] or start_tiles
 
     def spawn_entity(self, game_state, entity_type: EntityType, position: Vector = None, path_side: int = 0):
         if position is None:
-            for tile_index in game_state.tile_map.tiles:
-                tile = game_state.tile_map.tiles[tile_index]
-                if tile.tile_type == TileType.START:
-                    position = tile.world_position + \
-                        (game_state.tile_map.tile_size / 2)
-                    break
+            spawn_tiles = self.spawn_tiles(game_state)
+            if spawn_tiles:
+                tile = spawn_tiles[self.spawn_count % len(spawn_tiles)]
+                self.spawn_count += 1
+                position = tile.world_position + \
+                    (game_state.tile_map.tile_size / 2)
 
         if position is None:
             # still no position, we can't spawn an entity
-            return
+            return None
 
-        entity = Entity(position, game_state.tile_map.tile_size, entity_type)
-        if entity_type == EntityType.SMALL_BOULDER:
-            entity = SmallBoulder(
-                position, game_state.tile_map.tile_size / 2, path_side)
+        entity = self.create_entity(entity_type, position, game_state.tile_map.tile_size, path_side)
+        self.update_path_distance(game_state, entity)
         self.entities.append(entity)
+        if self.tile_entities is not None:
+            self.place_entity(game_state, entity)
+        return entity
+
+    @staticmethod
+    def create_entity(entity_type: EntityType, position: Vector, tile_size: Vector, path_side: int = 0) -> Entity:
+        if entity_type == EntityType.SMALL_BOULDER:
+            return SmallBoulder(position, tile_size / 2, path_side)
+        return Entity(position, tile_size, entity_type)
 
     def update(self, game_state):
         self.generate_directions_graph(game_state)
@@ -55,31 +159,175 @@ class EntityManager:
         pass
 
     def update_entities(self, game_state):
+        """
+        Moves all entities and updates their distance to the FINISH tiles and the tile they are filed under.
+        Buildings look up their targets by tile, so the entities never have to be sorted.
+        """
+        self.entities_by_tile(game_state)
+        for entity in self.entities:
+            if entity.route is None and self.follow_routes:
+                self.assign_route(game_state, entity)
+            if entity.route is None:
+                entity.update(game_state)
+        self.move_along_routes(game_state)
+
         for entity in self.entities.copy():
-            entity.update(game_state)
+            self.update_path_distance(game_state, entity)
+            self.place_entity(game_state, entity)
 
-            tile_index = game_state.world_to_index_space(entity.position)
-            if game_state.tile_map.tiles[tile_index].tile_type == TileType.FINISH:
+            if game_state.tile_map.tiles[entity.indexed_tile].tile_type == TileType.FINISH:
                 game_state.player_health -= entity.player_damage
-                self.entities.remove(entity)
+                self.remove_entity(entity)
             elif entity.health <= 0:
                 if entity.entity_type == EntityType.LARGE_BOULDER:
-                    self.spawn_entity(
-                        game_state, EntityType.SMALL_BOULDER, entity.position, path_side=-1)
-                    self.spawn_entity(
-                        game_state, EntityType.SMALL_BOULDER, entity.position, path_side=1)
-                self.entities.remove(entity)
+                    for path_side in (-1, 1):
+                        small_boulder = self.spawn_entity(
+                            game_state, EntityType.SMALL_BOULDER, entity.position, path_side=path_side)
+                        self.continue_route(entity, small_boulder)
+                self.remove_entity(entity)
+
+        self.compact_routes()
+
+    def compact_routes(self):
+        """
+        Removes the routes that no entity is on anymore, once there are too many of them.
+        Every reroute adds a route, without this the routes would pile up over a long game.
+        """
+        used = sorted({entity.route for entity in self.entities if entity.route is not None})
+        if len(self.routes) - len(used) <= MAX_UNUSED_ROUTES:
+            return
+
+        new_ids = {route_id: new_id for new_id, route_id in enumerate(used)}
+        self.routes = [self.routes[route_id] for route_id in used]
+        self.route_ids = {route.key: route_id for route_id, route in enumerate(self.routes)}
+        for entity in self.entities:
+            if entity.route is not None:
+                entity.route = new_ids[entity.route]
+
+    def build_route(self, game_state, start: Vector) -> Optional[int]:
+        """
+        Follows the flow field from the given position to a FINISH tile.
+        Where the flow field branches, the direction that has been taken the least is chosen.
+        :return: index of the route, None if the flow field doesn't lead anywhere from the given position
+        """
+        tile_index = game_state.world_to_index_space(start)
+        if not self.directions_graph.get(tile_index):
+            return None
+
+        half_tile_size = game_state.tile_map.tile_size / 2
+        tiles = []
+        points = []
+        center = game_state.index_to_world_space(tile_index) + half_tile_size
+        if center != start:
+            tiles.append(tile_index)
+            points.append((start.x, start.y))
+
+        visited = set()
+        while tile_index not in visited:
+            visited.add(tile_index)
+            center = game_state.index_to_world_space(tile_index) + half_tile_size
+            tiles.append(tile_index)
+            points.append((center.x, center.y))
+
+            directions = self.directions_graph.get(tile_index)
+            if not directions:
+                break
+            direction = min(directions, key=directions.__getitem__)
+            directions[direction] += 1
+            tile_index = tile_index[0] + direction[0], tile_index[1] + direction[1]
+
+        route = Route(tiles, points)
+        route_id = self.route_ids.get(route.key)
+        if route_id is None:
+            route_id = len(self.routes)
+            self.routes.append(route)
+            self.route_ids[route.key] = route_id
+        return route_id
+
+    def assign_route(self, game_state, entity: Entity, start: Vector = None):
+        entity.route = self.build_route(game_state, entity.position if start is None else start)
+        entity.route_distance = 0.0
+        entity.route_point = 0
+
+    @staticmethod
+    def continue_route(entity: Entity, other: Optional[Entity]):
+        """
+        Puts the other entity at the same place on the route of the entity
+        """
+        if other is None or entity.route is None:
+            return
+        other.route = entity.route
+        other.route_distance = entity.route_distance
+        other.route_point = entity.route_point
+
+    def leads_to(self, tile_index: Tuple[int, int], next_tile_index: Tuple[int, int]) -> bool:
+        if tile_index == next_tile_index:
+            return True
+        direction = next_tile_index[0] - tile_index[0], next_tile_index[1] - tile_index[1]
+        return direction in self.directions_graph.get(tile_index, ())
+
+    def move_along_routes(self, game_state):
+        """
+        Moving an entity along its route only adds its speed to the distance it has travelled.
+        Whenever an entity passes the center of a tile, the flow field has to lead the same way as the route does,
+        otherwise the entity continues on a new route from there.
+        The positions are evaluated for all entities on the same route at once.
+        """
+        on_route: Dict[int, List[Entity]] = {}
+        for entity in self.entities:
+            if entity.route is None:
+                continue
+
+            entity.previous_position = entity.position
+            entity.route_distance += entity.max_speed
+            route = self.routes[entity.route]
+            while entity.route_point < len(route.points) and \
+                    entity.route_distance >= route.lengths[entity.route_point]:
+                point = entity.route_point
+                entity.route_point += 1
+                if point + 1 < len(route.tiles) and not self.leads_to(route.tiles[point], route.tiles[point + 1]):
+                    travelled = entity.route_distance - route.lengths[point]
+                    self.assign_route(game_state, entity, Vector(point=route.points[point]))
+                    if entity.route is None:
+                        break
+                    entity.route_distance = travelled
+                    route = self.routes[entity.route]
+
+            if entity.route is not None:
+                on_route.setdefault(entity.route, []).append(entity)
+
+        for route_id, entities in on_route.items():
+            positions = self.routes[route_id].positions_at([entity.route_distance for entity in entities],
+                                                           [entity.lateral_offset for entity in entities])
+            for entity, position in zip(entities, positions):
+                entity.position = position
+
+    def update_path_distance(self, game_state, entity: Entity):
+        if entity.route is not None:
+            entity.path_distance = self.routes[entity.route].length - entity.route_distance
+            return
+
+        tile_index = entity.next_tile_index
+        if tile_index is None:
+            tile_index = game_state.world_to_index_space(entity.position)
+        entity.path_distance = game_state.tile_map.path_distance(entity.position, tile_index)
 
     def generate_directions_graph(self, game_state):
-        for tile in game_state.tile_map.tiles:
+        # only walkable tiles have directions
+        walkable_tiles = game_state.tile_map.walkable_tiles()
+        for tile in list(self.directions_graph):
+            if tile not in walkable_tiles:
+                del self.directions_graph[tile]
+
+        for tile in walkable_tiles:
             if tile not in self.directions_graph:
                 self.directions_graph[tile] = {}
 
             for direction in self.directions_graph[tile].copy():
-                if direction not in game_state.tile_map.tiles[tile].directions:
+                if direction not in walkable_tiles[tile].directions:
                     del self.directions_graph[tile][direction]
 
-            for direction in game_state.tile_map.tiles[tile].directions:
+            for direction in walkable_tiles[tile].directions:
                 if direction not in self.directions_graph[tile]:
                     self.directions_graph[tile][direction] = 0
 
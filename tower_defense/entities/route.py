@@ -0,0 +1,65 @@
+import math
+from typing import List, Tuple
+
+from ..helper import Vector
+
+
+class Route:
+    """
+    Polyline through the centers of the tiles that an entity walks over.
+    Entities on a route only store the distance they have travelled along it,
+    their positions are evaluated for all entities on the route at once.
+    """
+
+    def __init__(self, tiles: List[Tuple[int, int]], points: List[Tuple[float, float]]) -> None:
+        """
+        :param tiles: index of the tile of every point
+        :param points: world positions, usually the centers of the tiles
+        """
+        self.tiles = tiles
+        self.points = points
+        # distance along the route to every point
+        self.lengths = [0.0]
+        # start, unit direction and length of every segment
+        self.segments: List[Tuple[float, float, float, float, float]] = []
+        for (x1, y1), (x2, y2) in zip(points, points[1:]):
+            length = math.hypot(x2 - x1, y2 - y1)
+            if length > 0:
+                self.segments.append((x1, y1, (x2 - x1) / length, (y2 - y1) / length, length))
+            else:
+                self.segments.append((x1, y1, 0.0, 0.0, 0.0))
+            self.lengths.append(self.lengths[-1] + length)
+
+    @property
+    def length(self) -> float:
+        return self.lengths[-1]
+
+    @property
+    def key(self) -> tuple:
+        return tuple(self.tiles), tuple(self.points)
+
+    def position_at(self, distance: float, offset: float = 0.0) -> Vector:
+        return self.positions_at([distance], [offset])[0]
+
+    def positions_at(self, distances: List[float], offsets: List[float]) -> List[Vector]:
+        """
+        Evaluates the route at all given distances in one pass over the segments.
+        Positions are moved sideways by the offsets, perpendicular to the segment they are on.
+        """
+        positions: List[Vector] = [None] * len(distances)  # type: ignore
+        if not self.segments:
+            x, y = self.points[0]
+            return [Vector(x, y) for _ in distances]
+
+        last_segment = len(self.segments) - 1
+        segment = 0
+        for index in sorted(range(len(distances)), key=distances.__getitem__):
+            distance = min(max(distances[index], 0.0), self.length)
+            while segment < last_segment and self.lengths[segment + 1] < distance:
+                segment += 1
+
+            x, y, dx, dy, _ = self.segments[segment]
+            travelled = distance - self.lengths[segment]
+            offset = offsets[index]
+            positions[index] = Vector(x + dx * travelled - dy * offset, y + dy * travelled + dx * offset)
+        return positions
@@ -0,0 +1,84 @@
+import time
+from typing import Callable, Optional
+
+
+class GameClock:
+    """
+    Fixed time step clock for the simulation.
+    Frame times are collected in an accumulator and turned into a whole number of simulation ticks,
+    so the game runs at the same speed independent of the frame rate.
+    """
+
+    def __init__(self, tick_rate: float = 120.0, max_frame_time: float = 0.25, turbo_frame_time: float = 0.1) -> None:
+        self.tick_rate = tick_rate
+        self.tick_length = 1 / tick_rate
+        # frames that take longer than this are not caught up on completely (prevents a spiral of death)
+        self.max_frame_time = max_frame_time
+        self.time_scale = 1.0
+        # in turbo mode the simulation runs as fast as possible for turbo_frame_time seconds per rendered frame
+        self.turbo = False
+        self.turbo_frame_time = turbo_frame_time
+        # if set, turbo mode runs exactly this many ticks per frame instead, so that runs can be reproduced
+        self.turbo_steps: Optional[int] = None
+        self.accumulator = 0.0
+        # number of simulation ticks to run in the current frame
+        self.steps = 0
+        self.ticks = 0
+
+    @property
+    def alpha(self) -> float:
+        """
+        :return: fraction of the next tick that has already passed, used to interpolate between simulation states
+        """
+        return min(self.accumulator / self.tick_length, 1.0)
+
+    @property
+    def max_steps(self) -> int:
+        return max(1, int(self.max_frame_time * self.tick_rate * self.time_scale))
+
+    def advance(self, dt: float) -> int:
+        """
+        :param dt: real time in seconds that passed since the last frame
+        :return: number of simulation ticks that have to be run for this frame
+        """
+        if self.turbo:
+            self.accumulator = 0.0
+            self.steps = 0
+            return self.steps
+
+        self.accumulator += dt * self.time_scale
+        # the small epsilon makes sure that float errors don't swallow a tick
+        self.steps = int(self.accumulator / self.tick_length + 1e-9)
+        self.accumulator = max(0.0, self.accumulator - self.steps * self.tick_length)
+
+        if self.steps > self.max_steps:
+            self.steps = self.max_steps
+            self.accumulator = 0.0
+
+        self.ticks += self.steps
+        return self.steps
+
+    def run(self, step: Callable[[], None]) -> int:
+        """
+        Calls step once for every simulation tick of the current frame.
+        In turbo mode step is called repeatedly until the time budget of the frame is used up.
+        :return: number of simulation ticks that were run
+        """
+        if not self.turbo:
+            for _ in range(self.steps):
+                step()
+            return self.steps
+
+        if self.turbo_steps is not None:
+            for _ in range(self.turbo_steps):
+                step()
+            self.ticks += self.turbo_steps
+            return self.turbo_steps
+
+        steps = 0
+        end = time.perf_counter() + self.turbo_frame_time
+        while time.perf_counter() < end:
+            step()
+            steps += 1
+        self.ticks += steps
+        return steps
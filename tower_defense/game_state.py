@@ -1,41 +1,49 @@
-from typing import List, Tuple, Optional
+from typing import List
 
 import pyglet
 
-from .buildings import building_manager as bm
 from .entities import entity_manager as em
 from .tiles import tile_map as tm
 from .user_interface import menu as menu
-from .user_interface import user_interface as ui
-from .game_types import GameMode
+from .game_clock import GameClock
+from .game_types import GameMode, GameSpeed
 from .graphics import Textures
+from .simulation import SimulationState
 from .helper import KeyPresses, MouseClick, Vector, constrain_rect_to_bounds
 
+MAX_ZOOM = 2.0
+# zoom factor per frame while a zoom key is held down
+ZOOM_SPEED = 1.02
 
-class GameState:
+
+class GameState(SimulationState):
     def __init__(self):
+        super().__init__()
         self.mode = GameMode.MAIN_MENU
+        self.clock: GameClock = GameClock()
+        self.game_speed = GameSpeed.NORMAL
+        # play the next map in free build mode
+        self.free_build = False
 
-        self.window_size = Vector()
         self.key_presses: KeyPresses = KeyPresses()
         self.mouse_clicks: List[MouseClick] = []
-        self.mouse_position = Vector()
 
         self.main_menu: menu.MainMenu = menu.MainMenu()
         self.map_menu: menu.MapMenu = menu.MapMenu()
+        self.loading_menu: menu.LoadingMenu = menu.LoadingMenu()
 
-        self.editor_ui: ui.EditorUI = ui.EditorUI()
-        self.game_ui: ui.GameUI = ui.GameUI()
+        # the in-game user interfaces and the optional subsystems are only created (and their modules imported)
+        # when they are used for the first time
+        self._editor_ui = None
+        self._game_ui = None
+        self._thumbnails = None
+        self._map_loader = None
+        self._wave_history = None
+        self._autosave = None
 
         self.textures: Textures = Textures()
-        self.tile_map: tm.TileMap = tm.TileMap()
-        self.entity_manager: em.EntityManager = em.EntityManager()
-        self.building_manager: bm.BuildingManager = bm.BuildingManager()
-
-        self.player_health = 100
-
-        self.world_offset: Vector = Vector(self.tile_map.border_width * 2,
-                                           self.tile_map.border_width * 2)
+        # mode to switch to, once the map loader is done
+        self.next_mode = GameMode.MAIN_MENU
 
         self.tickers = {
             GameMode.GAME: self.tick_game,
@@ -43,45 +51,92 @@ class GameState:
             GameMode.MAIN_MENU: self.tick_main_menu,
             GameMode.MAP_CHOICE_GAME: self.tick_map_menu,
             GameMode.MAP_CHOICE_EDITOR: self.tick_map_menu,
+            GameMode.LOADING: self.tick_loading,
         }
 
-    def init(self, base_path: str = './res'):
+    def init(self, base_path: str = './res', lazy: bool = False):
+        """
+        :param lazy: decode the textures in the background and don't load a map,
+                     so that the main menu can be shown right away
+        """
+        if lazy:
+            self.textures.load_async(base_path)
+            return
+
         self.tile_map.load(self, base_path + "/maps/basic.map")
         self.textures.load(base_path)
 
-    def world_to_window_space(self, position: Vector, size: Vector, center_position: bool = False) -> Optional[Vector]:
-        if center_position:
-            position = Vector(position.x - size.x / 2, position.y - size.y / 2)
-
-        position += self.world_offset
-        if position.x + size.x < 0 or position.y + size.y < 0:
-            return None
-        if position.x > self.window_size.x or position.y - size.y > self.window_size.y:
-            return None
-
-        return position
-
-    def world_to_index_space(self, position: Vector) -> Tuple[int, int]:
-        return int(position.x / self.tile_map.tile_size.x), int(position.y / self.tile_map.tile_size.y)
-
-    def index_to_world_space(self, index: Vector) -> Vector:
-        # TODO change indexes to Vector objects
-        if isinstance(index, tuple):
-            index = Vector(point=index)  # type: ignore
-        x = index.x
-        y = index.y
-        return Vector(x * self.tile_map.tile_size.x, y * self.tile_map.tile_size.y)
-
-    def window_to_world_space(self, position: Vector) -> Vector:
-        return position - self.world_offset
+    @property
+    def editor_ui(self):
+        if self._editor_ui is None:
+            from .user_interface.user_interface import EditorUI
+            self._editor_ui = EditorUI()
+        return self._editor_ui
+
+    @property
+    def game_ui(self):
+        if self._game_ui is None:
+            from .user_interface.user_interface import GameUI
+            self._game_ui = GameUI()
+        return self._game_ui
+
+    @property
+    def thumbnails(self):
+        if self._thumbnails is None:
+            from .tiles.thumbnail import ThumbnailCache
+            self._thumbnails = ThumbnailCache()
+        return self._thumbnails
+
+    @property
+    def map_loader(self):
+        if self._map_loader is None:
+            from .tiles.map_loader import MapLoader
+            self._map_loader = MapLoader()
+        return self._map_loader
+
+    @property
+    def wave_history(self):
+        if self._wave_history is None:
+            from .snapshot import SnapshotHistory
+            self._wave_history = SnapshotHistory()
+        return self._wave_history
+
+    @property
+    def autosave(self):
+        if self._autosave is None:
+            from .tiles.autosave import Autosave
+            self._autosave = Autosave()
+        return self._autosave
 
     def clean_up(self):
         self.mouse_clicks = []
         self.key_presses.text = ""
         self.key_presses.back_space = False
 
+    @property
+    def min_zoom(self) -> float:
+        """
+        Zooming out stops as soon as the whole map fits into the window
+        """
+        size = self.tile_map.size_with_border
+        return min(1.0, self.window_size.x / size.x, self.window_size.y / size.y)
+
+    def zoom_by(self, factor: float):
+        """
+        Zooms in (factor > 1) or out (factor < 1) and keeps the world position in the center of the window in place
+        """
+        center = self.window_to_world_space(self.window_size / 2)
+        self.zoom = max(self.min_zoom, min(MAX_ZOOM, self.zoom * factor))
+        self.world_offset = self.view_size / 2 - center
+
     def update(self):
-        scroll_speed = 5
+        if self.key_presses.zoom_in:
+            self.zoom_by(ZOOM_SPEED)
+        if self.key_presses.zoom_out:
+            self.zoom_by(1 / ZOOM_SPEED)
+
+        # scroll with the same speed on the screen, regardless of the zoom
+        scroll_speed = 5 / self.zoom
         if self.key_presses.up:
             self.world_offset.y -= scroll_speed
         if self.key_presses.down:
@@ -94,55 +149,127 @@ class GameState:
         rect_size = Vector(self.tile_map.tile_map_width,
                            self.tile_map.tile_map_height)
         self.world_offset = constrain_rect_to_bounds(
-            self.window_size, self.world_offset, rect_size)
+            self.view_size, self.world_offset, rect_size)
+
+    def render_world(self, layers: list):
+        """
+        Renders the layers scaled by the zoom factor, the user interface has to be rendered afterwards
+        """
+        pyglet.gl.glMatrixMode(pyglet.gl.GL_PROJECTION)
+        pyglet.gl.glPushMatrix()
+        pyglet.gl.glScalef(self.zoom, self.zoom, 1)
+        pyglet.gl.glMatrixMode(pyglet.gl.GL_MODELVIEW)
+        for layer in layers:
+            layer.render(self)
+        pyglet.gl.glMatrixMode(pyglet.gl.GL_PROJECTION)
+        pyglet.gl.glPopMatrix()
+        pyglet.gl.glMatrixMode(pyglet.gl.GL_MODELVIEW)
 
     def tick_editor(self):
         if not isinstance(self.entity_manager, em.EditorEntityManager):
-            self.entity_manager = em.EditorEntityManager()
+            self.entity_manager = self.entity_manager.convert(em.EditorEntityManager)
         if not isinstance(self.tile_map, tm.EditorTileMap):
-            path = self.tile_map.path
-            self.tile_map = tm.EditorTileMap()
-            self.tile_map.load(self, path)
+            self.tile_map = self.tile_map.convert(tm.EditorTileMap)
+        self.textures.finish()
 
         self.update()
 
         self.editor_ui.update(self)
-        self.entity_manager.update(self)
+        self.clock.run(lambda: self.entity_manager.update(self))
         self.tile_map.update(self)
+        self.autosave.update(self.tile_map)
 
-        self.tile_map.render(self)
-        self.entity_manager.render(self)
+        self.render_world([self.tile_map, self.entity_manager])
         self.editor_ui.render()
 
     def tick_game(self):
         if not isinstance(self.entity_manager, em.GameEntityManager):
-            self.entity_manager = em.GameEntityManager()
+            self.entity_manager = self.entity_manager.convert(em.GameEntityManager)
         if not isinstance(self.tile_map, tm.GameTileMap):
-            path = self.tile_map.path
-            self.tile_map = tm.GameTileMap()
-            self.tile_map.load(self, path)
+            self.tile_map = self.tile_map.convert(tm.GameTileMap)
+        self.textures.finish()
 
         self.update()
 
         self.game_ui.update(self)
-        self.entity_manager.update(self)
-        self.building_manager.update(self)
+        self.clock.run(self.simulate)
+        if self.game_speed == GameSpeed.MAX and not self.entity_manager.wave_running:
+            # there is nothing to fast-forward anymore, so go back to a responsive frame rate
+            self.set_game_speed(GameSpeed.NORMAL)
+        if self.player_health <= 0:
+            # the game is over, there is nothing to rewind to anymore
+            self.wave_history.clear()
         self.tile_map.update(self)
 
-        self.tile_map.render(self)
-        self.building_manager.render(self)
-        self.entity_manager.render(self)
+        self.render_world([self.tile_map, self.building_manager, self.entity_manager])
         self.game_ui.render(self)
 
+    def start_wave(self):
+        from .snapshot import take_snapshot
+        self.wave_history.push(self.entity_manager.wave_count, take_snapshot(self, include_tile_map=False))
+        self.entity_manager.next_wave()
+
+    def rewind_wave(self):
+        """
+        Restores the state from right before the last wave was started
+        """
+        snapshot = self.wave_history.pop()
+        if snapshot is None:
+            return
+        from .snapshot import restore_snapshot
+        restore_snapshot(self, snapshot[1])
+
+    def set_game_speed(self, speed: GameSpeed):
+        self.game_speed = speed
+        self.clock.turbo = speed == GameSpeed.MAX
+        if not self.clock.turbo:
+            self.clock.time_scale = speed.value
+
+    def load_map(self, path: str, mode: GameMode):
+        """
+        Loads the tile map in the background and switches to the given mode as soon as it is done.
+        """
+        tile_map_class = tm.GameTileMap if mode == GameMode.GAME else tm.EditorTileMap
+        self.map_loader.start(path, tile_map_class)
+        self.set_game_speed(GameSpeed.NORMAL)
+        self.next_mode = mode
+        self.mode = GameMode.LOADING
+
+    def tick_loading(self):
+        self.textures.update()
+        if self.map_loader.done:
+            tile_map = self.map_loader.result()
+            if tile_map is None:
+                self.mode = GameMode.MAIN_MENU
+                return
+
+            self.entity_manager.reset()
+            self.building_manager.reset()
+            self.wave_history.clear()
+            self.tile_map = tile_map
+            self.tile_map.free_build = self.free_build and self.next_mode == GameMode.GAME
+            self.tile_map.set_blocked(self.building_manager.buildings)
+            self.mode = self.next_mode
+            return
+
+        self.loading_menu.update(self)
+        self.loading_menu.render()
+
     def tick_main_menu(self):
+        self.textures.update()
         self.main_menu.update(self)
         self.main_menu.render()
 
     def tick_map_menu(self):
+        self.textures.update()
         self.map_menu.update(self)
         self.map_menu.render(self)
 
-    def tick(self, window: pyglet.window.Window):
+    def tick(self, window: pyglet.window.Window, dt: float = 0.0):
+        """
+        :param dt: time in seconds since the last frame, converted into simulation ticks by the game clock
+        """
         self.window_size = Vector(*window.get_size())
+        self.clock.advance(dt)
 
         self.tickers[self.mode]()
@@ -7,6 +7,15 @@ class GameMode(Enum):
     GAME = 2
     MAP_CHOICE_EDITOR = 3
     MAP_CHOICE_GAME = 4
+    LOADING = 5
+
+
+class GameSpeed(Enum):
+    # values are the time scale of the simulation, MAX runs as many ticks as possible
+    NORMAL = 1
+    DOUBLE = 2
+    QUADRUPLE = 4
+    MAX = 0
 
 
 class TileType(Enum):
@@ -29,6 +38,27 @@ class BuildingType(Enum):
     PLATFORM = 3
 
 
+class EditorTool(Enum):
+    # every click moves the tile on to the next tile type
+    CYCLE = 0
+    # paints a square of tiles around the clicked tile
+    BRUSH = 1
+    # the first click marks a corner, the second one fills the rectangle
+    RECTANGLE = 2
+    # paints all connected tiles that have the same type as the clicked tile
+    FILL = 3
+
+
+class TargetingMode(Enum):
+    # entity that is closest to a FINISH tile
+    FIRST = 0
+    # entity that is furthest away from a FINISH tile
+    LAST = 1
+    STRONGEST = 2
+    # entity that is closest to the building
+    CLOSEST = 3
+
+
 class BulletType(Enum):
     STANDARD = 0
     DYNAMITE = 1
@@ -1,11 +1,33 @@
+import ctypes
 import os
-from typing import Dict, List, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 import pyglet
 from pyglet import gl
 
 from .game_types import TileType, EntityType, BuildingType, BulletType
-from .helper import Vector, get_res_path
+from . import texture_cache
+from .helper import Vector, get_res_path, get_texture_cache_path
+
+# below this zoom factor, details like direction arrows and range rings are not shown anymore
+DETAIL_ZOOM = 0.5
+# below this zoom factor, entities and bullets are only a few pixels big and are drawn as points
+IMPOSTOR_ZOOM = 0.25
+
+IMAGE_FILES = {
+    'grass': 'grass.jpg',
+    'sand': 'sand.jpg',
+    'boulder': 'boulder.png',
+    'ball': 'ball.png',
+    'platform': 'platform.png',
+    'hammer': 'hammer.png',
+    'laser_tower': 'laser-tower.png',
+    'drill': 'drill.png',
+    'tower': 'tower.png',
+    'arrow': 'arrow.png',
+    'ring': 'ring.png',
+}
 
 
 class Textures:
@@ -16,50 +38,83 @@ class Textures:
         self.buildings: Dict[BuildingType, pyglet.graphics.TextureGroup] = {}
         self.other: Dict[str, pyglet.graphics.TextureGroup] = {}
 
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.future: Optional[Future] = None
+        self.loaded = False
+
+    @staticmethod
+    def decode(base_path: str) -> Dict[str, pyglet.image.AbstractImage]:
+        """
+        Decodes all images, this does not need an OpenGL context and can be done in a worker thread.
+        Images from the texture cache are used as they are, only the others are decoded.
+        """
+        images = texture_cache.load_cache(get_res_path(), IMAGE_FILES, get_texture_cache_path())
+        for name, file_name in IMAGE_FILES.items():
+            if name not in images:
+                images[name] = pyglet.image.load(os.path.join(get_res_path(), file_name))
+        return images
+
     def load(self, base_path: str):
-        def load_image(path: str) -> pyglet.image.Texture:
-            return pyglet.image.load(os.path.join(get_res_path(), path)).get_texture()
+        self.upload(self.decode(base_path))
+
+    def load_async(self, base_path: str):
+        """
+        Decodes the images in the background, they are uploaded with update or finish
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = self.executor.submit(self.decode, base_path)
+
+    def update(self):
+        """
+        Uploads the textures, if they have been decoded in the meantime
+        """
+        if self.future is not None and self.future.done():
+            self.finish()
+
+    def finish(self):
+        """
+        Waits for the images to be decoded and uploads them
+        """
+        if self.future is None:
+            return
+        future, self.future = self.future, None
+        self.upload(future.result())
+        self.executor.shutdown()
+        self.executor = None
+
+    def upload(self, images: Dict[str, pyglet.image.AbstractImage]):
+        textures = {name: image.get_texture() for name, image in images.items()}
 
-        grass_texture = load_image('grass.jpg')
-        sand_texture = load_image('sand.jpg')
         self.tiles = {
-            TileType.BUILDING_GROUND: pyglet.graphics.TextureGroup(grass_texture),
-            TileType.PATH: pyglet.graphics.TextureGroup(sand_texture)
+            TileType.BUILDING_GROUND: pyglet.graphics.TextureGroup(textures['grass']),
+            TileType.PATH: pyglet.graphics.TextureGroup(textures['sand'])
         }
 
-        boulder_texture = load_image('boulder.png')
         self.entities = {
-            EntityType.LARGE_BOULDER: pyglet.graphics.TextureGroup(boulder_texture),
-            EntityType.SMALL_BOULDER: pyglet.graphics.TextureGroup(
-                boulder_texture)
+            EntityType.LARGE_BOULDER: pyglet.graphics.TextureGroup(textures['boulder']),
+            EntityType.SMALL_BOULDER: pyglet.graphics.TextureGroup(textures['boulder'])
         }
 
         # TODO find bullet texture
-        bullet_texture = load_image('ball.png')
         self.bullets = {
-            BulletType.STANDARD: pyglet.graphics.TextureGroup(bullet_texture),
-            BulletType.DYNAMITE: pyglet.graphics.TextureGroup(bullet_texture)
+            BulletType.STANDARD: pyglet.graphics.TextureGroup(textures['ball']),
+            BulletType.DYNAMITE: pyglet.graphics.TextureGroup(textures['ball'])
         }
 
-        platform_texture = load_image('platform.png')
-        hammer_texture = load_image('hammer.png')
-        laser_tower_texture = load_image('laser-tower.png')
-        drill_texture = load_image('drill.png')
         self.buildings = {
-            BuildingType.PLATFORM: pyglet.graphics.TextureGroup(platform_texture),
-            BuildingType.LASER: pyglet.graphics.TextureGroup(laser_tower_texture),
-            BuildingType.HAMMER: pyglet.graphics.TextureGroup(hammer_texture),
-            BuildingType.DRILL: pyglet.graphics.TextureGroup(drill_texture)
+            BuildingType.PLATFORM: pyglet.graphics.TextureGroup(textures['platform']),
+            BuildingType.LASER: pyglet.graphics.TextureGroup(textures['laser_tower']),
+            BuildingType.HAMMER: pyglet.graphics.TextureGroup(textures['hammer']),
+            BuildingType.DRILL: pyglet.graphics.TextureGroup(textures['drill'])
         }
 
-        tower_texture = load_image('tower.png')
-        arrow_texture = load_image('arrow.png')
-        ring_texture = load_image('ring.png')
         self.other = {
-            'arrow': pyglet.graphics.TextureGroup(arrow_texture),
-            'ring': pyglet.graphics.TextureGroup(ring_texture),
-            'tower': pyglet.graphics.TextureGroup(tower_texture)
+            'arrow': pyglet.graphics.TextureGroup(textures['arrow']),
+            'ring': pyglet.graphics.TextureGroup(textures['ring']),
+            'tower': pyglet.graphics.TextureGroup(textures['tower'])
         }
+        self.loaded = True
 
 
 class Renderer:
@@ -143,6 +198,134 @@ class Renderer:
         Renderer.colored_rectangle(batch, color, bottom_left, size)
 
 
+class VertexLayer:
+    """
+    Vertices that are written in place into a buffer that is allocated once and only grows,
+    OpenGL reads them straight from there, so nothing is allocated per sprite and frame.
+    """
+
+    def __init__(self, stride: int, capacity: int = 64) -> None:
+        """
+        :param stride: number of floats per sprite
+        :param capacity: number of sprites the buffer has room for initially
+        """
+        self.stride = stride
+        self.count = 0
+        self.capacity = 0
+        self.vertices = (gl.GLfloat * 0)()
+        self.reserve(capacity)
+
+    def reserve(self, capacity: int):
+        if capacity <= self.capacity:
+            return
+
+        capacity = max(capacity, self.capacity * 2)
+        vertices = (gl.GLfloat * (capacity * self.stride))()
+        ctypes.memmove(vertices, self.vertices, self.count * self.stride * ctypes.sizeof(gl.GLfloat))
+        self.vertices = vertices
+        self.grow(self.capacity, capacity)
+        self.capacity = capacity
+
+    def grow(self, old_capacity: int, capacity: int):
+        """
+        Called when the buffer has grown, for layers that keep additional per sprite data
+        """
+        pass
+
+    def clear(self):
+        self.count = 0
+
+    def append(self, values: List[float]):
+        """
+        :param values: the stride floats of one sprite
+        """
+        if self.count == self.capacity:
+            self.reserve(self.count + 1)
+
+        start = self.count * self.stride
+        self.vertices[start:start + self.stride] = values
+        self.count += 1
+
+
+class SpriteLayer(VertexLayer):
+    """
+    Rectangles that share one texture and are drawn with a single call.
+    """
+
+    def __init__(self, tex_max: float = 1.0, capacity: int = 64) -> None:
+        self.tex_max = tex_max
+        self.tex_coords = (gl.GLfloat * 0)()
+        super().__init__(8, capacity)
+
+    def grow(self, old_capacity: int, capacity: int):
+        # the texture coordinates are the same for all sprites, only the new ones have to be filled in
+        tex_coords = (gl.GLfloat * (capacity * 8))()
+        ctypes.memmove(tex_coords, self.tex_coords, old_capacity * 8 * ctypes.sizeof(gl.GLfloat))
+        tex_max = self.tex_max
+        tex_coords[old_capacity * 8:] = [tex_max, 0, tex_max, tex_max, 0, tex_max, 0, 0] * (capacity - old_capacity)
+        self.tex_coords = tex_coords
+
+    def add(self, position: Vector, size: Vector):
+        """
+        :param position: bottom left of rectangle
+        """
+        left = position.x
+        bottom = position.y
+        right = left + size.x
+        top = bottom + size.y
+        # same corner order as Renderer.textured_rectangle
+        self.append([right, bottom, right, top, left, top, left, bottom])
+
+    def draw(self, texture_group: pyglet.graphics.TextureGroup):
+        if self.count == 0:
+            return
+
+        texture_group.set_state()
+        gl.glPushClientAttrib(gl.GL_CLIENT_VERTEX_ARRAY_BIT)
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glEnableClientState(gl.GL_TEXTURE_COORD_ARRAY)
+        gl.glVertexPointer(2, gl.GL_FLOAT, 0, self.vertices)
+        gl.glTexCoordPointer(2, gl.GL_FLOAT, 0, self.tex_coords)
+        gl.glDrawArrays(gl.GL_QUADS, 0, self.count * 4)
+        gl.glPopClientAttrib()
+        texture_group.unset_state()
+
+
+class PointLayer(VertexLayer):
+    """
+    Stand-in for a sprite layer when the sprites are only a few pixels big on the screen.
+    Every sprite is drawn as one point of the same color and size, with a single call.
+    """
+
+    def __init__(self, color: Tuple[int, int, int], capacity: int = 64) -> None:
+        self.color = color
+        super().__init__(2, capacity)
+
+    def add(self, position: Vector, size: Vector):
+        """
+        Same arguments as SpriteLayer.add, the point is placed in the center of the rectangle
+        :param position: bottom left of rectangle
+        """
+        self.append([position.x + size.x / 2, position.y + size.y / 2])
+
+    def draw(self, point_size: float = 3):
+        """
+        :param point_size: diameter of the points in pixels, independent of the zoom
+        """
+        if self.count == 0:
+            return
+
+        gl.glPushAttrib(gl.GL_POINT_BIT | gl.GL_CURRENT_BIT)
+        gl.glPushClientAttrib(gl.GL_CLIENT_VERTEX_ARRAY_BIT)
+        gl.glPointSize(point_size)
+        gl.glColor3ub(*self.color)
+        gl.glEnableClientState(gl.GL_VERTEX_ARRAY)
+        gl.glVertexPointer(2, gl.GL_FLOAT, 0, self.vertices)
+        gl.glDrawArrays(gl.GL_POINTS, 0, self.count)
+        gl.glPopClientAttrib()
+        gl.glPopAttrib()
+
+
 class MovementGroup(pyglet.graphics.Group):
     def __init__(self, angle: float, position: Vector, parent: pyglet.graphics.Group = None) -> None:
         super().__init__(parent)
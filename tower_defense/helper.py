@@ -1,5 +1,6 @@
 import math
-from typing import Callable, Tuple
+import time
+from typing import Callable, List, Tuple
 
 import os
 
@@ -11,6 +12,8 @@ class KeyPresses:
         self.up = False
         self.down = False
         self.back_space = False
+        self.zoom_in = False
+        self.zoom_out = False
         self.text = ""
 
 
@@ -84,6 +87,14 @@ class Vector:
         raise ValueError("Divident must be float or int")
 
 
+def interpolate(previous: Vector, current: Vector, alpha: float) -> Vector:
+    """
+    Linear interpolation between two simulation states of a position
+    :param alpha: 0 returns the previous position, 1 returns the current one
+    """
+    return previous + (current - previous) * alpha
+
+
 def rect_contains_point(point: Vector, rect_position: Vector, rect_size: Vector):
     """
     :param point:
@@ -126,6 +137,31 @@ def process_clicks(game_state, processor: Callable[[object, MouseClick], bool],
             game_state.mouse_clicks.remove(click)
 
 
+class StageTimer:
+    """
+    Measures how long the consecutive stages of e.g. the startup take
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self.clock = clock
+        self.start = clock()
+        self.last = self.start
+        # stage name and duration in seconds
+        self.stages: List[Tuple[str, float]] = []
+
+    def mark(self, stage: str):
+        """
+        Ends the current stage
+        """
+        now = self.clock()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def report(self) -> str:
+        stages = ", ".join(f"{stage}: {duration * 1000:.1f}ms" for stage, duration in self.stages)
+        return f"{stages}, total: {(self.last - self.start) * 1000:.1f}ms"
+
+
 def maps_list(maps_path: str):
     maps = []
     for file in os.listdir(maps_path):
@@ -148,3 +184,13 @@ def get_res_path():
 @resolve_relative_path
 def get_maps_path():
     return os.path.join(get_res_path(), "maps")
+
+
+@resolve_relative_path
+def get_stats_path():
+    return os.path.join(get_res_path(), "stats.json")
+
+
+@resolve_relative_path
+def get_texture_cache_path():
+    return os.path.join(get_res_path(), "textures.cache")
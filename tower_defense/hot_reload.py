@@ -6,8 +6,9 @@ Python reload function that actually works (the way you expect it to)
  - No re-importing necessary
  - Modules can be reloaded in any order
  - Replaces functions and methods with their updated code
- - Changes instances to use updated classes
+ - Updates classes in place, so existing instances use the new code
  - Automatically decides which modules to update by comparing file modification times
+ - Can watch the modules in a background thread (ModuleWatcher)
 
 Does NOT:
  - re-initialize exting instances, even if __init__ changes
@@ -20,54 +21,142 @@ Does NOT:
        print module.someObject
 """
 
+import importlib
+import importlib.util
 import inspect
 import os
+import queue
 import sys
-import importlib
-import gc
+import threading
+import types
+from typing import Dict, List, Optional
+
+# module name -> modification time of its source file when it was last (re)loaded
+source_mtimes: Dict[str, float] = {}
+
+
+def module_source(module) -> Optional[str]:
+    """
+    :return: path of the .py file of the module or None, if the module does not have one
+    """
+    if not inspect.ismodule(module) or module.__name__ == '__main__':
+        return None
+    path: Optional[str] = getattr(module, '__file__', None)
+    if path is None:
+        return None
+    base, extension = os.path.splitext(path)
+    if extension not in ['.py', '.pyc']:
+        return None
+    return base + '.py'
+
+
+def has_changed(module_name: str, source: str) -> bool:
+    """
+    Compares the modification time of the source with the one from the last check.
+    The first time a module is checked, its byte code cache is used instead (it is written when the module is imported).
+    """
+    try:
+        mtime = os.stat(source).st_mtime
+    except OSError:
+        return False
+
+    previous = source_mtimes.get(module_name)
+    source_mtimes[module_name] = mtime
+    if previous is not None:
+        return mtime != previous
+
+    try:
+        return os.stat(importlib.util.cache_from_source(source)).st_mtime < mtime
+    except (OSError, NotImplementedError):
+        # there is no byte code cache, so we can't tell whether the module is up to date
+        return True
 
 
 def reload_all(whitelist=None, debug=False):
     """
     Automatically reload everything that's in the whitelist.
-    - Skips reload if the file has not been updated (if .pyc is newer than .py)
+    - Skips reload if the source file has not been modified since the last check
     """
     for module_name in whitelist:
-        if module_name not in sys.modules:
+        module = sys.modules.get(module_name)
+        source = module_source(module)
+        if source is None:
             continue
 
-        module = sys.modules[module_name]
-
-        if not inspect.ismodule(module):
-            continue
-        if module_name == '__main__':
+        if not has_changed(module_name, source):
+            if debug:
+                print(f"Ignoring unchanged module {module}")
             continue
 
-        if not hasattr(module, '__file__') or os.path.splitext(module.__file__)[1] not in ['.py', '.pyc']:
-            # Ignore if the module does not have a .py file
-            continue
+        safe_reload_module(module, debug)
 
-        # Ignore if the .pyc is newer than the .py (or if there is no pyc or py)
-        py = os.path.splitext(module.__file__)[0] + '.py'
 
-        # Get .pyc file name
-        pyc = py.split(os.sep)
-        file_name = list(os.path.splitext(pyc[-1]))
-        file_name[1] = file_name[1] + "c"
-        file_name = file_name[0] + ".cpython-36" + file_name[1]
-        pyc = pyc[:-1] + ['__pycache__'] + [file_name]
-        pyc = os.sep.join(pyc)
+def safe_reload_module(module, debug=False):
+    try:
+        reload_module(module, debug=debug, lists=True, dicts=True)
+    except Exception as e:
+        print(e)
+        print("Error while reloading module %s, skipping\n" % module)
 
-        if os.path.isfile(pyc) and os.path.isfile(py) and os.stat(pyc).st_mtime >= os.stat(py).st_mtime:
-            if debug:
-                print(f"Ignoring unchanged module {module}")
-            continue
 
-        try:
-            reload_module(module, debug=debug, lists=True, dicts=True)
-        except Exception as e:
-            print(e)
-            print("Error while reloading module %s, skipping\n" % module)
+class ModuleWatcher:
+    """
+    Polls the source files of the whitelisted modules in a background thread and queues the modules that changed.
+    The queued modules are reloaded by calling reload_changed (e.g. once per frame), which is cheap if nothing changed.
+    """
+
+    def __init__(self, whitelist: List[str], interval: float = 0.5, debug: bool = False) -> None:
+        self.whitelist = list(whitelist)
+        self.interval = interval
+        self.debug = debug
+        self.mtimes: Dict[str, float] = {}
+        self.changed: queue.Queue = queue.Queue()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="ModuleWatcher", daemon=True)
+
+    def start(self):
+        self.poll()
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        for module_name in self.whitelist:
+            source = module_source(sys.modules.get(module_name))
+            if source is None:
+                continue
+            try:
+                mtime = os.stat(source).st_mtime
+            except OSError:
+                continue
+
+            previous = self.mtimes.get(module_name)
+            self.mtimes[module_name] = mtime
+            if previous is not None and previous != mtime:
+                self.changed.put(module_name)
+
+    def reload_changed(self) -> List[str]:
+        """
+        Reloads all modules that changed since the last call (has to be called from the main thread)
+        :return: names of the reloaded modules
+        """
+        module_names: List[str] = []
+        while True:
+            try:
+                module_name = self.changed.get_nowait()
+            except queue.Empty:
+                break
+            if module_name not in module_names:
+                module_names.append(module_name)
+
+        for module_name in module_names:
+            safe_reload_module(sys.modules[module_name], self.debug)
+        return module_names
 
 
 def reload_module(module, debug=False, lists=False, dicts=False):
@@ -75,7 +164,7 @@ def reload_module(module, debug=False, lists=False, dicts=False):
     Replacement for the builtin reload function:
     - Reloads the module as usual
     - Updates all old functions and class methods to use the new code
-    - Updates all instances of each modified class to use the new class
+    - Updates all modified classes in place, so that their instances use the new code
     - Can update lists and dicts, but this is disabled by default
     - Requires that class and function names have not changed
     """
@@ -97,20 +186,22 @@ def reload_module(module, debug=False, lists=False, dicts=False):
         if old is new or new is None:
             continue
 
-        if inspect.isclass(old):
+        if inspect.isclass(old) and inspect.isclass(new):
             if debug:
                 print("  Updating class %s.%s (0x%x -> 0x%x)" %
                       (module.__name__, k, id(old), id(new)))
             update_class(old, new, debug)
+            # the module keeps using the old (now updated) class
+            newDict[k] = old
 
-        elif inspect.isfunction(old):
-            depth = update_function(old, new, debug)
+        elif inspect.isfunction(old) and inspect.isfunction(new):
+            if old.__code__.co_freevars != new.__code__.co_freevars:
+                # the closure changed, so the code can't be swapped, the module uses the new function instead
+                continue
+            update_function(old, new, debug)
+            newDict[k] = old
             if debug:
-                extra = ""
-                if depth > 0:
-                    extra = " (and %d previous versions)" % depth
-                print("  Updating function %s.%s%s" %
-                      (module.__name__, k, extra))
+                print("  Updating function %s.%s" % (module.__name__, k))
 
         elif lists and isinstance(old, list):
             length = len(old)
@@ -120,117 +211,85 @@ def reload_module(module, debug=False, lists=False, dicts=False):
 
         elif dicts and isinstance(old, dict):
             old.update(new)
-            for k in old:
-                if k not in new:
-                    del old[k]
+            for key in list(old):
+                if key not in new:
+                    del old[key]
 
 
 def update_function(old, new, debug):
     old.__code__ = new.__code__
     old.__defaults__ = new.__defaults__
+    old.__kwdefaults__ = new.__kwdefaults__
 
 
-def old_update_function(old, new, debug, depth=0, visited=None):
-    # For functions:
-    # 1) update the code and defaults to new versions.
-    # 2) keep a reference to the previous version so ALL versions get updated for every reload
-    if debug and depth > 0:
-        print("    -> also updating previous version", old, " -> ", new)
+def make_cell(value):
+    return (lambda: value).__closure__[0]
 
-    old.__code__ = new.__code__
-    old.__defaults__ = new.__defaults__
 
-    if visited is None:
-        visited = []
-    if old in visited:
-        return
-    visited.append(old)
+def rebind_class_cell(function, cls):
+    """
+    Methods that use super() reference their class in a closure cell.
+    Returns a copy of the function that references the given class instead.
+    """
+    if '__class__' not in function.__code__.co_freevars:
+        return function
+
+    closure = tuple(make_cell(cls) if name == '__class__' else cell
+                    for name, cell in zip(function.__code__.co_freevars, function.__closure__))
+    result = types.FunctionType(function.__code__, function.__globals__, function.__name__,
+                                function.__defaults__, closure)
+    result.__kwdefaults__ = function.__kwdefaults__
+    result.__qualname__ = function.__qualname__
+    result.__dict__.update(function.__dict__)
+    return result
+
 
-    # finally, update any previous versions still hanging around..
-    if hasattr(old, '__previous_reload_version__'):
-        max_depth = old_update_function(
-            old.__previous_reload_version__, new, debug, depth=depth + 1, visited=visited)
-    else:
-        max_depth = depth
+def update_method(old_class, name, old, new, debug):
+    """
+    Updates the code of the old function in place, so that bound methods that are stored somewhere are updated too.
+    If that is not possible (the closure changed), the new function replaces the old one.
+    """
+    if old.__code__.co_freevars == new.__code__.co_freevars:
+        update_function(old, new, debug)
+        return old
 
-    # We need to keep a pointer to the previous version so we remember to update BOTH
-    # when the next reload comes around.
-    if depth == 0:
-        new.__previous_reload_version__ = old
-    return max_depth
+    if debug:
+        print("    Replacing method", name)
+    return rebind_class_cell(new, old_class)
 
 
 def update_class(old, new, debug):
     # For classes:
-    # 1) find all instances of the old class and set instance.__class__ to the new class
-    # 2) update all old class methods to use code from the new class methods
+    # The body of the new class is copied into the old class. Existing instances, subclasses and any other
+    # references keep using the old class object, but run the new code. This way there is no need to track down
+    # instances or subclasses (e.g. with gc.get_referrers, which scans the whole heap).
+    for name, new_attribute in new.__dict__.items():
+        if name in ('__dict__', '__weakref__'):
+            continue
 
-    # Track down all instances and subclasses of old
-    refs = gc.get_referrers(old)
-    for ref in refs:
-        try:
-            if isinstance(ref, old) and ref.__class__ is old:
-                ref.__class__ = new
-                if debug:
-                    print("    Changed class for", safe_str(ref))
-            elif inspect.isclass(ref) and issubclass(ref, old) and old in ref.__bases__:
-                ind = ref.__bases__.index(old)
-
-                # Does not work:
-                # ref.__bases__ = ref.__bases__[:ind] + (new,) + ref.__bases__[ind+1:]
-                # reason: Even though we change the code on methods, they remain bound
-                # to their old classes (changing im_class is not allowed). Instead,
-                # we have to update the __bases__ such that this class will be allowed
-                # as an argument to older methods.
-
-                # This seems to work. Is there any reason not to?
-                # Note that every time we reload, the class hierarchy becomes more complex.
-                # (and I presume this may slow things down?)
-                ref.__bases__ = ref.__bases__[
-                    :ind] + (new, old) + ref.__bases__[ind + 1:]
-                if debug:
-                    print("    Changed superclass for", safe_str(ref))
-            # else:
-                # if debug:
-                    # print "    Ignoring reference", type(ref)
-        except Exception as err:
-            print("Error updating reference (%s) for class change (%s -> %s)" %
-                  (safe_str(ref), safe_str(old), safe_str(new)))
-            raise
-
-    # update all class methods to use new code.
-    # Generally this is not needed since instances already know about the new class,
-    # but it fixes a few specific cases (pyqt signals, for one)
-    for attr in dir(old):
-        oa = getattr(old, attr)
-        if inspect.ismethod(oa):
-            try:
-                na = getattr(new, attr)
-            except AttributeError:
-                if debug:
-                    print(
-                        "    Skipping method update for %s; new class does not have this attribute" % attr)
+        old_attribute = old.__dict__.get(name)
+        if inspect.isfunction(old_attribute) and inspect.isfunction(new_attribute):
+            attribute = update_method(old, name, old_attribute, new_attribute, debug)
+            if attribute is old_attribute:
+                continue
+        elif isinstance(new_attribute, (staticmethod, classmethod)) and type(old_attribute) is type(new_attribute):
+            function = update_method(old, name, old_attribute.__func__, new_attribute.__func__, debug)
+            if function is old_attribute.__func__:
                 continue
+            attribute = type(new_attribute)(function)
+        elif inspect.isfunction(new_attribute):
+            attribute = rebind_class_cell(new_attribute, old)
+        else:
+            attribute = new_attribute
 
-            if hasattr(oa, 'im_func') and hasattr(na, 'im_func') and oa.im_func is not na.im_func:
-                depth = update_function(oa.im_func, na.im_func, debug)
-                # oa.im_class = new  ## bind old method to new class  ## not allowed
-                if debug:
-                    extra = ""
-                    if depth > 0:
-                        extra = " (and %d previous versions)" % depth
-                    print("    Updating method %s%s" % (attr, extra))
-
-    # And copy in new functions that didn't exist previously
-    for attr in dir(new):
-        if not hasattr(old, attr):
+        try:
+            setattr(old, name, attribute)
+        except (AttributeError, TypeError) as err:
             if debug:
-                print("    Adding missing attribute", attr)
-            setattr(old, attr, getattr(new, attr))
-
-    # finally, update any previous versions still hanging around..
-    if hasattr(old, '__previous_reload_version__'):
-        update_class(old.__previous_reload_version__, new, debug)
+                print("    Could not update attribute", name, err)
+            continue
+        if debug:
+            print("    Updated attribute", name)
 
 
 # It is possible to build classes for which str(obj) just causes an exception.
@@ -0,0 +1,230 @@
+"""
+Records the input of every frame (key presses, mouse clicks, mouse position, window size and frame time)
+into a compact file and replays it, e.g. to compare the frame timings of different builds.
+
+Recording:
+    python -m tower_defense --record session.rec
+
+Replaying:
+    python -m tower_defense.input_recording session.rec [--hidden] [--output timings.csv]
+"""
+import argparse
+import struct
+import sys
+import time
+import zlib
+from concurrent.futures import wait
+from typing import List, Tuple
+
+import pyglet
+
+from .game_state import GameState
+from .game_types import GameMode
+from .helper import KeyPresses, MouseClick, Vector
+
+MAGIC = b'TDIR'
+VERSION = 2
+HEADER = struct.Struct('<4sH')
+# frame time, window width and height, mouse position, game mode, key flags, number of clicks, length of text
+FRAME = struct.Struct('<dHHffBBBH')
+CLICK = struct.Struct('<ffB')
+
+KEY_FLAGS = ('up', 'down', 'left', 'right', 'back_space', 'zoom_in', 'zoom_out')
+# the number of ticks of the max game speed usually depends on how fast the machine is,
+# while recording and replaying it is fixed, so that the replay runs the same simulation
+TURBO_STEPS = 100
+
+
+class InputFrame:
+    def __init__(self, dt: float = 0.0, mode: GameMode = GameMode.MAIN_MENU, window_size: Vector = None,
+                 mouse_position: Vector = None, key_presses: KeyPresses = None,
+                 mouse_clicks: List[MouseClick] = None) -> None:
+        self.dt = dt
+        # mode of the game at the beginning of the frame
+        self.mode = mode
+        self.window_size = window_size or Vector()
+        self.mouse_position = mouse_position or Vector()
+        self.key_presses = key_presses or KeyPresses()
+        self.mouse_clicks = mouse_clicks or []
+
+    def encode(self) -> bytes:
+        flags = 0
+        for bit, key in enumerate(KEY_FLAGS):
+            if getattr(self.key_presses, key):
+                flags |= 1 << bit
+
+        text = self.key_presses.text.encode('utf-8')
+        data = FRAME.pack(self.dt, int(self.window_size.x), int(self.window_size.y),
+                          self.mouse_position.x, self.mouse_position.y, self.mode.value, flags,
+                          len(self.mouse_clicks), len(text))
+        for click in self.mouse_clicks:
+            data += CLICK.pack(click.position.x, click.position.y, click.button or 0)
+        return data + text
+
+    @staticmethod
+    def decode(data: bytes, offset: int) -> Tuple['InputFrame', int]:
+        """
+        :return: the decoded frame and the offset of the next frame
+        """
+        dt, width, height, mouse_x, mouse_y, mode, flags, num_clicks, text_length = FRAME.unpack_from(data, offset)
+        offset += FRAME.size
+
+        key_presses = KeyPresses()
+        for bit, key in enumerate(KEY_FLAGS):
+            setattr(key_presses, key, bool(flags & (1 << bit)))
+
+        mouse_clicks = []
+        for _ in range(num_clicks):
+            x, y, button = CLICK.unpack_from(data, offset)
+            offset += CLICK.size
+            click = MouseClick()
+            click.position = Vector(x, y)
+            click.button = button
+            mouse_clicks.append(click)
+
+        key_presses.text = data[offset:offset + text_length].decode('utf-8')
+        offset += text_length
+
+        frame = InputFrame(dt, GameMode(mode), Vector(width, height), Vector(mouse_x, mouse_y),
+                           key_presses, mouse_clicks)
+        return frame, offset
+
+    def apply(self, game_state):
+        game_state.key_presses = self.key_presses
+        game_state.mouse_clicks = list(self.mouse_clicks)
+        game_state.mouse_position = self.mouse_position.copy()
+
+
+class InputRecorder:
+    def __init__(self) -> None:
+        self.compressor = zlib.compressobj(9)
+        self.chunks: List[bytes] = []
+        self.num_frames = 0
+
+    def record(self, game_state, window_size: Vector, dt: float):
+        """
+        Has to be called right before the game state is ticked.
+        """
+        key_presses = KeyPresses()
+        key_presses.__dict__.update(game_state.key_presses.__dict__)
+        frame = InputFrame(dt, game_state.mode, window_size, game_state.mouse_position.copy(), key_presses,
+                           list(game_state.mouse_clicks))
+        self.chunks.append(self.compressor.compress(frame.encode()))
+        self.num_frames += 1
+
+    def save(self, path: str):
+        self.chunks.append(self.compressor.flush())
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION))
+            for chunk in self.chunks:
+                f.write(chunk)
+        print("Saved", self.num_frames, "frames of input to", path)
+
+
+def load_recording(path: str) -> List[InputFrame]:
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    magic, version = HEADER.unpack_from(content)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not an input recording of version {VERSION}")
+
+    data = zlib.decompress(content[HEADER.size:])
+    frames = []
+    offset = 0
+    while offset < len(data):
+        frame, offset = InputFrame.decode(data, offset)
+        frames.append(frame)
+    return frames
+
+
+def wait_for_map_loader(game_state):
+    """
+    Loading maps takes a different number of frames every time, so the replay waits for the loader to finish.
+    """
+    if game_state.mode == GameMode.LOADING and game_state.map_loader.future is not None:
+        wait([game_state.map_loader.future])
+
+
+def replay_frame(game_state, window, frame: InputFrame) -> bool:
+    """
+    :return: False if the frame was skipped, because it was only recorded while a map was loading
+    """
+    wait_for_map_loader(game_state)
+    if frame.mode == GameMode.LOADING and game_state.mode != GameMode.LOADING:
+        # the time of the frame still passes on the game clock, like it did while recording,
+        # otherwise the simulation ticks of the following frames would be different
+        game_state.clock.advance(frame.dt)
+        return False
+
+    if Vector(*window.get_size()) != frame.window_size:
+        window.set_size(int(frame.window_size.x), int(frame.window_size.y))
+
+    frame.apply(game_state)
+    window.clear()
+    game_state.tick(window, frame.dt)
+    game_state.clean_up()
+    window.flip()
+    return True
+
+
+def replay(game_state, window, frames: List[InputFrame]) -> List[float]:
+    """
+    Feeds the recorded frames into the game state as fast as possible.
+    :return: time in seconds that every replayed frame took
+    """
+    timings = []
+    for frame in frames:
+        window.dispatch_events()
+        start = time.perf_counter()
+        if replay_frame(game_state, window, frame):
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def timing_report(timings: List[float]) -> str:
+    if not timings:
+        return "No frames were replayed"
+
+    milliseconds = sorted(timing * 1000 for timing in timings)
+
+    def percentile(p):
+        return milliseconds[min(len(milliseconds) - 1, int(len(milliseconds) * p))]
+
+    total = sum(milliseconds)
+    return (f"frames: {len(milliseconds)}, total: {total / 1000:.3f}s, mean: {total / len(milliseconds):.3f}ms, "
+            f"median: {percentile(0.5):.3f}ms, p95: {percentile(0.95):.3f}ms, p99: {percentile(0.99):.3f}ms, "
+            f"max: {milliseconds[-1]:.3f}ms")
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Replays a recorded play session and reports the frame timings.")
+    parser.add_argument('recording', help="file that was written with 'python -m tower_defense --record'")
+    parser.add_argument('--hidden', action='store_true', help="don't show the window while replaying")
+    parser.add_argument('--output', help="CSV file to write the time of every frame to")
+    args = parser.parse_args(argv)
+
+    frames = load_recording(args.recording)
+    window_size = frames[0].window_size if frames else Vector(1280, 720)
+    window = pyglet.window.Window(width=int(window_size.x), height=int(window_size.y), visible=not args.hidden)
+    pyglet.gl.glEnable(pyglet.gl.GL_BLEND)
+    pyglet.gl.glBlendFunc(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
+
+    gs = GameState()
+    # same as while recording
+    gs.init(lazy=True)
+    gs.clock.turbo_steps = TURBO_STEPS
+
+    timings = replay(gs, window, frames)
+    window.close()
+
+    print(timing_report(timings), file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write("frame,milliseconds\n")
+            for index, timing in enumerate(timings):
+                f.write(f"{index},{timing * 1000:.4f}\n")
+
+
+if __name__ == '__main__':
+    main()
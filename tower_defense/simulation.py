@@ -0,0 +1,72 @@
+from typing import Tuple, Optional
+
+from .buildings import building_manager as bm
+from .entities import entity_manager as em
+from .tiles import tile_map as tm
+from .helper import Vector
+
+
+class SimulationState:
+    """
+    The part of the game state that is needed to run the game logic.
+    It does not depend on a window or on textures, so it can also be used headless.
+    """
+
+    def __init__(self):
+        self.window_size = Vector()
+        self.mouse_position = Vector()
+
+        self.tile_map: tm.TileMap = tm.TileMap()
+        self.entity_manager: em.EntityManager = em.EntityManager()
+        self.building_manager: bm.BuildingManager = bm.BuildingManager()
+
+        self.player_health = 100
+
+        self.world_offset: Vector = Vector(self.tile_map.border_width * 2,
+                                           self.tile_map.border_width * 2)
+        # the world is scaled by the zoom factor when it is rendered, the user interface is not
+        self.zoom = 1.0
+
+    @property
+    def view_size(self) -> Vector:
+        """
+        Size of the part of the world that is visible in the window
+        """
+        return self.window_size / self.zoom
+
+    def world_to_window_space(self, position: Vector, size: Vector, center_position: bool = False) -> Optional[Vector]:
+        if center_position:
+            position = Vector(position.x - size.x / 2, position.y - size.y / 2)
+
+        position += self.world_offset
+        if position.x + size.x < 0 or position.y + size.y < 0:
+            return None
+        view_size = self.view_size
+        if position.x > view_size.x or position.y - size.y > view_size.y:
+            return None
+
+        return position
+
+    def world_to_index_space(self, position: Vector) -> Tuple[int, int]:
+        return int(position.x / self.tile_map.tile_size.x), int(position.y / self.tile_map.tile_size.y)
+
+    def index_to_world_space(self, index: Vector) -> Vector:
+        # TODO change indexes to Vector objects
+        if isinstance(index, tuple):
+            index = Vector(point=index)  # type: ignore
+        x = index.x
+        y = index.y
+        return Vector(x * self.tile_map.tile_size.x, y * self.tile_map.tile_size.y)
+
+    def window_to_view_space(self, position: Vector) -> Vector:
+        return position / self.zoom
+
+    def window_to_world_space(self, position: Vector) -> Vector:
+        return self.window_to_view_space(position) - self.world_offset
+
+    def simulate(self):
+        """
+        Runs one fixed time step of the game simulation
+        """
+        self.entity_manager.update(self)
+        self.building_manager.update(self)
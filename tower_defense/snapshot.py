@@ -0,0 +1,396 @@
+"""
+Compact binary snapshots of the complete simulation state (player, entities, buildings, bullets and optionally the
+tile map). Taking a snapshot only packs numbers into a byte string, so it is cheap enough to do every few seconds.
+Chunked maps are stored as a reference to the map file together with the path layer and the chunks that have been
+changed since the map file has been written, so no other chunks have to be loaded.
+"""
+import struct
+import zlib
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from .buildings.building_manager import BuildingManager
+from .entities import entity_manager as em
+from .entities.bullet import Bullet
+from .entities.route import Route
+from .game_types import BuildingType, BulletType, EntityType, TargetingMode, TileType
+from .helper import Vector
+from .tiles.chunks import PATH_TILE, ChunkedTiles, decode_directions, encode_directions
+from .tiles.tile import Tile
+
+MAGIC = b'TDSS'
+VERSION = 5
+FLAG_TILE_MAP = 1
+FLAG_FREE_BUILD = 2
+
+HEADER = struct.Struct('<4sHB')
+COUNT = struct.Struct('<I')
+# player health, gold
+PLAYER = struct.Struct('<dd')
+# entity manager class, spawn timer, spawn delay, wave count, should spawn, spawn count, follow routes
+ENTITY_MANAGER = struct.Struct('<BiiIBIB')
+# max tiles, length of the path, chunked
+TILE_MAP = struct.Struct('<HHHB')
+# chunk index, length of the compressed tile types
+CHUNK = struct.Struct('<2HI')
+# type, position, previous position, size, velocity, acceleration, next tile index, health, max speed,
+# player damage, path side, route, route distance, next route point, lateral offset
+ENTITY = struct.Struct('<B10d2h3dbidId')
+# tile index, position
+ROUTE_POINT = struct.Struct('<2h2d')
+# type, tile index, rotation angle, animation angle, animation speed, targeting mode
+BUILDING = struct.Struct('<B2h3dB')
+# type, position, previous position, size, velocity, damage
+BULLET = struct.Struct('<B9d')
+# building type, damage dealt
+DAMAGE = struct.Struct('<Bd')
+# tile index, number of directions
+GRAPH_NODE = struct.Struct('<2hB')
+# direction, counter
+GRAPH_EDGE = struct.Struct('<BI')
+
+ENTITY_MANAGER_CLASSES = [em.EntityManager, em.EditorEntityManager, em.GameEntityManager]
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+NO_TILE = 255
+
+
+def number(value: float):
+    """
+    Turns floats that were packed from integers back into integers (e.g. gold is displayed as text)
+    """
+    return int(value) if value.is_integer() else value
+
+
+class SnapshotWriter:
+    def __init__(self) -> None:
+        self.chunks: List[bytes] = []
+
+    def pack(self, layout: struct.Struct, *values):
+        self.chunks.append(layout.pack(*values))
+
+    def count(self, value: int):
+        self.chunks.append(COUNT.pack(value))
+
+    def raw(self, data: bytes):
+        self.chunks.append(data)
+
+    def getvalue(self) -> bytes:
+        return b''.join(self.chunks)
+
+
+class SnapshotReader:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.offset = 0
+
+    def unpack(self, layout: struct.Struct) -> tuple:
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def count(self) -> int:
+        return self.unpack(COUNT)[0]
+
+    def raw(self, length: int) -> bytes:
+        data = self.data[self.offset:self.offset + length]
+        self.offset += length
+        return data
+
+
+def write_tile_map(writer: SnapshotWriter, tile_map):
+    path = tile_map.path.encode('utf-8')
+    writer.pack(TILE_MAP, int(tile_map.max_tiles.x), int(tile_map.max_tiles.y), len(path), tile_map.is_chunked)
+    writer.raw(path)
+    if tile_map.is_chunked:
+        write_chunked_tiles(writer, tile_map.tiles)
+        return
+
+    data = bytearray()
+    for x in range(int(tile_map.max_tiles.x)):
+        for y in range(int(tile_map.max_tiles.y)):
+            tile = tile_map.tiles.get((x, y))
+            if tile is None:
+                data.append(NO_TILE)
+                continue
+            data.append(tile.tile_type.value)
+            data.append(len(tile.directions))
+            data.extend(DIRECTIONS.index(direction) for direction in tile.directions)
+    writer.count(len(data))
+    writer.raw(bytes(data))
+
+
+def write_chunked_tiles(writer: SnapshotWriter, tiles: ChunkedTiles):
+    writer.count(len(tiles.walkable))
+    for (x, y), tile in tiles.walkable.items():
+        writer.pack(PATH_TILE, x, y, tile.tile_type.value, encode_directions(tile.directions))
+
+    changed_chunks = tiles.changed_chunks()
+    writer.count(len(changed_chunks))
+    for (x, y), types in changed_chunks.items():
+        data = zlib.compress(types)
+        writer.pack(CHUNK, x, y, len(data))
+        writer.raw(data)
+
+
+def read_chunked_tiles(reader: SnapshotReader, tile_map):
+    """
+    Opens the map file the snapshot refers to and puts the path layer and the changed chunks of the snapshot on top
+    """
+    tile_map.open_chunked(tile_map.path)
+    tiles = tile_map.tiles
+    tiles.walkable = {}
+    for _ in range(reader.count()):
+        x, y, tile_type, directions = reader.unpack(PATH_TILE)
+        tile = Tile(Vector(x, y), tile_map.tile_size, TileType(tile_type))
+        tile.directions = decode_directions(directions)
+        tiles.walkable[(x, y)] = tile
+
+    # chunks share the walkable tiles with the path layer, so the ones loaded with the old path layer are dropped
+    tiles.loaded.clear()
+    for _ in range(reader.count()):
+        x, y, length = reader.unpack(CHUNK)
+        tiles.restore_chunk((x, y), zlib.decompress(reader.raw(length)))
+    if tiles.dirty:
+        # the map file doesn't contain the changed chunks
+        tile_map.revision += 1
+
+
+def read_tile_map(reader: SnapshotReader, tile_map):
+    max_x, max_y, path_length, chunked = reader.unpack(TILE_MAP)
+    tile_map.path = reader.raw(path_length).decode('utf-8')
+    tile_map.max_tiles = Vector(max_x, max_y)
+    if chunked:
+        read_chunked_tiles(reader, tile_map)
+        return
+
+    data = reader.raw(reader.count())
+    tiles = {}
+    offset = 0
+    for x in range(max_x):
+        for y in range(max_y):
+            tile_type = data[offset]
+            offset += 1
+            if tile_type == NO_TILE:
+                continue
+            tile = Tile(Vector(x, y), tile_map.tile_size, TileType(tile_type))
+            num_directions = data[offset]
+            tile.directions = [DIRECTIONS[index] for index in data[offset + 1:offset + 1 + num_directions]]
+            offset += 1 + num_directions
+            tiles[(x, y)] = tile
+    tile_map.tiles = tiles
+
+
+def write_entity_manager(writer: SnapshotWriter, entity_manager: em.EntityManager):
+    writer.pack(ENTITY_MANAGER, ENTITY_MANAGER_CLASSES.index(type(entity_manager)), entity_manager.spawn_timer,
+                entity_manager.spawn_delay, getattr(entity_manager, 'wave_count', 0),
+                getattr(entity_manager, 'should_spawn', False), entity_manager.spawn_count,
+                entity_manager.follow_routes)
+    wave = bytes(getattr(entity_manager, 'wave', []))
+    writer.count(len(wave))
+    writer.raw(wave)
+
+    writer.count(len(entity_manager.directions_graph))
+    for tile_index, directions in entity_manager.directions_graph.items():
+        writer.pack(GRAPH_NODE, tile_index[0], tile_index[1], len(directions))
+        for direction, counter in directions.items():
+            writer.pack(GRAPH_EDGE, DIRECTIONS.index(direction), counter)
+
+    writer.count(len(entity_manager.routes))
+    for route in entity_manager.routes:
+        writer.count(len(route.points))
+        for tile_index, point in zip(route.tiles, route.points):
+            writer.pack(ROUTE_POINT, tile_index[0], tile_index[1], point[0], point[1])
+
+    writer.count(len(entity_manager.entities))
+    for entity in entity_manager.entities:
+        next_tile_index = entity.next_tile_index if entity.next_tile_index is not None else (-1, -1)
+        writer.pack(ENTITY, entity.entity_type.value,
+                    entity.position.x, entity.position.y, entity.previous_position.x, entity.previous_position.y,
+                    entity.size.x, entity.size.y, entity.velocity.x, entity.velocity.y,
+                    entity.acceleration.x, entity.acceleration.y, next_tile_index[0], next_tile_index[1],
+                    entity.health, entity.max_speed, entity.player_damage, getattr(entity, 'path_side', 0),
+                    entity.route if entity.route is not None else -1, entity.route_distance, entity.route_point,
+                    entity.lateral_offset)
+
+
+def read_entity_manager(reader: SnapshotReader) -> em.EntityManager:
+    class_index, spawn_timer, spawn_delay, wave_count, should_spawn, spawn_count, follow_routes = \
+        reader.unpack(ENTITY_MANAGER)
+    entity_manager = ENTITY_MANAGER_CLASSES[class_index]()
+    entity_manager.spawn_timer = spawn_timer
+    entity_manager.spawn_delay = spawn_delay
+    entity_manager.spawn_count = spawn_count
+    entity_manager.follow_routes = bool(follow_routes)
+    wave = list(reader.raw(reader.count()))
+    if isinstance(entity_manager, em.GameEntityManager):
+        entity_manager.wave_count = wave_count
+        entity_manager.wave = wave
+    if isinstance(entity_manager, em.EditorEntityManager):
+        entity_manager.should_spawn = bool(should_spawn)
+
+    for _ in range(reader.count()):
+        x, y, num_directions = reader.unpack(GRAPH_NODE)
+        directions = {}
+        for _ in range(num_directions):
+            direction, counter = reader.unpack(GRAPH_EDGE)
+            directions[DIRECTIONS[direction]] = counter
+        entity_manager.directions_graph[(x, y)] = directions
+
+    for _ in range(reader.count()):
+        tiles = []
+        points = []
+        for _ in range(reader.count()):
+            x, y, point_x, point_y = reader.unpack(ROUTE_POINT)
+            tiles.append((x, y))
+            points.append((point_x, point_y))
+        route = Route(tiles, points)
+        entity_manager.route_ids[route.key] = len(entity_manager.routes)
+        entity_manager.routes.append(route)
+
+    for _ in range(reader.count()):
+        values = reader.unpack(ENTITY)
+        entity_type = EntityType(values[0])
+        entity = em.EntityManager.create_entity(entity_type, Vector(values[1], values[2]), Vector(), values[16])
+        entity.previous_position = Vector(values[3], values[4])
+        entity.size = Vector(values[5], values[6])
+        entity.velocity = Vector(values[7], values[8])
+        entity.acceleration = Vector(values[9], values[10])
+        entity.next_tile_index = (values[11], values[12]) if values[11] >= 0 else None
+        entity.health = number(values[13])
+        entity.max_speed = number(values[14])
+        entity.player_damage = number(values[15])
+        entity.route = values[17] if values[17] >= 0 else None
+        entity.route_distance = values[18]
+        entity.route_point = values[19]
+        entity.lateral_offset = values[20]
+        entity_manager.entities.append(entity)
+
+    return entity_manager
+
+
+def write_building_manager(writer: SnapshotWriter, building_manager: BuildingManager):
+    writer.count(len(building_manager.buildings))
+    for tile_index, building in building_manager.buildings.items():
+        writer.pack(BUILDING, building.building_type.value, tile_index[0], tile_index[1],
+                    getattr(building, 'rotation_angle', 0), getattr(building, 'animation_angle', 0),
+                    getattr(building, 'animation_speed', 0), building.targeting.value)
+
+    writer.count(len(building_manager.bullets))
+    for bullet in building_manager.bullets:
+        writer.pack(BULLET, bullet.bullet_type.value, bullet.position.x, bullet.position.y,
+                    bullet.previous_position.x, bullet.previous_position.y, bullet.size.x, bullet.size.y,
+                    bullet.velocity.x, bullet.velocity.y, bullet.damage)
+
+    writer.count(len(building_manager.damage_dealt))
+    for building_type, damage in building_manager.damage_dealt.items():
+        writer.pack(DAMAGE, building_type.value, damage)
+
+
+def read_building_manager(reader: SnapshotReader, building_manager: BuildingManager, tile_size: Vector):
+    building_manager.buildings = {}
+    for _ in range(reader.count()):
+        building_type, x, y, rotation_angle, animation_angle, animation_speed, targeting = reader.unpack(BUILDING)
+        building = BuildingManager.create_building((x, y), tile_size, BuildingType(building_type))
+        building.targeting = TargetingMode(targeting)
+        # only some building types rotate or are animated
+        if hasattr(building, 'rotation_angle'):
+            setattr(building, 'rotation_angle', number(rotation_angle))
+        if hasattr(building, 'animation_angle'):
+            setattr(building, 'animation_angle', number(animation_angle))
+            setattr(building, 'animation_speed', number(animation_speed))
+        building_manager.buildings[(x, y)] = building
+
+    building_manager.bullets = []
+    for _ in range(reader.count()):
+        values = reader.unpack(BULLET)
+        bullet = Bullet(Vector(values[1], values[2]), Vector(values[5], values[6]), Vector(values[7], values[8]))
+        bullet.bullet_type = BulletType(values[0])
+        bullet.previous_position = Vector(values[3], values[4])
+        bullet.damage = number(values[9])
+        building_manager.bullets.append(bullet)
+
+    building_manager.damage_dealt = {}
+    for _ in range(reader.count()):
+        building_type, damage = reader.unpack(DAMAGE)
+        building_manager.damage_dealt[BuildingType(building_type)] = number(damage)
+
+
+def take_snapshot(state, include_tile_map: bool = True) -> bytes:
+    """
+    :param state: SimulationState (or GameState) to take the snapshot of
+    :param include_tile_map: the tile map does not change while playing, so it can be left out of frequent snapshots
+    """
+    writer = SnapshotWriter()
+    flags = FLAG_TILE_MAP if include_tile_map else 0
+    if state.tile_map.free_build:
+        flags |= FLAG_FREE_BUILD
+    writer.pack(HEADER, MAGIC, VERSION, flags)
+    writer.pack(PLAYER, state.player_health, state.building_manager.gold)
+    if include_tile_map:
+        write_tile_map(writer, state.tile_map)
+    write_entity_manager(writer, state.entity_manager)
+    write_building_manager(writer, state.building_manager)
+    return writer.getvalue()
+
+
+def restore_snapshot(state, data: bytes):
+    """
+    Replaces the simulation state with the one from the snapshot.
+    If the snapshot does not contain a tile map, it has to be restored on the same map it was taken on.
+    """
+    reader = SnapshotReader(data)
+    magic, version, flags = reader.unpack(HEADER)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a snapshot of version {VERSION}")
+
+    player_health, gold = reader.unpack(PLAYER)
+    if flags & FLAG_TILE_MAP:
+        tile_map = type(state.tile_map)()
+        read_tile_map(reader, tile_map)
+        state.tile_map = tile_map
+
+    state.entity_manager = read_entity_manager(reader)
+    read_building_manager(reader, state.building_manager, state.tile_map.tile_size)
+    state.tile_map.free_build = bool(flags & FLAG_FREE_BUILD)
+    state.tile_map.set_blocked(state.building_manager.buildings)
+    if not state.tile_map.free_build:
+        # the directions are part of the snapshot, only the distances to the FINISH tiles are derived from them
+        state.tile_map.update_distances()
+    state.player_health = number(player_health)
+    state.building_manager.gold = number(gold)
+
+
+def save_snapshot(state, path: str):
+    with open(path, 'wb') as f:
+        f.write(take_snapshot(state))
+    print("Saved snapshot", path)
+
+
+def load_snapshot(state, path: str):
+    with open(path, 'rb') as f:
+        restore_snapshot(state, f.read())
+    print("Loaded snapshot", path)
+
+
+class SnapshotHistory:
+    """
+    Ring buffer of the snapshots taken at the start of the last waves
+    """
+
+    def __init__(self, capacity: int = 10) -> None:
+        # wave count and snapshot
+        self.snapshots: Deque[Tuple[int, bytes]] = deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def push(self, wave_count: int, snapshot: bytes):
+        self.snapshots.append((wave_count, snapshot))
+
+    def pop(self) -> Optional[Tuple[int, bytes]]:
+        if not self.snapshots:
+            return None
+        return self.snapshots.pop()
+
+    def clear(self):
+        self.snapshots.clear()
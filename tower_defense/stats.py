@@ -0,0 +1,100 @@
+import json
+from enum import Enum
+from typing import Dict, List, Optional, Type
+
+from .game_types import BuildingType, EntityType, BulletType
+from .helper import get_stats_path
+
+# section name -> type of the keys in this section and the stats that can be set for each type
+SECTIONS = {
+    'buildings': (BuildingType, ('range', 'cost', 'shooting_frequency', 'damage', 'damage_range')),
+    'entities': (EntityType, ('max_speed', 'health', 'player_damage')),
+    'bullets': (BulletType, ('damage',)),
+}
+
+StatData = Dict[str, Dict[str, Dict[str, float]]]
+
+
+def lookup(values: List[Optional[float]], stat_type, default=None):
+    """
+    :return: the stat of the given type or the default, if the type is unknown or the stat is missing
+    """
+    index = getattr(stat_type, 'value', None)
+    if not isinstance(index, int) or not 0 <= index < len(values) or values[index] is None:
+        return default
+    return values[index]
+
+
+class StatTables:
+    """
+    Stats of buildings, entities and bullets loaded from a table (res/stats.json).
+    The table is resolved into flat lists that are indexed by the value of the type.
+    """
+
+    def __init__(self) -> None:
+        self.data: StatData = {section: {} for section in SECTIONS}
+
+        self.building_range: List[Optional[float]] = []
+        self.building_cost: List[Optional[float]] = []
+        self.building_shooting_frequency: List[Optional[float]] = []
+        self.building_damage: List[Optional[float]] = []
+        self.building_damage_range: List[Optional[float]] = []
+
+        self.entity_max_speed: List[Optional[float]] = []
+        self.entity_health: List[Optional[float]] = []
+        self.entity_player_damage: List[Optional[float]] = []
+
+        self.bullet_damage: List[Optional[float]] = []
+
+    def load(self, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        self.data = {section: {} for section in SECTIONS}
+        self.update(data)
+
+    def update(self, data: StatData):
+        """
+        Merges the given stats into the table, e.g. {'buildings': {'DRILL': {'range': 200}}}
+        """
+        for section in data:
+            if section not in SECTIONS:
+                print("Unknown stat section", section)
+                continue
+
+            stat_type, stat_names = SECTIONS[section]
+            for type_name, stats in data[section].items():
+                if type_name not in stat_type.__members__:
+                    print("Unknown", section, "type", type_name)
+                    continue
+
+                for stat in stats:
+                    if stat not in stat_names:
+                        print("Unknown stat", stat, "for", type_name)
+                        continue
+                    self.data[section].setdefault(type_name, {})[stat] = stats[stat]
+
+        self.resolve()
+
+    def resolve_stat(self, section: str, stat: str) -> List[Optional[float]]:
+        stat_type: Type[Enum] = SECTIONS[section][0]
+        values: List[Optional[float]] = [None] * (max(int(t.value) for t in stat_type) + 1)
+        for t in stat_type:
+            values[int(t.value)] = self.data[section].get(t.name, {}).get(stat)
+        return values
+
+    def resolve(self):
+        self.building_range = self.resolve_stat('buildings', 'range')
+        self.building_cost = self.resolve_stat('buildings', 'cost')
+        self.building_shooting_frequency = self.resolve_stat('buildings', 'shooting_frequency')
+        self.building_damage = self.resolve_stat('buildings', 'damage')
+        self.building_damage_range = self.resolve_stat('buildings', 'damage_range')
+
+        self.entity_max_speed = self.resolve_stat('entities', 'max_speed')
+        self.entity_health = self.resolve_stat('entities', 'health')
+        self.entity_player_damage = self.resolve_stat('entities', 'player_damage')
+
+        self.bullet_damage = self.resolve_stat('bullets', 'damage')
+
+
+tables = StatTables()
+tables.load(get_stats_path())
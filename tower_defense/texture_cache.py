@@ -0,0 +1,107 @@
+"""
+Cache of the decoded texture images as raw RGBA data, so that they can be uploaded without decoding JPG/PNG files.
+Every image is stored together with the modification time and size of its source file,
+images that changed since the cache was built are decoded from the source file again.
+The pixel data is uploaded straight from the memory mapped cache file.
+
+Building the cache:
+    python -m tower_defense.texture_cache
+"""
+import argparse
+import ctypes
+import mmap
+import os
+import struct
+from typing import Dict, List, Tuple
+
+import pyglet
+
+MAGIC = b'TDTC'
+VERSION = 2
+# magic, version, number of images
+HEADER = struct.Struct('<4sHH')
+# length of the name, modification time (ns) and size of the source file, width, height, offset of the pixel data
+ENTRY = struct.Struct('<BQQIIQ')
+FORMAT = 'RGBA'
+
+
+def source_stamp(path: str) -> Tuple[int, int]:
+    """
+    :return: modification time in nanoseconds and size of the file
+    """
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_cache(res_path: str, files: Dict[str, str], cache_path: str):
+    """
+    :param files: name of the image -> file name relative to res_path
+    """
+    entries = []
+    pixels: List[bytes] = []
+    for name, file_name in files.items():
+        path = os.path.join(res_path, file_name)
+        image = pyglet.image.load(path)
+        entries.append((name.encode('utf-8'), source_stamp(path), image.width, image.height))
+        pixels.append(image.get_image_data().get_data(FORMAT, image.width * len(FORMAT)))
+
+    offset = HEADER.size + sum(ENTRY.size + len(entry[0]) for entry in entries)
+    with open(cache_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+        for (encoded_name, (mtime, size), width, height), data in zip(entries, pixels):
+            f.write(ENTRY.pack(len(encoded_name), mtime, size, width, height, offset))
+            f.write(encoded_name)
+            offset += len(data)
+        for data in pixels:
+            f.write(data)
+    print("Cached", len(entries), "textures in", cache_path)
+
+
+def load_cache(res_path: str, files: Dict[str, str], cache_path: str) -> Dict[str, pyglet.image.ImageData]:
+    """
+    The pixel data of the images is not copied, it points into the memory mapped cache file,
+    which stays open as long as one of the images is still referenced.
+    :return: the cached images whose source file has not changed since the cache was built
+    """
+    if not os.path.isfile(cache_path) or os.path.getsize(cache_path) < HEADER.size:
+        return {}
+
+    with open(cache_path, 'rb') as f:
+        # copy on write, so that ctypes can point into the mapping. Nothing is ever written to it.
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    magic, version, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        print("Ignoring texture cache of a different version", cache_path)
+        data.close()
+        return {}
+
+    images = {}
+    view = memoryview(data)
+    offset = HEADER.size
+    for _ in range(count):
+        name_length, mtime, size, width, height, data_offset = ENTRY.unpack_from(data, offset)
+        offset += ENTRY.size
+        name = str(view[offset:offset + name_length], 'utf-8')
+        offset += name_length
+
+        if name not in files or source_stamp(os.path.join(res_path, files[name])) != (mtime, size):
+            continue
+        pitch = width * len(FORMAT)
+        pixels = (ctypes.c_ubyte * (pitch * height)).from_buffer(data, data_offset)
+        images[name] = pyglet.image.ImageData(width, height, FORMAT, pixels, pitch)
+    view.release()
+    return images
+
+
+def main(argv: List[str] = None):
+    from .graphics import IMAGE_FILES
+    from .helper import get_res_path, get_texture_cache_path
+
+    parser = argparse.ArgumentParser(description="Decodes all texture images into a cache file.")
+    parser.add_argument('--output', default=get_texture_cache_path(), help="path of the cache file")
+    args = parser.parse_args(argv)
+    build_cache(get_res_path(), IMAGE_FILES, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Saves the map that is open in the editor in the background, periodically and when the Save button is pressed.
+
+The main thread only copies the tile types and directions, the tiles are pickled and written in a worker thread.
+Maps are written to a temporary file first, which then replaces the map, so that a crash never leaves a half
+written map behind.
+"""
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from ..game_types import TileType
+from ..helper import Vector
+from .tile import Tile
+
+# tile index, tile type and directions
+TileSnapshot = Tuple[Tuple[int, int], TileType, List[Tuple[int, int]]]
+
+
+def write_map(path: str, tiles: Dict[Tuple[int, int], Tile], max_tiles: Vector):
+    """
+    Pickles the tiles into a temporary file next to the map and atomically replaces the map with it
+    """
+    handle, temp_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path) + '.',
+                                         dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(handle, "wb") as f:
+            pickle.dump((tiles, max_tiles), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def snapshot_tiles(tiles: Dict[Tuple[int, int], Tile]) -> List[TileSnapshot]:
+    return [(index, tile.tile_type, list(tile.directions)) for index, tile in tiles.items()]
+
+
+def restore_tiles(snapshot: List[TileSnapshot], tile_size: Vector) -> Dict[Tuple[int, int], Tile]:
+    tiles = {}
+    for index, tile_type, directions in snapshot:
+        tile = Tile(Vector(*index), tile_size, tile_type)
+        tile.directions = directions
+        tiles[index] = tile
+    return tiles
+
+
+def write_snapshot(path: str, snapshot: List[TileSnapshot], tile_size: Vector, max_tiles: Vector):
+    write_map(path, restore_tiles(snapshot, tile_size), max_tiles)
+
+
+class Autosave:
+    """
+    Writes the maps of the editor, both the periodic autosaves and the saves of the Save button.
+    All writes go through one worker thread in the order they were started, so an older snapshot can never
+    replace a newer one.
+    """
+
+    def __init__(self, interval: float = 30.0, clock: Callable[[], float] = time.perf_counter) -> None:
+        """
+        :param interval: seconds between two autosaves
+        """
+        self.interval = interval
+        self.clock = clock
+        self.last_save = clock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        # writes that haven't been collected yet with the path, tiles and revision of the map they are writing
+        self.pending: List[Tuple[Future, str, object, int]] = []
+
+    @property
+    def saving(self) -> bool:
+        return len(self.pending) > 0
+
+    def update(self, tile_map):
+        """
+        Has to be called every frame, starts a save when the interval has passed and the map has been changed
+        """
+        self.collect(tile_map, wait=False)
+        if self.saving or self.clock() - self.last_save < self.interval:
+            return
+        self.last_save = self.clock()
+        if not tile_map.path or tile_map.revision == tile_map.saved_revision:
+            return
+
+        self.save(tile_map)
+
+    def save(self, tile_map):
+        """
+        Starts writing the map in the background
+        """
+        if not tile_map.path:
+            return
+        if tile_map.is_chunked:
+            # chunked maps stream the unchanged chunks from the map file, which the tile map keeps reading from,
+            # so they are written on the main thread, but also atomically
+            self.finish(tile_map)
+            tile_map.save()
+            return
+
+        snapshot = snapshot_tiles(tile_map.tiles)
+        future = self.executor.submit(write_snapshot, tile_map.path, snapshot, tile_map.tile_size.copy(),
+                                      tile_map.max_tiles.copy())
+        self.pending.append((future, tile_map.path, tile_map.tiles, tile_map.revision))
+
+    def finish(self, tile_map):
+        """
+        Waits until all writes are done, has to be called before the map file is written in any other way
+        """
+        self.collect(tile_map, wait=True)
+
+    def collect(self, tile_map, wait: bool):
+        """
+        Marks the map as saved for every write that succeeded
+        :param wait: wait for the writes that are still running
+        """
+        while self.pending:
+            future, path, tiles, revision = self.pending[0]
+            if not wait and not future.done():
+                return
+            self.pending.pop(0)
+            try:
+                future.result()
+                print("Saved tile map", path)
+            except Exception as err:
+                print("Could not save tile map", path, err)
+                continue
+            if tile_map.tiles is tiles and tile_map.path == path:
+                tile_map.saved_revision = max(tile_map.saved_revision, revision)
@@ -0,0 +1,348 @@
+"""
+Chunked storage for very large tile maps.
+
+The map file contains all walkable tiles together with their directions (the path layer) and the types of all
+other tiles in fixed-size chunks. The path layer is always kept in memory, so that entities and path finding work
+on the whole map, while the chunks are only loaded from disk when they are close to the viewport.
+Chunks that only contain building ground are not stored at all.
+"""
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+import pyglet
+from pyglet import gl
+
+from ..game_types import TileType
+from ..graphics import Renderer
+from ..helper import Vector
+from .tile import Tile
+
+MAGIC = b'TDCM'
+VERSION = 1
+CHUNK_SIZE = 32
+# magic, version, max tiles, chunk size
+HEADER = struct.Struct('<4sHIIH')
+COUNT = struct.Struct('<I')
+# position, type and directions of a walkable tile
+PATH_TILE = struct.Struct('<IIBH')
+# offset and length of the compressed chunk data
+CHUNK_ENTRY = struct.Struct('<QI')
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+TileIndex = Tuple[int, int]
+ChunkIndex = Tuple[int, int]
+
+
+def is_chunked_map(path: str) -> bool:
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def encode_directions(directions: List[Tuple[int, int]]) -> int:
+    """
+    Packs the number of directions into the lowest three bits, followed by two bits per direction.
+    The order of the directions is kept, because it decides which way entities take first.
+    """
+    bits = len(directions)
+    for position, direction in enumerate(directions):
+        bits |= DIRECTIONS.index(direction) << (3 + position * 2)
+    return bits
+
+
+def decode_directions(bits: int) -> List[Tuple[int, int]]:
+    return [DIRECTIONS[(bits >> (3 + position * 2)) & 3] for position in range(bits & 7)]
+
+
+def chunk_grid(max_tiles: Vector, chunk_size: int) -> Tuple[int, int]:
+    """
+    :return: number of chunks in x and y direction
+    """
+    return -(-int(max_tiles.x) // chunk_size), -(-int(max_tiles.y) // chunk_size)
+
+
+def chunk_tile_indices(chunk: ChunkIndex, max_tiles: Vector, chunk_size: int) -> Iterator[TileIndex]:
+    for x in range(chunk[0] * chunk_size, min((chunk[0] + 1) * chunk_size, int(max_tiles.x))):
+        for y in range(chunk[1] * chunk_size, min((chunk[1] + 1) * chunk_size, int(max_tiles.y))):
+            yield x, y
+
+
+def write_chunked_map(path: str, tiles, max_tiles: Vector, chunk_size: int = CHUNK_SIZE):
+    """
+    Writes the map chunk by chunk, so that the tiles of the whole map never have to be in memory at the same time.
+    The file is replaced atomically, so tiles can be streamed from the file that is being overwritten.
+    :param tiles: tile dictionary or ChunkedTiles
+    """
+    grid_x, grid_y = chunk_grid(max_tiles, chunk_size)
+    chunks = [(x, y) for x in range(grid_x) for y in range(grid_y)]
+
+    # (position, packed tile)
+    path_tiles = []
+    chunk_data = []
+    for chunk in chunks:
+        types = bytearray()
+        for index in chunk_tile_indices(chunk, max_tiles, chunk_size):
+            tile = tiles.get(index)
+            tile_type = TileType.BUILDING_GROUND if tile is None else tile.tile_type
+            types.append(tile_type.value)
+            if tile is not None and tile.is_walkable:
+                path_tiles.append((index, PATH_TILE.pack(index[0], index[1], tile_type.value,
+                                                         encode_directions(tile.directions))))
+        only_ground = all(value == TileType.BUILDING_GROUND.value for value in types)
+        chunk_data.append(b'' if only_ground else zlib.compress(bytes(types)))
+
+    offset = HEADER.size + COUNT.size + len(path_tiles) * PATH_TILE.size + len(chunks) * CHUNK_ENTRY.size
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, int(max_tiles.x), int(max_tiles.y), chunk_size))
+        f.write(COUNT.pack(len(path_tiles)))
+        # sorted like the tiles of a generated map, so that path finding visits them in the same order
+        f.write(b''.join(data for _, data in sorted(path_tiles)))
+        for data in chunk_data:
+            f.write(CHUNK_ENTRY.pack(offset if data else 0, len(data)))
+            offset += len(data)
+        for data in chunk_data:
+            f.write(data)
+    os.replace(temp_path, path)
+
+
+def create_chunked_map(path: str, max_tiles: Vector, chunk_size: int = CHUNK_SIZE):
+    """
+    Creates a map that only consists of building ground, without creating any tiles
+    """
+    write_chunked_map(path, {}, max_tiles, chunk_size)
+
+
+class ChunkedTiles:
+    """
+    Dictionary-like view of the tiles of a chunked map file.
+    Chunks are loaded when one of their tiles is accessed and the least recently used chunks are unloaded again,
+    as long as they have not been changed.
+    """
+
+    def __init__(self, path: str, tile_size: Vector, max_loaded_chunks: int = 64) -> None:
+        self.path = path
+        self.tile_size = tile_size
+        self.max_loaded_chunks = max_loaded_chunks
+        self.loaded: 'OrderedDict[ChunkIndex, Dict[TileIndex, Tile]]' = OrderedDict()
+        self.dirty: Set[ChunkIndex] = set()
+        self.walkable: Dict[TileIndex, Tile] = {}
+        self.chunk_table: Dict[ChunkIndex, Tuple[int, int]] = {}
+        self.read_header()
+
+    def read_header(self):
+        with open(self.path, 'rb') as f:
+            magic, version, max_x, max_y, self.chunk_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{self.path} is not a chunked map of version {VERSION}")
+            self.max_tiles = Vector(max_x, max_y)
+
+            self.walkable = {}
+            count = COUNT.unpack(f.read(COUNT.size))[0]
+            data = f.read(count * PATH_TILE.size)
+            for x, y, tile_type, directions in PATH_TILE.iter_unpack(data):
+                tile = Tile(Vector(x, y), self.tile_size, TileType(tile_type))
+                tile.directions = decode_directions(directions)
+                self.walkable[(x, y)] = tile
+
+            grid_x, grid_y = chunk_grid(self.max_tiles, self.chunk_size)
+            chunks = [(x, y) for x in range(grid_x) for y in range(grid_y)]
+            data = f.read(len(chunks) * CHUNK_ENTRY.size)
+            self.chunk_table = dict(zip(chunks, CHUNK_ENTRY.iter_unpack(data)))
+
+    def chunk_of(self, index: TileIndex) -> ChunkIndex:
+        return index[0] // self.chunk_size, index[1] // self.chunk_size
+
+    def read_chunk(self, chunk: ChunkIndex) -> Dict[TileIndex, Tile]:
+        offset, length = self.chunk_table[chunk]
+        types = None
+        if length:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                types = zlib.decompress(f.read(length))
+        return self.build_chunk(chunk, types)
+
+    def build_chunk(self, chunk: ChunkIndex, types: Optional[bytes]) -> Dict[TileIndex, Tile]:
+        """
+        :param types: type of every tile of the chunk, None if the chunk only contains building ground
+        """
+        tiles = {}
+        for position, index in enumerate(chunk_tile_indices(chunk, self.max_tiles, self.chunk_size)):
+            tile = self.walkable.get(index)
+            if tile is None:
+                tile_type = TileType(types[position]) if types else TileType.BUILDING_GROUND
+                tile = Tile(Vector(*index), self.tile_size, tile_type)
+            tiles[index] = tile
+        return tiles
+
+    def load_chunk(self, chunk: ChunkIndex) -> Dict[TileIndex, Tile]:
+        if chunk in self.loaded:
+            self.loaded.move_to_end(chunk)
+            return self.loaded[chunk]
+
+        tiles = self.read_chunk(chunk)
+        self.loaded[chunk] = tiles
+        for old_chunk in list(self.loaded):
+            if len(self.loaded) <= self.max_loaded_chunks:
+                break
+            if old_chunk != chunk and old_chunk not in self.dirty:
+                del self.loaded[old_chunk]
+        return tiles
+
+    def chunk_tiles(self, chunk: ChunkIndex) -> Dict[TileIndex, Tile]:
+        """
+        :return: the tiles of the chunk, without keeping the chunk loaded if it isn't already
+        """
+        if chunk in self.loaded:
+            return self.loaded[chunk]
+        return self.read_chunk(chunk)
+
+    def load_area(self, first: TileIndex, last: TileIndex) -> List[ChunkIndex]:
+        """
+        Loads all chunks that overlap the given (inclusive) range of tile indices.
+        :return: the loaded chunks
+        """
+        first_chunk = self.chunk_of((max(0, first[0]), max(0, first[1])))
+        last_chunk = self.chunk_of((min(int(self.max_tiles.x) - 1, last[0]), min(int(self.max_tiles.y) - 1, last[1])))
+        chunks = [(x, y) for x in range(first_chunk[0], last_chunk[0] + 1)
+                  for y in range(first_chunk[1], last_chunk[1] + 1)]
+        for chunk in chunks[-self.max_loaded_chunks:]:
+            self.load_chunk(chunk)
+        return [chunk for chunk in chunks if chunk in self.loaded]
+
+    def set_tile_type(self, index: TileIndex, tile_type: TileType):
+        """
+        Changes the type of a tile. The chunk is marked as changed before the tile is changed, so that it can't be
+        unloaded (and the change lost) while other chunks are loaded during the same edit.
+        """
+        chunk = self.chunk_of(index)
+        self.dirty.add(chunk)
+        self.load_chunk(chunk)[index].tile_type = tile_type
+        self.mark_changed(index)
+
+    def mark_changed(self, index: TileIndex):
+        """
+        Has to be called after the type of a tile has been changed, before any other chunk is loaded.
+        The chunk of the tile stays loaded until the map is saved.
+        """
+        tile = self[index]
+        chunk = self.chunk_of(index)
+        self.load_chunk(chunk)[index] = tile
+        self.dirty.add(chunk)
+        if tile.is_walkable:
+            self.walkable[index] = tile
+        else:
+            self.walkable.pop(index, None)
+            tile.directions = []
+
+    def changed_chunks(self) -> Dict[ChunkIndex, bytes]:
+        """
+        :return: type of every tile of the chunks that have been changed since the map has been saved
+        """
+        return {chunk: bytes(tile.tile_type.value for tile in self.loaded[chunk].values()) for chunk in self.dirty}
+
+    def restore_chunk(self, chunk: ChunkIndex, types: bytes):
+        """
+        Replaces the chunk with a changed one, the walkable tiles of the chunk have to be restored before
+        """
+        self.loaded[chunk] = self.build_chunk(chunk, types)
+        self.dirty.add(chunk)
+
+    def save(self, path: str):
+        write_chunked_map(path, self, self.max_tiles, self.chunk_size)
+        self.path = path
+        self.dirty.clear()
+        # the offsets of the chunks have changed, the path layer in memory is still up to date
+        walkable = self.walkable
+        self.read_header()
+        self.walkable = walkable
+
+    def __len__(self):
+        return int(self.max_tiles.x) * int(self.max_tiles.y)
+
+    def __contains__(self, index) -> bool:
+        return 0 <= index[0] < self.max_tiles.x and 0 <= index[1] < self.max_tiles.y
+
+    def __getitem__(self, index: TileIndex) -> Tile:
+        tile = self.walkable.get(index)
+        if tile is not None:
+            return tile
+        if index not in self:
+            raise KeyError(index)
+        return self.load_chunk(self.chunk_of(index))[index]
+
+    def get(self, index: TileIndex, default: Optional[Tile] = None) -> Optional[Tile]:
+        if index not in self:
+            return default
+        return self[index]
+
+    def __iter__(self) -> Iterator[TileIndex]:
+        return self.keys()
+
+    def keys(self) -> Iterator[TileIndex]:
+        for x in range(int(self.max_tiles.x)):
+            for y in range(int(self.max_tiles.y)):
+                yield x, y
+
+    def items(self) -> Iterator[Tuple[TileIndex, Tile]]:
+        """
+        Streams the tiles chunk by chunk
+        """
+        for chunk in self.chunk_table:
+            yield from self.chunk_tiles(chunk).items()
+
+    def values(self) -> Iterator[Tile]:
+        for _, tile in self.items():
+            yield tile
+
+
+class ChunkRenderCache:
+    """
+    One batch per chunk with the tiles in world space, so that the tiles of a chunk are only turned into vertices
+    once and not every frame.
+    """
+
+    def __init__(self) -> None:
+        self.batches: Dict[ChunkIndex, pyglet.graphics.Batch] = {}
+
+    def invalidate(self, chunk: ChunkIndex):
+        self.batches.pop(chunk, None)
+
+    def clear(self):
+        self.batches = {}
+
+    @staticmethod
+    def build(game_state, tiles: Dict[TileIndex, Tile]) -> pyglet.graphics.Batch:
+        batch = pyglet.graphics.Batch()
+        for tile in tiles.values():
+            position = tile.world_position
+            if tile.tile_type == TileType.START or tile.tile_type == TileType.FINISH:
+                color = (0, 255, 0) if tile.tile_type == TileType.START else (255, 0, 0)
+                vertices = [position.x + tile.size.x, position.y,
+                            position.x + tile.size.x, position.y + tile.size.y,
+                            position.x, position.y + tile.size.y,
+                            position.x, position.y]
+                batch.add(4, pyglet.graphics.GL_QUADS, None, ('v2f/static', vertices), ('c3B/static', color * 4))
+            else:
+                Renderer.textured_rectangle(batch, game_state.textures.tiles[tile.tile_type], position, tile.size,
+                                            tex_max=0.75)
+        return batch
+
+    def render(self, game_state, chunked_tiles: ChunkedTiles, chunks: List[ChunkIndex]):
+        for chunk in list(self.batches):
+            if chunk not in chunked_tiles.loaded:
+                del self.batches[chunk]
+
+        gl.glMatrixMode(gl.GL_MODELVIEW)
+        gl.glLoadIdentity()
+        gl.glTranslatef(game_state.world_offset.x, game_state.world_offset.y, 0)
+        for chunk in chunks:
+            if chunk not in self.batches:
+                self.batches[chunk] = self.build(game_state, chunked_tiles.loaded[chunk])
+            self.batches[chunk].draw()
+        gl.glLoadIdentity()
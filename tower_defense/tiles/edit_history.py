@@ -0,0 +1,87 @@
+"""
+Undo and redo for the map editor.
+
+Every edit transaction is stored as the list of tiles it changed, packed into bytes (tile index, old and new type).
+The oldest transactions are dropped once the history gets larger than its limits.
+"""
+import struct
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from ..game_types import TileType
+
+# tile index, old tile type, new tile type
+DELTA = struct.Struct('<iiBB')
+
+
+def encode_deltas(previous: Dict[Tuple[int, int], TileType], tile_types: Dict[Tuple[int, int], TileType]) -> bytes:
+    """
+    :param previous: old type of every changed tile
+    :param tile_types: new type of every changed tile
+    """
+    return b''.join(DELTA.pack(x, y, tile_type.value, tile_types[(x, y)].value)
+                    for (x, y), tile_type in previous.items())
+
+
+def decode_deltas(data: bytes) -> List[Tuple[Tuple[int, int], TileType, TileType]]:
+    return [((x, y), TileType(old_type), TileType(new_type))
+            for x, y, old_type, new_type in DELTA.iter_unpack(data)]
+
+
+class EditHistory:
+    def __init__(self, max_transactions: int = 200, max_bytes: int = 1024 * 1024) -> None:
+        self.max_transactions = max_transactions
+        self.max_bytes = max_bytes
+        self.undo_stack: Deque[bytes] = deque()
+        self.redo_stack: List[bytes] = []
+        # size of all transactions on both stacks
+        self.size = 0
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack = []
+        self.size = 0
+
+    @property
+    def can_undo(self) -> bool:
+        return len(self.undo_stack) > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return len(self.redo_stack) > 0
+
+    def record(self, previous: Dict[Tuple[int, int], TileType], tile_types: Dict[Tuple[int, int], TileType]):
+        """
+        Has to be called after each edit transaction, an edit can't be redone after a new one has been recorded
+        :param previous: old type of every changed tile, as returned by TileMap.set_tile_types
+        """
+        if not previous:
+            return
+
+        self.size -= sum(len(transaction) for transaction in self.redo_stack)
+        self.redo_stack = []
+
+        transaction = encode_deltas(previous, tile_types)
+        self.undo_stack.append(transaction)
+        self.size += len(transaction)
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.max_transactions or
+                                            self.size > self.max_bytes):
+            self.size -= len(self.undo_stack.popleft())
+
+    def undo(self, tile_map) -> bool:
+        if not self.undo_stack:
+            return False
+
+        transaction = self.undo_stack.pop()
+        tile_map.set_tile_types({tile_index: old_type for tile_index, old_type, _ in decode_deltas(transaction)})
+        self.redo_stack.append(transaction)
+        return True
+
+    def redo(self, tile_map) -> bool:
+        if not self.redo_stack:
+            return False
+
+        transaction = self.redo_stack.pop()
+        tile_map.set_tile_types({tile_index: new_type for tile_index, _, new_type in decode_deltas(transaction)})
+        self.undo_stack.append(transaction)
+        return True
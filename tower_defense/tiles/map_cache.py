@@ -0,0 +1,197 @@
+"""
+Render-to-texture cache of the static layer of a tile map (tiles, border and START/FINISH tiles).
+
+The layer only changes when the map is edited, so it is rendered into textures through a framebuffer once and every
+frame only draws one textured quad per visible texture. Big maps are split into square textures, that are rendered
+when they become visible. Only the most recently drawn textures are kept.
+
+When the camera zooms out, the textures of the next level of detail cover twice the area with the same number of
+texels, so that the number of visible textures stays the same. On coarse levels several tiles are aggregated into
+one block. Every tile that isn't building ground is part of the path layer, so the textures are rendered from the
+path layer only and the chunks of chunked maps don't have to be loaded.
+"""
+import ctypes
+import math
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import pyglet
+from pyglet import gl
+
+from ..game_types import TileType
+from ..graphics import Renderer
+from ..helper import Vector
+
+TEXTURE_SIZE = 1024
+# on this level of detail a tile covers 12.5 texels, coarser levels aggregate several tiles into one block
+AGGREGATE_LEVEL = 3
+# blocks with several tile types show the one with the highest priority
+TYPE_PRIORITY = {TileType.PATH: 1, TileType.START: 2, TileType.FINISH: 2}
+TYPE_COLORS = {TileType.START: (0, 255, 0), TileType.FINISH: (255, 0, 0)}
+
+# level of detail, x, y
+TextureIndex = Tuple[int, int, int]
+TilePosition = Tuple[int, int]
+
+
+def framebuffers_supported() -> bool:
+    return gl.gl_info.have_version(3, 0) or gl.gl_info.have_extension('GL_ARB_framebuffer_object')
+
+
+class MapTextureCache:
+    def __init__(self, max_textures: int = 16) -> None:
+        self.max_textures = max_textures
+        # textures in the order they have been drawn, the least recently drawn one comes first
+        self.textures: OrderedDict = OrderedDict()
+        self.framebuffer: Optional[gl.GLuint] = None
+
+    def clear(self):
+        self.textures = OrderedDict()
+
+    @staticmethod
+    def origin(tile_map) -> Vector:
+        """
+        World position of the bottom left corner of the first texture, the border lies outside of the tiles
+        """
+        return Vector(-tile_map.border_width, -tile_map.border_width)
+
+    @staticmethod
+    def level_of_detail(zoom: float) -> int:
+        """
+        The coarsest level whose texels are still at least as small as the pixels on the screen
+        """
+        if zoom >= 1:
+            return 0
+        return int(math.floor(math.log2(1 / zoom)))
+
+    @staticmethod
+    def texture_world_size(level: int) -> int:
+        return TEXTURE_SIZE << level
+
+    def texture_area(self, tile_map, index: TextureIndex) -> Tuple[Vector, int]:
+        """
+        :return: world position of the bottom left corner and the world size of the texture
+        """
+        world_size = self.texture_world_size(index[0])
+        return self.origin(tile_map) + Vector(index[1] * world_size, index[2] * world_size), world_size
+
+    def texture_range(self, tile_map, level: int, position: Vector, size: Vector) -> Tuple[TilePosition, TilePosition]:
+        """
+        :return: positions of the first and the last texture of the level that overlap the given world area
+        """
+        origin = self.origin(tile_map)
+        world_size = self.texture_world_size(level)
+        first = (int(math.floor((position.x - origin.x) / world_size)),
+                 int(math.floor((position.y - origin.y) / world_size)))
+        last = (int(math.ceil((position.x + size.x - origin.x) / world_size)) - 1,
+                int(math.ceil((position.y + size.y - origin.y) / world_size)) - 1)
+        return first, last
+
+    def invalidate(self, tile_map, position: Vector, size: Vector):
+        """
+        Drops the textures that overlap the given world area, they are rendered again the next time they are visible
+        """
+        for index in list(self.textures):
+            (first_x, first_y), (last_x, last_y) = self.texture_range(tile_map, index[0], position, size)
+            if first_x <= index[1] <= last_x and first_y <= index[2] <= last_y:
+                del self.textures[index]
+
+    def visible_textures(self, game_state, tile_map) -> List[TextureIndex]:
+        level = self.level_of_detail(game_state.zoom)
+        (first_x, first_y), (last_x, last_y) = self.texture_range(tile_map, level, self.origin(tile_map),
+                                                                  tile_map.size_with_border)
+        (view_first_x, view_first_y), (view_last_x, view_last_y) = self.texture_range(
+            tile_map, level, game_state.window_to_world_space(Vector()), game_state.view_size)
+        return [(level, x, y)
+                for x in range(max(first_x, view_first_x), min(last_x, view_last_x) + 1)
+                for y in range(max(first_y, view_first_y), min(last_y, view_last_y) + 1)]
+
+    def tile_blocks(self, tile_map, index: TextureIndex) -> Tuple[TilePosition, TilePosition, int,
+                                                                  Dict[TilePosition, TileType]]:
+        """
+        Groups the tiles that overlap the texture in world space into square blocks,
+        that are one tile in size up to the aggregate level.
+        :return: indices of the first and the last tile, the size of a block in tiles
+                 and the tile type of every block that isn't building ground
+        """
+        position, world_size = self.texture_area(tile_map, index)
+        step = 1 << max(0, index[0] - AGGREGATE_LEVEL)
+        first = tile_map.tile_index_at(position)
+        first = max(first[0], 0) // step * step, max(first[1], 0) // step * step
+        last = tile_map.tile_index_at(position + Vector(world_size, world_size))
+        last = min(last[0], int(tile_map.max_tiles.x) - 1), min(last[1], int(tile_map.max_tiles.y) - 1)
+
+        blocks: Dict[TilePosition, TileType] = {}
+        for tile in tile_map.path_layer(first, last):
+            block = int(tile.position.x) // step, int(tile.position.y) // step
+            if block not in blocks or TYPE_PRIORITY[tile.tile_type] > TYPE_PRIORITY[blocks[block]]:
+                blocks[block] = tile.tile_type
+        return first, last, step, blocks
+
+    def build_batch(self, game_state, tile_map, index: TextureIndex) -> pyglet.graphics.Batch:
+        """
+        Batch with the border and all tiles that overlap the texture in world space
+        """
+        first, last, step, blocks = self.tile_blocks(tile_map, index)
+        batch = pyglet.graphics.Batch()
+        tile_size = tile_map.tile_size
+        for x in range(first[0], last[0] + 1, step):
+            for y in range(first[1], last[1] + 1, step):
+                block_position = Vector(x * tile_size.x, y * tile_size.y)
+                block_size = Vector(min(step, last[0] + 1 - x) * tile_size.x, min(step, last[1] + 1 - y) * tile_size.y)
+                tile_type = blocks.get((x // step, y // step), TileType.BUILDING_GROUND)
+                if tile_type in TYPE_COLORS:
+                    Renderer.colored_rectangle(batch, TYPE_COLORS[tile_type], block_position, block_size)
+                else:
+                    Renderer.textured_rectangle(batch, game_state.textures.tiles[tile_type], block_position,
+                                                block_size, tex_max=0.75)
+
+        tile_map.render_border(batch, self.origin(tile_map))
+        return batch
+
+    def render_texture(self, game_state, tile_map, index: TextureIndex) -> pyglet.image.Texture:
+        texture = pyglet.image.Texture.create(TEXTURE_SIZE, TEXTURE_SIZE, gl.GL_RGBA)
+        if self.framebuffer is None:
+            framebuffer = gl.GLuint()
+            gl.glGenFramebuffers(1, ctypes.byref(framebuffer))
+            self.framebuffer = framebuffer
+
+        position, world_size = self.texture_area(tile_map, index)
+
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, self.framebuffer)
+        gl.glFramebufferTexture2D(gl.GL_FRAMEBUFFER, gl.GL_COLOR_ATTACHMENT0, texture.target, texture.id, 0)
+        gl.glPushAttrib(gl.GL_VIEWPORT_BIT | gl.GL_COLOR_BUFFER_BIT)
+        gl.glViewport(0, 0, TEXTURE_SIZE, TEXTURE_SIZE)
+        gl.glClearColor(0, 0, 0, 0)
+        gl.glClear(gl.GL_COLOR_BUFFER_BIT)
+
+        gl.glMatrixMode(gl.GL_PROJECTION)
+        gl.glPushMatrix()
+        gl.glLoadIdentity()
+        gl.glOrtho(position.x, position.x + world_size, position.y, position.y + world_size, -1, 1)
+        gl.glMatrixMode(gl.GL_MODELVIEW)
+        gl.glLoadIdentity()
+
+        self.build_batch(game_state, tile_map, index).draw()
+
+        gl.glMatrixMode(gl.GL_PROJECTION)
+        gl.glPopMatrix()
+        gl.glMatrixMode(gl.GL_MODELVIEW)
+        gl.glPopAttrib()
+        gl.glBindFramebuffer(gl.GL_FRAMEBUFFER, 0)
+        return texture
+
+    def render(self, game_state, tile_map):
+        for index in self.visible_textures(game_state, tile_map):
+            texture = self.textures.get(index)
+            if texture is None:
+                texture = self.render_texture(game_state, tile_map, index)
+                self.textures[index] = texture
+            self.textures.move_to_end(index)
+
+            position, world_size = self.texture_area(tile_map, index)
+            position += game_state.world_offset
+            texture.blit(position.x, position.y, width=world_size, height=world_size)
+
+        while len(self.textures) > self.max_textures:
+            self.textures.popitem(last=False)
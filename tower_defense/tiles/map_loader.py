@@ -0,0 +1,76 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from .chunks import is_chunked_map
+from .tile_map import TileMap
+
+
+class MapLoader:
+    """
+    Reads, decodes and path-solves a tile map in a worker thread.
+    The finished tile map is only handed over once it is completely loaded.
+    """
+
+    def __init__(self) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future: Optional[Future] = None
+        self.path = ""
+        self.stage = ""
+        self.progress = 0.0
+
+    @property
+    def loading(self):
+        return self.future is not None
+
+    @property
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def start(self, path: str, tile_map_class: type = TileMap):
+        self.path = path.strip()
+        self.set_progress("Waiting", 0.0)
+        self.future = self.executor.submit(self.load, self.path, tile_map_class)
+
+    def set_progress(self, stage: str, progress: float):
+        self.stage = stage
+        self.progress = progress
+
+    def load(self, path: str, tile_map_class: type) -> TileMap:
+        if is_chunked_map(path):
+            # the directions are part of the path layer, chunks are loaded later on when they become visible
+            self.set_progress("Reading path layer", 0.0)
+            tile_map = tile_map_class()
+            tile_map.path = path
+            tile_map.open_chunked(path)
+            self.set_progress("Done", 1.0)
+            return tile_map
+
+        self.set_progress("Reading", 0.0)
+        with open(path, "rb") as f:
+            content = f.read()
+
+        self.set_progress("Decoding", 0.3)
+        tile_map = tile_map_class()
+        tile_map.path = path
+        tile_map.decode(content)
+
+        self.set_progress("Finding paths", 0.6)
+        tile_map.path_finding()
+
+        self.set_progress("Done", 1.0)
+        return tile_map
+
+    def result(self) -> Optional[TileMap]:
+        """
+        Returns the loaded tile map or None if loading failed.
+        """
+        future, self.future = self.future, None
+        if future is None:
+            return None
+        try:
+            tile_map = future.result()
+            print("Loaded tile map", tile_map.path)
+            return tile_map
+        except Exception as err:
+            print("Could not load tile map", self.path, err)
+            return None
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Set, Tuple, Union
+
+import pyglet
+
+from ..game_types import TileType
+from ..helper import Vector, maps_list
+from .chunks import MAGIC as CHUNKED_MAP_MAGIC, ChunkedTiles
+
+TILE_COLORS = {
+    TileType.BUILDING_GROUND: (60, 140, 60),
+    TileType.PATH: (210, 180, 120),
+    TileType.START: (0, 255, 0),
+    TileType.FINISH: (255, 0, 0),
+}
+
+THUMBNAIL_DIRECTORY = "thumbnails"
+THUMBNAIL_HEADER = struct.Struct("<HH")
+
+
+def render_thumbnail(tiles: Union[dict, ChunkedTiles], max_tiles: Vector,
+                     max_size: int = 128) -> Tuple[int, int, bytes]:
+    """
+    Renders one colored pixel block per tile type (nearest neighbour, rows bottom to top).
+    :return: width, height and RGB data of the thumbnail
+    """
+    scale = max_size / max(max_tiles.x, max_tiles.y, 1)
+    width = max(1, int(max_tiles.x * scale))
+    height = max(1, int(max_tiles.y * scale))
+
+    pixels = bytearray(width * height * 3)
+    background = bytes(TILE_COLORS[TileType.BUILDING_GROUND])
+    for y in range(height):
+        tile_y = int(y / scale)
+        for x in range(width):
+            tile = tiles.get((int(x / scale), tile_y))
+            color = background if tile is None else bytes(TILE_COLORS[tile.tile_type])
+            index = (y * width + x) * 3
+            pixels[index:index + 3] = color
+    return width, height, bytes(pixels)
+
+
+def thumbnail_path(map_path: str, digest: str) -> str:
+    return os.path.join(os.path.dirname(map_path), THUMBNAIL_DIRECTORY, digest + ".thumb")
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_thumbnail(cache_path: str, width: int, height: int, data: bytes):
+    """
+    Writes the thumbnail into a temporary file next to the cache file and atomically replaces the cache file with it,
+    so that a half written thumbnail is never read
+    """
+    directory = os.path.dirname(cache_path)
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(cache_path) + '.', dir=directory)
+    try:
+        with os.fdopen(handle, "wb") as f:
+            f.write(THUMBNAIL_HEADER.pack(width, height))
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def prune_thumbnails(maps_path: str):
+    """
+    Deletes the cached thumbnails that don't belong to the current content of any map in the directory,
+    either because the map has been changed or because it has been deleted
+    """
+    thumbnail_directory = os.path.join(maps_path, THUMBNAIL_DIRECTORY)
+    if not os.path.isdir(thumbnail_directory):
+        return
+
+    digests = set()
+    for map_ in maps_list(maps_path):
+        try:
+            digests.add(file_digest(os.path.join(maps_path, map_)))
+        except OSError:
+            pass
+
+    for file in os.listdir(thumbnail_directory):
+        digest, extension = os.path.splitext(file)
+        if extension == ".thumb" and digest not in digests:
+            try:
+                os.remove(os.path.join(thumbnail_directory, file))
+            except OSError as err:
+                print("Could not delete thumbnail", file, err)
+
+
+def load_thumbnail(map_path: str) -> Tuple[int, int, bytes]:
+    """
+    Returns the cached thumbnail of the map or renders and caches a new one.
+    The cache is keyed by the hash of the map content, so it never goes stale.
+    """
+    with open(map_path, "rb") as f:
+        content = f.read()
+
+    cache_path = thumbnail_path(map_path, hashlib.sha1(content).hexdigest())
+    if os.path.isfile(cache_path):
+        with open(cache_path, "rb") as f:
+            width, height = THUMBNAIL_HEADER.unpack(f.read(THUMBNAIL_HEADER.size))
+            return width, height, f.read()
+
+    if content.startswith(CHUNKED_MAP_MAGIC):
+        tiles = ChunkedTiles(map_path, Vector(1, 1))
+        max_tiles = tiles.max_tiles
+    else:
+        tiles, max_tiles = pickle.loads(content)
+    width, height, data = render_thumbnail(tiles, max_tiles)
+    try:
+        write_thumbnail(cache_path, width, height, data)
+    except OSError as err:
+        print("Could not cache thumbnail for", map_path, err)
+    return width, height, data
+
+
+class ThumbnailCache:
+    def __init__(self, max_workers: int = 1) -> None:
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.pending: Dict[str, Future] = {}
+        # map path -> (modification time in nanoseconds and size of the map, thumbnail)
+        self.images: Dict[str, Tuple[Tuple[int, int], Optional[pyglet.image.ImageData]]] = {}
+        # map directories whose stale thumbnails have already been deleted
+        self.pruned: Set[str] = set()
+
+    def get(self, map_path: str) -> Optional[pyglet.image.ImageData]:
+        """
+        Returns the thumbnail of the map if it is ready.
+        Otherwise the thumbnail is generated in the background and None is returned.
+        A new thumbnail is generated whenever the map file has been changed.
+        """
+        try:
+            stat = os.stat(map_path)
+        except OSError:
+            return None
+        stamp = stat.st_mtime_ns, stat.st_size
+
+        maps_path = os.path.dirname(map_path)
+        if maps_path not in self.pruned:
+            self.pruned.add(maps_path)
+            self.executor.submit(prune_thumbnails, maps_path)
+
+        if map_path in self.images and self.images[map_path][0] == stamp:
+            return self.images[map_path][1]
+
+        future = self.pending.get(map_path)
+        if future is None:
+            self.pending[map_path] = self.executor.submit(load_thumbnail, map_path)
+            return None
+        if not future.done():
+            return None
+
+        del self.pending[map_path]
+        image = None
+        try:
+            width, height, data = future.result()
+            image = pyglet.image.ImageData(width, height, 'RGB', data)
+        except Exception as err:
+            print("Could not create thumbnail for", map_path, err)
+        self.images[map_path] = stamp, image
+        return image
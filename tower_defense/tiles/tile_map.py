@@ -1,15 +1,27 @@
-import copy
+import math
 import os
 import pickle
-from typing import Dict, Tuple
+import heapq
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type, Union
 
 import pyglet
 
-from ..game_types import TileType
-from ..graphics import Renderer
-from ..helper import Vector, rect_contains_point, process_clicks, MouseClick
+from ..game_types import EditorTool, TileType
+from ..graphics import DETAIL_ZOOM, Renderer
+from ..helper import Vector, process_clicks, MouseClick
+from .chunks import ChunkedTiles, ChunkRenderCache, create_chunked_map, is_chunked_map
+from .edit_history import EditHistory
+from .map_cache import MapTextureCache, framebuffers_supported
 from .tile import Tile
 
+# new maps with more tiles than this are stored in chunks
+CHUNKED_MAP_TILES = 256 * 256
+# order in which the directions of a tile are listed, the same as in the tile graph
+NEIGHBOUR_DIRECTIONS = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+# the flood fill tool doesn't change larger areas than this
+MAX_FILL_TILES = 256 * 256
+
 
 class TileMap:
     def __init__(self):
@@ -17,8 +29,26 @@ class TileMap:
         self.border_width = 50
         self.tile_size = Vector(100, 100)
         self.max_tiles = Vector(10, 10)
-        self.tiles: Dict[(int, int), Tile] = self.generate_tiles(
+        self.tiles: Union[Dict[Tuple[int, int], Tile], ChunkedTiles] = self.generate_tiles(
             self.max_tiles, self.tile_size)
+        # static layer of chunked maps, if framebuffers are not supported
+        self.chunk_render_cache = ChunkRenderCache()
+        # static layer of all maps, rendered from the path layer
+        self.map_texture_cache = MapTextureCache()
+        # in free build mode every tile is walkable and only the buildings are obstacles
+        self.free_build = False
+        # tiles that are occupied by buildings
+        self.blocked: Set[Tuple[int, int]] = set()
+        # tiles that would cut off a START tile from all FINISH tiles, computed on demand
+        self.blocking_tiles: Optional[Set[Tuple[int, int]]] = None
+        # number of steps from every walkable tile to the closest FINISH tile
+        self.distances: Dict[Tuple[int, int], int] = {}
+        # START tiles that have been found by the last path finding
+        self.start_tiles: List[Tuple[int, int]] = []
+        # changes whenever the type of a tile changes, so that views of the map know when to redraw
+        self.revision = 0
+        # revision that has been written to the map file
+        self.saved_revision = 0
 
     @staticmethod
     def generate_tiles(max_tiles: Vector, tile_size: Vector) -> dict:
@@ -33,65 +63,373 @@ class TileMap:
         game_state.entity_manager.reset()
         self.path = path.strip()
         self.max_tiles = size.copy()
+        if self.path and size.x * size.y > CHUNKED_MAP_TILES:
+            create_chunked_map(self.path, self.max_tiles)
+            self.open_chunked(self.path)
+            return
         self.tiles = self.generate_tiles(self.max_tiles, self.tile_size)
+        self.map_texture_cache.clear()
+        self.revision += 1
         self.save()
 
     def load(self, game_state, path: str):
         game_state.entity_manager.reset()
         self.path = path.strip()
-        if os.path.isfile(self.path):
+        if is_chunked_map(self.path):
+            self.open_chunked(self.path)
+            print("Opened chunked tile map", self.path)
+        elif os.path.isfile(self.path):
             with open(self.path, "rb") as f:
-                self.tiles, self.max_tiles = pickle.load(f)
+                self.decode(f.read())
                 print("Loaded tile map", self.path)
 
-            # update tile size to current tile size
-            for tile in self.tiles:
-                self.tiles[tile].size = self.tile_size
+    def decode(self, content: bytes):
+        self.tiles, self.max_tiles = pickle.loads(content)
+        self.map_texture_cache.clear()
+        self.revision += 1
+        self.saved_revision = self.revision
+
+        # update tile size to current tile size
+        for tile in self.tiles:
+            self.tiles[tile].size = self.tile_size
+
+    def open_chunked(self, path: str):
+        """
+        Only the path layer of a chunked map is read, the chunks are loaded when they become visible
+        """
+        self.tiles = ChunkedTiles(path, self.tile_size)
+        self.max_tiles = self.tiles.max_tiles.copy()
+        self.chunk_render_cache.clear()
+        self.map_texture_cache.clear()
+        self.revision += 1
+        self.saved_revision = self.revision
+        self.update_distances()
+
+    @property
+    def is_chunked(self):
+        return isinstance(self.tiles, ChunkedTiles)
+
+    def walkable_tiles(self) -> Dict[Tuple[int, int], Tile]:
+        if self.free_build and not self.is_chunked:
+            return {index: tile for index, tile in self.tiles.items() if index not in self.blocked}
+        return self.path_tiles()
+
+    def path_tiles(self) -> Dict[Tuple[int, int], Tile]:
+        """
+        The tiles that aren't building ground, even in free build mode, where enemies can walk on all tiles
+        """
+        if isinstance(self.tiles, ChunkedTiles):
+            return self.tiles.walkable
+        return {index: tile for index, tile in self.tiles.items() if tile.is_walkable}
+
+    def set_blocked(self, tile_indices):
+        """
+        Replaces the tiles that are occupied by buildings and solves the paths again
+        """
+        self.blocked = set(tile_indices)
+        self.blocking_tiles = None
+        if not self.free_build:
+            return
+        for tile_index in self.blocked:
+            if tile_index in self.tiles:
+                self.tiles[tile_index].directions = []
+        self.path_finding()
+
+    def block(self, tile_index: Tuple[int, int]):
+        """
+        Marks the tile as occupied by a building.
+        Only the distances that led through the tile are updated and
+        the flow field only has to be rebuilt, if one of these tiles was part of it.
+        """
+        self.blocked.add(tile_index)
+        if not self.free_build:
+            return
+        # the walkable tiles have changed
+        self.revision += 1
+        self.blocking_tiles = None
+        tile = self.tiles[tile_index]
+        on_flow_field = bool(tile.directions)
+        changed = self.remove_distance(tile_index)
+        if on_flow_field or any(self.tiles[index].directions for index in changed):
+            self.clear_directions()
+            self.update_directions(self.tiles)
+
+    def remove_distance(self, tile_index: Tuple[int, int]) -> Set[Tuple[int, int]]:
+        """
+        Updates the distances after the tile is no longer walkable.
+        Only the tiles whose every shortest way led through the tile get a new distance,
+        starting from their neighbours that kept their distance.
+        :return: the tiles whose distance has changed
+        """
+        distances = self.distances
+        step = distances.pop(tile_index, None)
+        if step is None:
+            return set()
+
+        def neighbours(index):
+            return [(index[0] + x, index[1] + y) for x, y in NEIGHBOUR_DIRECTIONS]
+
+        # visited by increasing distance, so that the tiles one step closer to an exit have already been decided
+        changed: Set[Tuple[int, int]] = set()
+        queue = deque(neighbour for neighbour in neighbours(tile_index) if distances.get(neighbour) == step + 1)
+        while queue:
+            node = queue.popleft()
+            if node in changed:
+                continue
+            step = distances[node]
+            if any(distances.get(neighbour) == step - 1 and neighbour not in changed
+                   for neighbour in neighbours(node)):
+                continue
+            changed.add(node)
+            queue.extend(neighbour for neighbour in neighbours(node) if distances.get(neighbour) == step + 1)
+
+        for node in changed:
+            del distances[node]
+        heap = []
+        for node in changed:
+            steps = [distances[neighbour] for neighbour in neighbours(node) if neighbour in distances]
+            if steps:
+                heap.append((min(steps) + 1, node))
+        heapq.heapify(heap)
+        while heap:
+            step, node = heapq.heappop(heap)
+            if node in distances:
+                continue
+            distances[node] = step
+            for neighbour in neighbours(node):
+                if neighbour in changed and neighbour not in distances:
+                    heapq.heappush(heap, (step + 1, neighbour))
+        return changed
+
+    def can_build(self, tile_index: Tuple[int, int]) -> bool:
+        """
+        In free build mode buildings can't be placed on START or FINISH tiles
+        and must not cut off a START tile from all FINISH tiles.
+        This is a set lookup, so it can be used for previews every frame.
+        """
+        if not self.free_build:
+            return True
+        tile = self.tiles.get(tile_index)
+        if tile is None or tile_index in self.blocked or tile.tile_type in (TileType.START, TileType.FINISH):
+            return False
+        if self.blocking_tiles is None:
+            self.blocking_tiles = self.find_blocking_tiles()
+        return tile_index not in self.blocking_tiles
+
+    def find_blocking_tiles(self) -> Set[Tuple[int, int]]:
+        """
+        Finds the articulation points of the walkable tiles that separate a START tile from all FINISH tiles.
+        One iterative depth-first search (Tarjan) from a virtual root, that is connected to all FINISH tiles:
+        removing a tile cuts off the subtree of one of its children from the root,
+        if nothing in that subtree links back above the tile.
+        """
+        walkable_tiles = self.walkable_tiles()
+        graph = self.get_tile_graph()
+        # the virtual root is off the map, so that it can't be confused with a tile
+        root = (-1, -1)
+        finish_tiles = [index for index, tile in walkable_tiles.items() if tile.tile_type == TileType.FINISH]
+
+        discovery: Dict[Tuple[int, int], int] = {root: 0}
+        low: Dict[Tuple[int, int], int] = {root: 0}
+        starts_below: Dict[Tuple[int, int], int] = {}
+        blocking: Set[Tuple[int, int]] = set()
+        stack: List[Tuple[Tuple[int, int], Tuple[int, int], Iterator[Tuple[int, int]]]] = [
+            (root, root, iter(finish_tiles))]
+        while stack:
+            node, parent, neighbours = stack[-1]
+            for neighbour in neighbours:
+                if neighbour == parent:
+                    continue
+                if neighbour in discovery:
+                    low[node] = min(low[node], discovery[neighbour])
+                    continue
+                discovery[neighbour] = low[neighbour] = len(discovery)
+                tile_type = walkable_tiles[neighbour].tile_type
+                starts_below[neighbour] = int(tile_type == TileType.START)
+                next_neighbours = [index for index, _ in graph[neighbour]]
+                if tile_type == TileType.FINISH:
+                    next_neighbours.append(root)
+                stack.append((neighbour, node, iter(next_neighbours)))
+                break
+            else:
+                stack.pop()
+                if parent == root:
+                    continue
+                low[parent] = min(low[parent], low[node])
+                starts_below[parent] = starts_below.get(parent, 0) + starts_below[node]
+                if low[node] >= discovery[parent] and starts_below[node]:
+                    blocking.add(parent)
+        return blocking
+
+    def tile_changed(self, tile_index: Tuple[int, int]):
+        """
+        Has to be called after the type of a tile has been changed
+        """
+        self.tiles_changed([tile_index])
+
+    def tiles_changed(self, tile_indices: Iterable[Tuple[int, int]]):
+        """
+        Has to be called after the types of tiles have been changed.
+        The render caches are invalidated once for the area that contains all of them.
+        """
+        first_x = first_y = math.inf
+        last_x = last_y = -math.inf
+        chunks = set()
+        for tile_index in tile_indices:
+            tile = self.tiles[tile_index]
+            if isinstance(self.tiles, ChunkedTiles):
+                self.tiles.mark_changed(tile_index)
+                chunks.add(self.tiles.chunk_of(tile_index))
+            elif not tile.is_walkable:
+                tile.directions = []
+            first_x, first_y = min(first_x, tile_index[0]), min(first_y, tile_index[1])
+            last_x, last_y = max(last_x, tile_index[0]), max(last_y, tile_index[1])
+
+        if first_x == math.inf:
+            return
+        for chunk in chunks:
+            self.chunk_render_cache.invalidate(chunk)
+        position = Vector(first_x * self.tile_size.x, first_y * self.tile_size.y)
+        size = Vector((last_x - first_x + 1) * self.tile_size.x, (last_y - first_y + 1) * self.tile_size.y)
+        self.map_texture_cache.invalidate(self, position, size)
+        self.revision += 1
+
+    def set_tile_types(self, tile_types: Dict[Tuple[int, int], TileType]) -> Dict[Tuple[int, int], TileType]:
+        """
+        Changes the types of many tiles as one transaction.
+        The caches are invalidated and the paths are found only once for all changed tiles.
+        :return: previous type of every tile that has actually been changed
+        """
+        previous = {}
+        for tile_index, tile_type in tile_types.items():
+            tile = self.tiles.get(tile_index)
+            if tile is None or tile.tile_type == tile_type:
+                continue
+            previous[tile_index] = tile.tile_type
+            if isinstance(self.tiles, ChunkedTiles):
+                self.tiles.set_tile_type(tile_index, tile_type)
+            else:
+                tile.tile_type = tile_type
+
+        if previous:
+            self.tiles_changed(previous)
+            self.path_finding()
+        return previous
+
+    def tile_index_at(self, position: Vector) -> Tuple[int, int]:
+        return int(position.x // self.tile_size.x), int(position.y // self.tile_size.y)
+
+    def visible_area(self, game_state) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """
+        :return: indices of the first and the last tile that are visible in the window
+        """
+        first = self.tile_index_at(game_state.window_to_world_space(Vector()))
+        last = self.tile_index_at(game_state.window_to_world_space(game_state.window_size))
+        return first, last
+
+    def path_layer(self, first: Tuple[int, int], last: Tuple[int, int]) -> List[Tile]:
+        """
+        The tiles between the given indices (inclusive) that aren't building ground.
+        Chunked maps keep these tiles in memory, so no chunks have to be loaded.
+        """
+        if isinstance(self.tiles, ChunkedTiles):
+            return [tile for (x, y), tile in self.tiles.walkable.items()
+                    if first[0] <= x <= last[0] and first[1] <= y <= last[1]]
+
+        tiles = []
+        for x in range(first[0], last[0] + 1):
+            for y in range(first[1], last[1] + 1):
+                tile = self.tiles.get((x, y))
+                if tile is not None and tile.is_walkable:
+                    tiles.append(tile)
+        return tiles
+
+    def visible_tiles(self, game_state):
+        """
+        All tiles of a normal map, but only the tiles of the visible chunks of a chunked map
+        """
+        if not self.is_chunked:
+            return self.tiles.values()
+        chunks = self.tiles.load_area(*self.visible_area(game_state))
+        return [tile for chunk in chunks for tile in self.tiles.loaded[chunk].values()]
 
     def save(self):
-        if self.path:
-            with open(self.path, "wb") as f:
-                pickle.dump((self.tiles, self.max_tiles), f)
-                print("Saved tile map", self.path)
+        if self.path and self.is_chunked:
+            self.tiles.save(self.path)
+            self.saved_revision = self.revision
+            print("Saved chunked tile map", self.path)
+        elif self.path:
+            from .autosave import write_map
+            write_map(self.path, self.tiles, self.max_tiles)
+            self.saved_revision = self.revision
+            print("Saved tile map", self.path)
+
+    def convert(self, tile_map_class: Type['TileMap']) -> 'TileMap':
+        """
+        Turns this tile map into an instance of the given class without loading it again.
+        The new tile map shares the tiles (including their directions) with this one.
+        """
+        tile_map = tile_map_class.__new__(tile_map_class)
+        tile_map.__dict__.update(self.__dict__)
+        tile_map.convert_from(self)
+        return tile_map
+
+    def convert_from(self, tile_map: 'TileMap'):
+        pass
 
     @property
     def tile_map_width(self):
         return self.tile_size.x * self.max_tiles.x
 
+    @property
+    def size_with_border(self) -> Vector:
+        return Vector(self.tile_map_width + self.border_width * 2, self.tile_map_height + self.border_width * 2)
+
     @property
     def tile_map_height(self):
         return self.tile_size.y * self.max_tiles.y
 
     @property
     def has_start_node(self):
-        for tile in self.tiles:
-            if self.tiles[tile].tile_type == TileType.START:
+        for tile in self.path_tiles().values():
+            if tile.tile_type == TileType.START:
                 return True
         return False
 
     @property
     def has_finish_node(self):
-        for tile in self.tiles:
-            if self.tiles[tile].tile_type == TileType.FINISH:
+        for tile in self.path_tiles().values():
+            if tile.tile_type == TileType.FINISH:
                 return True
         return False
 
     def is_on_map(self, position: Vector):
         return 0 < position.x < self.tile_map_width and 0 < position.y < self.tile_map_height
 
+    def render_border(self, batch: pyglet.graphics.Batch, position: Vector):
+        """
+        :param position: bottom left of the border
+        """
+        Renderer.rectangle_border(batch, position, self.size_with_border, (255, 255, 255),
+                                  border_width=self.border_width)
+
     def render(self, game_state):
-        batch = pyglet.graphics.Batch()
+        if framebuffers_supported():
+            self.map_texture_cache.render(game_state, self)
+            return
 
-        size = Vector(self.tile_map_width + self.border_width * 2,
-                      self.tile_map_height + self.border_width * 2)
-        position = game_state.world_offset - \
-            Vector(self.border_width, self.border_width)
-        Renderer.rectangle_border(batch, position, size, (255, 255, 255),
-                                  border_width=self.border_width)
+        if self.is_chunked:
+            batch = pyglet.graphics.Batch()
+            self.render_border(batch, game_state.world_offset - Vector(self.border_width, self.border_width))
+            batch.draw()
+            chunks = self.tiles.load_area(*self.visible_area(game_state))
+            self.chunk_render_cache.render(game_state, self.tiles, chunks)
+            return
 
+        batch = pyglet.graphics.Batch()
+        self.render_border(batch, game_state.world_offset - Vector(self.border_width, self.border_width))
         for tile in self.tiles.values():
             tile.render(game_state, batch)
-
         batch.draw()
 
     def update(self, game_state):
@@ -101,193 +439,214 @@ class TileMap:
         return False
 
     def path_finding(self):
-        for tile in self.tiles:
-            self.tiles[tile].directions = []
-
-        graph = self.get_tile_graph()
-        paths = {}
-        for node in graph:
-            paths[node] = {}
-            paths[node]['open_directions'] = graph[node]
-            paths[node]['to_path'] = []
-            paths[node]['from_path'] = []
-
-        starting_node = None
-        finish_node = None
-        for tile in self.tiles:
-            if self.tiles[tile].tile_type == TileType.START:
-                starting_node = tile
-            elif self.tiles[tile].tile_type == TileType.FINISH:
-                finish_node = tile
-        if starting_node is None:
-            return
-        if finish_node is None:
-            return
-
-        paths[starting_node]['to_path'] = [starting_node]
-        paths[finish_node]['open_directions'] = []
-
-        while True:
-            start_node = self.select_start_node(paths)
-            if start_node is None:
-                # no start nodes left
-                break
-
-            path = [start_node]
-            # create working copy of paths
-            temp_paths = copy.deepcopy(paths)
-            current_node = start_node
-            while True:
-                open_directions = temp_paths[current_node]['open_directions']
-                if open_directions:
-                    # there are possible directions to go in
-
-                    direction = open_directions[0]
-                    next_node = direction[0]
-                    path.append(next_node)
-
-                    # remove the links between current_node and next_node
-                    temp_paths[current_node]['open_directions'] = self.remove_node_from_open_directions(
-                        next_node,
-                        open_directions
-                    )
-                    next_open_directions = temp_paths[next_node]['open_directions']
-                    temp_paths[next_node]['open_directions'] = self.remove_node_from_open_directions(
-                        current_node,
-                        next_open_directions
-                    )
-
-                    current_node = next_node
-                elif current_node == finish_node:
-                    # path has successfully terminated
-                    break
-                elif paths[current_node]['to_path']:
-                    # path has met up with a path that is known to terminate successfully
-                    break
-                elif current_node == start_node:
-                    # we are back at the start and don't have any directions left to go
-                    path = None
-                    break
-                else:
-                    # go back to last intersection with directions not yet processed
-                    while not temp_paths[current_node]['open_directions']:
-                        if current_node == start_node:
-                            path = None
-                            break
-                        path = path[:-1]
-                        current_node = path[-1]
-
-            if path is None:
-                # we can't go anywhere from start_node
-                paths[start_node]['open_directions'] = []
-                continue
-
-            # updating paths with newly discovered path
-            rest_path = path
-            for index, node in enumerate(path):
-                paths[node]['to_path'] = path[:index + 1]
-                if rest_path not in paths[node]['from_path']:
-                    paths[node]['from_path'].append(rest_path)
-
-                if rest_path:
-                    rest_path = rest_path[1:]
-
-                if index > 0:
-                    # remove the links between node and previous_node
-                    previous_node = path[index - 1]
-                    paths[node]['open_directions'] = self.remove_node_from_open_directions(previous_node, paths[node][
-                        'open_directions'])
-                    paths[previous_node]['open_directions'] = self.remove_node_from_open_directions(node, paths[
-                        previous_node]['open_directions'])
-                else:
-                    # remove the links between node and start_node
-                    paths[node]['open_directions'] = self.remove_node_from_open_directions(start_node, paths[node][
-                        'open_directions'])
-                    paths[start_node]['open_directions'] = self.remove_node_from_open_directions(node,
-                                                                                                 paths[start_node][
-                                                                                                     'open_directions'])
-
-        # updating directions in tile map
-        for node in paths:
+        """
+        Computes one flow field for all START and FINISH tiles.
+        A single breadth-first search that starts at all FINISH tiles at once gives every walkable tile its distance
+        to the closest exit. Tiles that can be reached from a START tile then point to all neighbours that are one
+        step closer to an exit, so the cost is linear in the number of walkable tiles.
+        """
+        walkable_tiles = self.walkable_tiles()
+        for tile in walkable_tiles.values():
+            tile.directions = []
+
+        self.update_distances()
+        self.start_tiles = [index for index, tile in walkable_tiles.items() if tile.tile_type == TileType.START]
+        self.update_directions(walkable_tiles)
+
+    def update_directions(self, walkable_tiles: Union[Dict[Tuple[int, int], Tile], ChunkedTiles]):
+        """
+        Points the tiles, that can be reached from a START tile, to all neighbours that are one step closer to an exit
+        """
+        distances = self.distances
+        queue = deque(index for index in self.start_tiles if index in distances)
+        visited = set(queue)
+        while queue:
+            node = queue.popleft()
             directions = []
-            for p in paths[node]['from_path']:
-                if len(p) > 1:
-                    d = p[1][0] - p[0][0], p[1][1] - p[0][1]
-                    directions.append(d)
-            self.tiles[node].directions = directions
-
-    @staticmethod
-    def remove_node_from_open_directions(node: Tuple[int, int], open_directions: list):
-        for n in open_directions.copy():
-            if n[0] == node:
-                open_directions.remove(n)
-        return open_directions
-
-    @staticmethod
-    def select_start_node(paths):
-        for node in paths:
-            if paths[node]['to_path'] and paths[node]['open_directions']:
-                return node
-        return None
+            for direction in NEIGHBOUR_DIRECTIONS:
+                neighbour = node[0] + direction[0], node[1] + direction[1]
+                if distances.get(neighbour) != distances[node] - 1:
+                    continue
+                directions.append(direction)
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    queue.append(neighbour)
+            walkable_tiles[node].directions = directions
+
+    def clear_directions(self):
+        """
+        Removes the flow field, by following it from the START tiles
+        """
+        queue = deque(self.start_tiles)
+        visited = set(queue)
+        while queue:
+            node = queue.popleft()
+            tile = self.tiles[node]
+            for direction in tile.directions:
+                neighbour = node[0] + direction[0], node[1] + direction[1]
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    queue.append(neighbour)
+            tile.directions = []
+
+    def update_distances(self, graph: Optional[dict] = None) -> Dict[Tuple[int, int], int]:
+        """
+        Breadth-first search that starts at all FINISH tiles at once.
+        :return: the number of steps from every walkable tile to the closest FINISH tile
+        """
+        if graph is None:
+            graph = self.get_tile_graph()
+        walkable_tiles = self.walkable_tiles()
+        distances = {index: 0 for index, tile in walkable_tiles.items() if tile.tile_type == TileType.FINISH}
+        queue = deque(distances)
+        while queue:
+            node = queue.popleft()
+            for neighbour, _ in graph[node]:
+                if neighbour not in distances:
+                    distances[neighbour] = distances[node] + 1
+                    queue.append(neighbour)
+        self.distances = distances
+        return distances
+
+    def path_distance(self, position: Vector, tile_index: Tuple[int, int]) -> float:
+        """
+        Distance along the path from the given position to the closest FINISH tile,
+        when walking over the center of the tile with the given index.
+        Positions that can't reach a FINISH tile are infinitely far away.
+        """
+        steps = self.distances.get(tile_index)
+        if steps is None:
+            return math.inf
+        center = Vector(tile_index[0] * self.tile_size.x, tile_index[1] * self.tile_size.y) + self.tile_size / 2
+        return steps * self.tile_size.x + (center - position).length()
 
     def get_tile_graph(self) -> dict:
         graph: dict = {}
-        for position in self.tiles:
-            if self.tiles[position].is_walkable:
-                graph[position] = []
+        walkable_tiles = self.walkable_tiles()
+        for position in walkable_tiles:
+            graph[position] = []
 
-                x, y = position
-                left_pos = (x - 1, y)
-                right_pos = (x + 1, y)
-                top_pos = (x, y - 1)
-                bottom_pos = (x, y + 1)
+            x, y = position
+            left_pos = (x - 1, y)
+            right_pos = (x + 1, y)
+            top_pos = (x, y - 1)
+            bottom_pos = (x, y + 1)
 
-                if top_pos in self.tiles and self.tiles[top_pos].is_walkable:
-                    graph[position].append((top_pos, (0, -1)))
+            if top_pos in walkable_tiles:
+                graph[position].append((top_pos, (0, -1)))
 
-                if right_pos in self.tiles and self.tiles[right_pos].is_walkable:
-                    graph[position].append((right_pos, (1, 0)))
+            if right_pos in walkable_tiles:
+                graph[position].append((right_pos, (1, 0)))
 
-                if bottom_pos in self.tiles and self.tiles[bottom_pos].is_walkable:
-                    graph[position].append((bottom_pos, (0, 1)))
+            if bottom_pos in walkable_tiles:
+                graph[position].append((bottom_pos, (0, 1)))
 
-                if left_pos in self.tiles and self.tiles[left_pos].is_walkable:
-                    graph[position].append((left_pos, (-1, 0)))
+            if left_pos in walkable_tiles:
+                graph[position].append((left_pos, (-1, 0)))
 
         return graph
 
 
 class EditorTileMap(TileMap):
+    def __init__(self):
+        super().__init__()
+        self.reset_tools()
+
+    def convert_from(self, tile_map: TileMap):
+        self.reset_tools()
+
+    def reset_tools(self):
+        self.tool = EditorTool.CYCLE
+        # type that the brush, rectangle and fill tools paint with
+        self.paint_type = TileType.PATH
+        # the brush paints a square with this many tiles on each side of the clicked tile
+        self.brush_radius = 1
+        # corner of the rectangle that has been clicked first
+        self.rectangle_start: Optional[Tuple[int, int]] = None
+        self.history = EditHistory()
+
+    def new(self, game_state, path: str, size: Vector):
+        super().new(game_state, path, size)
+        self.history.clear()
+
+    def load(self, game_state, path: str):
+        super().load(game_state, path)
+        self.history.clear()
+
     def render(self, game_state):
         super().render(game_state)
+        if game_state.zoom < DETAIL_ZOOM:
+            return
 
         arrow_batch = pyglet.graphics.Batch()
-        for tile in self.tiles.values():
+        for tile in self.visible_tiles(game_state):
             tile.render_arrow(game_state, arrow_batch)
+        if self.rectangle_start is not None:
+            self.tiles[self.rectangle_start].render_highlight(game_state, arrow_batch)
         arrow_batch.draw()
 
     def mouse_click_handler(self, _, click: MouseClick) -> bool:
         if not self.is_on_map(click.position) or click.button != 1:
             return False
 
-        for tile in self.tiles.values():
-            if rect_contains_point(click.position, Vector(tile.world_position.x, tile.world_position.y + tile.size.y),
-                                   tile.size):
-                allow_start = True
-                allow_finish = True
-                for key in self.tiles:
-                    if self.tiles[key].tile_type == TileType.START:
-                        allow_start = False
-                    elif self.tiles[key].tile_type == TileType.FINISH:
-                        allow_finish = False
-
-                tile.next_type(allow_start, allow_finish)
-
-                self.path_finding()
-
+        tile_index = self.tile_index_at(click.position)
+        if self.tool == EditorTool.CYCLE:
+            # maps can have any number of START and FINISH tiles
+            tile = self.tiles[tile_index]
+            previous_type = tile.tile_type
+            tile.next_type(True, True)
+            tile_types = {tile_index: tile.tile_type}
+            tile.tile_type = previous_type
+        elif self.tool == EditorTool.BRUSH:
+            tile_types = self.brush(tile_index)
+        elif self.tool == EditorTool.RECTANGLE:
+            if self.rectangle_start is None:
+                self.rectangle_start = tile_index
                 return True
-
-        return False
+            tile_types = self.rectangle(self.rectangle_start, tile_index)
+            self.rectangle_start = None
+        else:
+            tile_types = self.flood_fill(tile_index)
+
+        self.history.record(self.set_tile_types(tile_types), tile_types)
+        return True
+
+    def brush(self, center: Tuple[int, int]) -> Dict[Tuple[int, int], TileType]:
+        radius = self.brush_radius
+        return self.rectangle((center[0] - radius, center[1] - radius), (center[0] + radius, center[1] + radius))
+
+    def rectangle(self, corner: Tuple[int, int], opposite_corner: Tuple[int, int]) -> Dict[Tuple[int, int], TileType]:
+        first_x, last_x = sorted((corner[0], opposite_corner[0]))
+        first_y, last_y = sorted((corner[1], opposite_corner[1]))
+        first_x, first_y = max(first_x, 0), max(first_y, 0)
+        last_x, last_y = min(last_x, int(self.max_tiles.x) - 1), min(last_y, int(self.max_tiles.y) - 1)
+        return {(x, y): self.paint_type for x in range(first_x, last_x + 1) for y in range(first_y, last_y + 1)}
+
+    def flood_fill(self, start: Tuple[int, int]) -> Dict[Tuple[int, int], TileType]:
+        """
+        :return: all tiles that are connected to the start tile and have the same type, nothing if there are more
+                 than MAX_FILL_TILES of them
+        """
+        tile_type = self.tiles[start].tile_type
+        if tile_type == self.paint_type:
+            return {}
+
+        region = {start}
+        queue = deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for neighbour in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if neighbour in region:
+                    continue
+                tile = self.tiles.get(neighbour)
+                if tile is None or tile.tile_type != tile_type:
+                    continue
+                if len(region) >= MAX_FILL_TILES:
+                    print("Flood fill stopped, the area has more than", MAX_FILL_TILES, "tiles")
+                    return {}
+                region.add(neighbour)
+                queue.append(neighbour)
+        return {tile_index: self.paint_type for tile_index in region}
 
 
 class GameTileMap(TileMap):
@@ -296,36 +655,49 @@ class GameTileMap(TileMap):
         self.path_finding()
         self.highlighted_tile = None
 
+    def convert_from(self, tile_map: TileMap):
+        if getattr(self, 'highlighted_tile', None) in self.tiles:
+            self.tiles[self.highlighted_tile].highlighted = False
+        self.highlighted_tile = None
+
     def render(self, game_state):
         super().render(game_state)
 
         highlight_batch = pyglet.graphics.Batch()
-        for tile in self.tiles.values():
+        for tile in self.visible_tiles(game_state):
             if tile.highlighted:
                 tile.render_highlight(game_state, highlight_batch)
                 break
+        if self.free_build:
+            self.render_build_preview(game_state, highlight_batch)
         highlight_batch.draw()
 
+    def render_build_preview(self, game_state, batch: pyglet.graphics.Batch):
+        """
+        Shows whether a building can be placed on the tile under the mouse
+        """
+        position = game_state.window_to_world_space(game_state.mouse_position)
+        if not self.is_on_map(position):
+            return
+        tile = self.tiles[self.tile_index_at(position)]
+        screen_coordinates = game_state.world_to_window_space(tile.world_position, tile.size)
+        if screen_coordinates is None:
+            return
+        color = (0, 255, 0) if self.can_build(self.tile_index_at(position)) else (255, 0, 0)
+        Renderer.rectangle_border(batch, screen_coordinates, tile.size, color)
+
     def mouse_click_handler(self, game_state, click: MouseClick) -> bool:
         if not self.is_on_map(click.position) or click.button != 1:
             return False
 
-        for tile in self.tiles:
-            if rect_contains_point(click.position, Vector(self.tiles[tile].world_position.x,
-                                                          self.tiles[tile].world_position.y + self.tiles[tile].size.y),
-                                   self.tiles[tile].size):
-                if self.tiles[tile].tile_type == TileType.BUILDING_GROUND:
-                    self.tiles[tile].highlighted = not self.tiles[tile].highlighted
-                    if self.tiles[tile].highlighted:
-                        self.highlighted_tile = tile
-                    else:
-                        self.highlighted_tile = None
-                else:
-                    self.highlighted_tile = None
-
-                for other_tile in self.tiles:
-                    if tile == other_tile:
-                        continue
-                    self.tiles[other_tile].highlighted = False
-                return True
-        return False
+        tile_index = self.tile_index_at(click.position)
+        if self.highlighted_tile is not None and self.highlighted_tile != tile_index:
+            self.tiles[self.highlighted_tile].highlighted = False
+
+        tile = self.tiles[tile_index]
+        if tile.tile_type == TileType.BUILDING_GROUND:
+            tile.highlighted = not tile.highlighted
+            self.highlighted_tile = tile_index if tile.highlighted else None
+        else:
+            self.highlighted_tile = None
+        return True
@@ -135,3 +135,30 @@ class Input(Button):
             self.update(text=self.text[:-1])
         else:
             self.update(text=self.text + key_presses.text)
+
+
+class Thumbnail(Widget):
+    def __init__(self, position: Vector, size: Vector, visible: bool = True) -> None:
+        super().__init__(position, size, visible)
+        self.image = None
+
+    def refresh(self, thumbnails, map_path: str):
+        """
+        Shows the current thumbnail of the map from the thumbnail cache.
+        When the map has changed, the old thumbnail is shown until the new one is ready.
+        """
+        image = thumbnails.get(map_path)
+        if image is not None:
+            self.image = image
+
+    def render(self, offset: Vector):
+        if not self.visible or self.image is None:
+            return
+
+        # fit the image into the widget while keeping its aspect ratio
+        scale = min(self.size.x / self.image.width, self.size.y / self.image.height)
+        width = self.image.width * scale
+        height = self.image.height * scale
+        pos = self.position + offset
+        self.image.blit(pos.x + (self.size.x - width) / 2, pos.y - self.size.y + (self.size.y - height) / 2,
+                        width=width, height=height)
@@ -3,10 +3,10 @@ from typing import List, Optional, Dict
 
 import pyglet
 
-from ..game_types import BuildingType
+from ..game_types import BuildingType, GameMode
 from ..graphics import Renderer
 from ..helper import Vector, MouseClick, process_clicks, rect_contains_point, get_maps_path
-from .components import Input, Label, Button, HighlightableLabel
+from .components import Input, Label, Button, HighlightableLabel, Thumbnail
 
 
 class Dialog:
@@ -82,6 +82,8 @@ class NewMapDialog(Dialog):
         if self.inputs['name'].text:
             file_name = os.path.join(
                 get_maps_path(), self.inputs['name'].text + '.map')
+            # the new map must not be overwritten by a save of the previous one that is still running
+            game_state.autosave.finish(game_state.tile_map)
             game_state.tile_map.new(game_state, file_name,
                                     Vector(new_width, new_height))
         self.visible = False
@@ -120,10 +122,14 @@ class LoadMapDialog(Dialog):
     def __init__(self, visible: bool = False) -> None:
         super().__init__(visible)
         self.maps: List[Button] = []
+        self.thumbnails: Dict[str, Thumbnail] = {}
+        self.maps_path = get_maps_path()
         self.cancel_button: Optional[Button] = None
 
     def refresh_maps(self, maps_path: str):
         self.maps = []
+        self.thumbnails = {}
+        self.maps_path = maps_path
         current_index = 0
         height = 50
         for file in os.listdir(maps_path):
@@ -131,6 +137,8 @@ class LoadMapDialog(Dialog):
                 text_component = Button(file, Vector(
                     150, 100 - height * current_index), Vector(300, height))
                 self.maps.append(text_component)
+                self.thumbnails[file] = Thumbnail(Vector(150 - height, 100 - height * current_index),
+                                                  Vector(height, height))
                 current_index += 1
         return current_index, height
 
@@ -145,6 +153,8 @@ class LoadMapDialog(Dialog):
 
     def update(self, game_state):
         super().update(game_state)
+        for file, thumbnail in self.thumbnails.items():
+            thumbnail.refresh(game_state.thumbnails, os.path.join(self.maps_path, file))
         process_clicks(game_state, self.mouse_click_handler,
                        False, self.position)
 
@@ -155,7 +165,7 @@ class LoadMapDialog(Dialog):
         for tile_map in self.maps:
             if tile_map.is_clicked(click):
                 file_name = os.path.join(get_maps_path(), tile_map.text)
-                game_state.tile_map.load(game_state, file_name)
+                game_state.load_map(file_name, GameMode.EDITOR)
                 self.visible = False
                 return True
         return False
@@ -164,6 +174,8 @@ class LoadMapDialog(Dialog):
         if self.visible:
             for tile_map in self.maps:
                 tile_map.render(self.position)
+            for thumbnail in self.thumbnails.values():
+                thumbnail.render(self.position)
             self.cancel_button.render(self.position)
 
 
@@ -174,11 +186,13 @@ class BuildingDialog(Dialog):
         self.button_size = Vector(200, 50)
         self.components = {
             'build_button': Button("Build", Vector(0, self.button_size.y), self.button_size),
-            'upgrade_button': Button("Upgrade", Vector(0, self.button_size.y), self.button_size, visible=False)
+            'upgrade_button': Button("Upgrade", Vector(0, self.button_size.y), self.button_size, visible=False),
+            'targeting_button': Button("", Vector(0, self.button_size.y * 2), self.button_size, visible=False),
         }
         self.handlers = {
             'build_button': self.build_func,
-            'upgrade_button': self.upgrade_func
+            'upgrade_button': self.upgrade_func,
+            'targeting_button': self.targeting_func,
         }
         self.building_types = {
             BuildingType.LASER: HighlightableLabel("", Vector(), Vector()),
@@ -210,6 +224,12 @@ class BuildingDialog(Dialog):
     def upgrade_func(game_state):
         pass
 
+    @staticmethod
+    def targeting_func(game_state):
+        building = game_state.building_manager.buildings.get(game_state.tile_map.highlighted_tile)
+        if building is not None:
+            building.next_targeting()
+
     def render_background(self):
         batch = pyglet.graphics.Batch()
         color = (0, 255, 0)
@@ -237,12 +257,16 @@ class BuildingDialog(Dialog):
         self.position = Vector(
             game_state.window_size.x - self.background_size.x, 0)
 
-        if game_state.tile_map.highlighted_tile in game_state.building_manager.buildings:
+        building = game_state.building_manager.buildings.get(game_state.tile_map.highlighted_tile)
+        if building is not None:
             self.components['build_button'].visible = False
             self.components['upgrade_button'].visible = True
+            self.components['targeting_button'].update(text=building.targeting.name.capitalize())
+            self.components['targeting_button'].visible = True
         else:
             self.components['build_button'].visible = True
             self.components['upgrade_button'].visible = False
+            self.components['targeting_button'].visible = False
 
         process_clicks(game_state, self.mouse_click_handler,
                        False, self.position)
@@ -1,9 +1,12 @@
 import os
-from typing import List
+from typing import Dict, List
+
+import pyglet
 
 from ..game_types import GameMode
 from ..helper import Vector, process_clicks, MouseClick, maps_list, get_maps_path
-from .components import Button
+from ..graphics import Renderer
+from .components import Button, Label, Thumbnail
 from .dialogs import NewMapDialog
 
 
@@ -14,12 +17,14 @@ class MainMenu:
 
         self.components = {
             "game_button": Button("Play", Vector(), button_size),
-            "editor_button": Button("Editor", Vector(0, -50), button_size),
-            "exit_button": Button("Exit", Vector(0, -100), button_size)
+            "free_build_button": Button("Free Build", Vector(0, -50), button_size),
+            "editor_button": Button("Editor", Vector(0, -100), button_size),
+            "exit_button": Button("Exit", Vector(0, -150), button_size)
         }
 
         self.handlers = {
             "game_button": self.game_func,
+            "free_build_button": self.free_build_func,
             "editor_button": self.editor_func,
             "exit_button": self.exit_func
         }
@@ -36,6 +41,12 @@ class MainMenu:
 
     @staticmethod
     def game_func(game_state):
+        game_state.free_build = False
+        game_state.mode = GameMode.MAP_CHOICE_GAME
+
+    @staticmethod
+    def free_build_func(game_state):
+        game_state.free_build = True
         game_state.mode = GameMode.MAP_CHOICE_GAME
 
     @staticmethod
@@ -68,6 +79,7 @@ class MapMenu:
         self.new_dialog = NewMapDialog()
 
         self.maps: List[Button] = []
+        self.thumbnails: Dict[str, Thumbnail] = {}
 
     @staticmethod
     def back_func(game_state):
@@ -79,11 +91,10 @@ class MapMenu:
     @staticmethod
     def load_func(game_state, path):
         map_path = os.path.join(get_maps_path(), path)
-        game_state.tile_map.load(game_state, map_path)
         if game_state.mode == GameMode.MAP_CHOICE_GAME:
-            game_state.mode = GameMode.GAME
+            game_state.load_map(map_path, GameMode.GAME)
         elif game_state.mode == GameMode.MAP_CHOICE_EDITOR:
-            game_state.mode = GameMode.EDITOR
+            game_state.load_map(map_path, GameMode.EDITOR)
 
     def update(self, game_state):
         self.position = Vector(game_state.window_size.x /
@@ -95,6 +106,7 @@ class MapMenu:
 
         if not self.maps:
             self.refresh_maps(self.map_path)
+        self.update_thumbnails(game_state)
 
         offset = 0
         if game_state.mode == GameMode.MAP_CHOICE_EDITOR:
@@ -128,9 +140,17 @@ class MapMenu:
         maps = maps_list(maps_path)
         self.maps = []
 
+        self.thumbnails = {}
+
         for index, map_ in enumerate(maps):
-            self.maps.append(
-                Button(map_, Vector(y=-self.button_size.y * index), self.button_size))
+            position = Vector(y=-self.button_size.y * index)
+            self.maps.append(Button(map_, position, self.button_size))
+            thumbnail_position = position - Vector(self.button_size.y, 0)
+            self.thumbnails[map_] = Thumbnail(thumbnail_position, Vector(self.button_size.y, self.button_size.y))
+
+    def update_thumbnails(self, game_state):
+        for map_, thumbnail in self.thumbnails.items():
+            thumbnail.refresh(game_state.thumbnails, os.path.join(self.map_path, map_))
 
     def render(self, game_state):
         if game_state.mode == GameMode.MAP_CHOICE_EDITOR:
@@ -142,3 +162,29 @@ class MapMenu:
 
         for map_ in self.maps:
             map_.render(self.position)
+
+        for thumbnail in self.thumbnails.values():
+            thumbnail.render(self.position)
+
+
+class LoadingMenu:
+    def __init__(self):
+        self.position = Vector()
+        self.size = Vector(600, 50)
+        self.label = Label("", Vector(), self.size)
+        self.progress = 0.0
+
+    def update(self, game_state):
+        self.position = Vector(game_state.window_size.x / 2 - self.size.x / 2,
+                               game_state.window_size.y / 2 + self.size.y)
+        loader = game_state.map_loader
+        self.progress = loader.progress
+        self.label.update(text=f"{loader.stage} {os.path.basename(loader.path)}")
+
+    def render(self):
+        self.label.render(self.position)
+
+        batch = pyglet.graphics.Batch()
+        position = self.position - Vector(0, self.size.y * 2)
+        Renderer.colored_rectangle(batch, (255, 0, 255), position, Vector(self.size.x * self.progress, 10))
+        batch.draw()
@@ -0,0 +1,134 @@
+from typing import Dict, Iterable, Tuple
+
+import pyglet
+
+from ..graphics import Renderer
+from ..helper import Vector, MouseClick, rect_contains_point
+from ..tiles.thumbnail import render_thumbnail
+from .components import Widget
+
+# the markers are only updated every few frames
+MARKER_INTERVAL = 15
+# size of a cell of the density grid in pixels on the minimap
+MARKER_CELL_SIZE = 4
+ENTITY_COLOR = (255, 60, 60)
+BUILDING_COLOR = (60, 120, 255)
+
+
+def density_grid(positions: Iterable[Vector], cell_size: float) -> Dict[Tuple[int, int], int]:
+    """
+    :return: number of positions in every cell that contains at least one position
+    """
+    grid: Dict[Tuple[int, int], int] = {}
+    for position in positions:
+        cell = int(position.x // cell_size), int(position.y // cell_size)
+        grid[cell] = grid.get(cell, 0) + 1
+    return grid
+
+
+class Minimap(Widget):
+    """
+    Overview of the whole map in the bottom right corner of the window.
+    The tiles are only rendered again, when the map changes. Entities and buildings are shown as a coarse density
+    grid, that is updated a few times per second. Clicking the minimap centers the view on the clicked position.
+    """
+
+    def __init__(self, max_size: int = 200) -> None:
+        super().__init__(Vector(), Vector())
+        self.max_size = max_size
+        self.image = None
+        # tiles and revision of the tile map the image shows
+        self.tiles = None
+        self.revision = -1
+        self.frame = 0
+        self.markers = pyglet.graphics.Batch()
+        self.view_rect = pyglet.graphics.Batch()
+
+    def scale(self, tile_map) -> float:
+        """
+        :return: pixels on the minimap per world unit
+        """
+        return self.size.x / tile_map.tile_map_width
+
+    def bottom_left(self, game_state) -> Vector:
+        return Vector(game_state.window_size.x - self.size.x, 0)
+
+    def update(self, game_state):
+        tile_map = game_state.tile_map
+        if tile_map.tiles is not self.tiles or tile_map.revision != self.revision:
+            self.render_tiles(tile_map)
+            self.frame = 0
+
+        position = Vector(game_state.window_size.x - self.size.x, self.size.y - game_state.window_size.y)
+        if position != self.position:
+            self.position = position
+            self.frame = 0
+
+        if self.frame % MARKER_INTERVAL == 0:
+            self.update_markers(game_state)
+        self.frame += 1
+
+        self.update_view_rect(game_state)
+
+    def render_tiles(self, tile_map):
+        # everything that isn't part of the path layer is building ground, which is the background of the thumbnail
+        width, height, data = render_thumbnail(tile_map.path_tiles(), tile_map.max_tiles, self.max_size)
+        self.image = pyglet.image.ImageData(width, height, 'RGB', data)
+        self.size = Vector(width, height)
+        self.tiles = tile_map.tiles
+        self.revision = tile_map.revision
+
+    def update_markers(self, game_state):
+        scale = self.scale(game_state.tile_map)
+        cell_size = MARKER_CELL_SIZE / scale
+        bottom_left = self.bottom_left(game_state)
+
+        entities = (entity.position for entity in game_state.entity_manager.entities)
+        buildings = (building.world_position + building.size / 2
+                     for building in game_state.building_manager.buildings.values())
+
+        self.markers = pyglet.graphics.Batch()
+        for positions, color in ((buildings, BUILDING_COLOR), (entities, ENTITY_COLOR)):
+            for (x, y), count in density_grid(positions, cell_size).items():
+                left = bottom_left.x + x * MARKER_CELL_SIZE
+                bottom = bottom_left.y + y * MARKER_CELL_SIZE
+                right = min(left + MARKER_CELL_SIZE, bottom_left.x + self.size.x)
+                top = min(bottom + MARKER_CELL_SIZE, bottom_left.y + self.size.y)
+                # more entities in a cell make it more opaque
+                alpha = min(255, 96 + 32 * count)
+                self.markers.add(4, pyglet.graphics.GL_QUADS, None,
+                                 ('v2f/static', [right, bottom, right, top, left, top, left, bottom]),
+                                 ('c4B/static', (*color, alpha) * 4))
+
+    def update_view_rect(self, game_state):
+        """
+        Outline of the part of the map that is visible in the window
+        """
+        scale = self.scale(game_state.tile_map)
+        position = self.bottom_left(game_state) + game_state.window_to_world_space(Vector()) * scale
+        self.view_rect = pyglet.graphics.Batch()
+        Renderer.rectangle_border(self.view_rect, position, game_state.view_size * scale, (255, 255, 255),
+                                  border_width=1)
+
+    def is_clicked(self, mouse_click: MouseClick) -> bool:
+        if not self.visible or self.image is None:
+            return False
+        return rect_contains_point(mouse_click.position, self.position, self.size)
+
+    def jump(self, game_state, mouse_click: MouseClick):
+        """
+        Centers the view on the world position under the click
+        """
+        scale = self.scale(game_state.tile_map)
+        world_position = Vector(mouse_click.position.x - self.position.x,
+                                self.size.y + mouse_click.position.y - self.position.y) / scale
+        game_state.world_offset = game_state.view_size / 2 - world_position
+
+    def render(self, offset: Vector):
+        if not self.visible or self.image is None:
+            return
+
+        pos = self.position + offset
+        self.image.blit(pos.x, pos.y - self.size.y)
+        self.markers.draw()
+        self.view_rect.draw()
@@ -1,7 +1,8 @@
-from ..game_types import GameMode
+from ..game_types import EditorTool, GameMode, GameSpeed, TileType
 from ..helper import Vector, process_clicks, MouseClick
 from .components import Button, Label
 from .dialogs import Dialog, NewMapDialog, LoadMapDialog, BuildingDialog
+from .minimap import Minimap
 
 
 class EditorUI:
@@ -15,6 +16,12 @@ class EditorUI:
             'load_button': Button("Load", Vector(0, -3 * button_height), size, visible=False),
             'back_button': Button("Back", Vector(0, -4 * button_height), size, visible=False),
             'entities_toggle': Button("", Vector(size.x, 0), size + Vector(20, 0)),
+            'tool_button': Button("", Vector(size.x * 2 + 20, 0), size),
+            'paint_type_button': Button("", Vector(size.x * 3 + 20, 0), size),
+            'undo_button': Button("Undo", Vector(size.x * 4 + 20, 0), Vector(size.x / 2, button_height),
+                                  font_size=20),
+            'redo_button': Button("Redo", Vector(size.x * 4.5 + 20, 0), Vector(size.x / 2, button_height),
+                                  font_size=20),
         }
         self.handlers = {
             'menu_button': self.menu_func,
@@ -23,16 +30,21 @@ class EditorUI:
             'load_button': self.load_func,
             'back_button': self.back_func,
             'entities_toggle': self.entities_func,
+            'tool_button': self.tool_func,
+            'paint_type_button': self.paint_type_func,
+            'undo_button': self.undo_func,
+            'redo_button': self.redo_func,
         }
         self.new_dialog: Dialog = NewMapDialog()
         self.load_dialog: Dialog = LoadMapDialog()
+        self.minimap = Minimap()
         self.offset = Vector(0, 0)
 
     def menu_func(self, _):
         self.toggle_map_menu()
 
     def save_func(self, game_state):
-        game_state.tile_map.save()
+        game_state.autosave.save(game_state.tile_map)
         self.toggle_map_menu()
 
     def new_func(self, game_state):
@@ -52,6 +64,27 @@ class EditorUI:
         game_state.entity_manager.should_spawn = not game_state.entity_manager.should_spawn
         game_state.entity_manager.reset()
 
+    @staticmethod
+    def tool_func(game_state):
+        tools = list(EditorTool)
+        tile_map = game_state.tile_map
+        tile_map.tool = tools[(tools.index(tile_map.tool) + 1) % len(tools)]
+        tile_map.rectangle_start = None
+
+    @staticmethod
+    def paint_type_func(game_state):
+        tile_types = list(TileType)
+        tile_map = game_state.tile_map
+        tile_map.paint_type = tile_types[(tile_types.index(tile_map.paint_type) + 1) % len(tile_types)]
+
+    @staticmethod
+    def undo_func(game_state):
+        game_state.tile_map.history.undo(game_state.tile_map)
+
+    @staticmethod
+    def redo_func(game_state):
+        game_state.tile_map.history.redo(game_state.tile_map)
+
     def update(self, game_state):
         self.offset.y = game_state.window_size.y
 
@@ -62,10 +95,21 @@ class EditorUI:
         else:
             text = "Entities" if game_state.entity_manager.should_spawn else "No Entities"
             self.components['entities_toggle'].update(text=text)
+            tile_map = game_state.tile_map
+            self.components['tool_button'].update(text=tile_map.tool.name.capitalize())
+            # the cycle tool doesn't paint with a fixed type
+            self.components['paint_type_button'].update(text=tile_map.paint_type.name.split('_')[-1].capitalize(),
+                                                        disabled=tile_map.tool == EditorTool.CYCLE)
+            self.components['undo_button'].update(disabled=not tile_map.history.can_undo)
+            self.components['redo_button'].update(disabled=not tile_map.history.can_redo)
+            self.minimap.update(game_state)
             process_clicks(game_state, self.mouse_click_handler,
                            False, offset=self.offset)
 
     def mouse_click_handler(self, game_state, click):
+        if self.minimap.is_clicked(click):
+            self.minimap.jump(game_state, click)
+            return True
         for component in self.handlers:
             if self.components[component].is_clicked(click):
                 self.handlers[component](game_state)
@@ -81,12 +125,20 @@ class EditorUI:
     def render(self):
         for component in self.components:
             self.components[component].render(self.offset)
+        self.minimap.render(self.offset)
 
         self.new_dialog.render()
         self.load_dialog.render()
 
 
 class GameUI:
+    speed_texts = {
+        GameSpeed.NORMAL: "1x",
+        GameSpeed.DOUBLE: "2x",
+        GameSpeed.QUADRUPLE: "4x",
+        GameSpeed.MAX: "Max",
+    }
+
     def __init__(self):
         self.offset = Vector()
         button_height = 50
@@ -96,12 +148,17 @@ class GameUI:
             'current_wave_label': Label("", Vector(size.x, 0), size),
             'health_label': Label("", Vector(size.x * 2, 0), size),
             'gold_label': Label("", Vector(size.x * 3, 0), size),
+            'speed_button': Button("", Vector(size.x * 4, 0), size),
+            'rewind_button': Button("Rewind", Vector(size.x * 5, 0), size),
             'game_over_label': Label("Game Over", Vector(0, -100), Vector(400, 90), font_size=50, visible=False)
         }
         self.handlers = {
-            'next_wave_button': self.next_wave_func
+            'next_wave_button': self.next_wave_func,
+            'speed_button': self.speed_func,
+            'rewind_button': self.rewind_func,
         }
         self.building_dialog = BuildingDialog()
+        self.minimap = Minimap()
 
     def update(self, game_state):
         self.offset.y = game_state.window_size.y
@@ -111,9 +168,13 @@ class GameUI:
             text=str(game_state.building_manager.gold))
         self.components['current_wave_label'].update(
             text=str(game_state.entity_manager.wave_count))
+        self.components['speed_button'].update(
+            text=self.speed_texts[game_state.game_speed])
 
         self.components['next_wave_button'].update(
             disabled=game_state.entity_manager.wave_running)
+        self.components['rewind_button'].update(
+            disabled=len(game_state.wave_history) == 0)
 
         self.components['game_over_label'].position.x = game_state.window_size.x / 2 - self.components[
             'game_over_label'].size.x / 2
@@ -125,15 +186,29 @@ class GameUI:
             self.building_dialog.close()
 
         self.building_dialog.update(game_state)
+        self.minimap.update(game_state)
 
         process_clicks(game_state, self.mouse_click_handler,
                        False, self.offset)
 
     @staticmethod
     def next_wave_func(game_state):
-        game_state.entity_manager.next_wave()
+        game_state.start_wave()
+
+    @staticmethod
+    def rewind_func(game_state):
+        game_state.rewind_wave()
+
+    @staticmethod
+    def speed_func(game_state):
+        speeds = list(GameSpeed)
+        index = speeds.index(game_state.game_speed)
+        game_state.set_game_speed(speeds[(index + 1) % len(speeds)])
 
     def mouse_click_handler(self, game_state, click: MouseClick) -> bool:
+        if self.minimap.is_clicked(click):
+            self.minimap.jump(game_state, click)
+            return True
         for component in self.components:
             if self.components[component].is_clicked(click) and not self.components[component].disabled:
                 if component in self.handlers:
@@ -144,5 +219,6 @@ class GameUI:
     def render(self, _):
         for component in self.components:
             self.components[component].render(self.offset)
+        self.minimap.render(self.offset)
 
         self.building_dialog.render()